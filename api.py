@@ -4,6 +4,8 @@ api.py - Flask API server for study space finder
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+import hashlib
+import json
 import sys
 from pathlib import Path
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -12,9 +14,14 @@ from automation.update_tasks import update_data
 # Add utils to path
 sys.path.append(str(Path(__file__).parent / "utils"))
 
-from utils.query import retrieve_ranked_study_spaces, get_buildings_with_spaces
+from utils.availability_sync import AVAILABILITY_CHANGES
+from utils.catalog import CATALOG
+from utils.query import retrieve_ranked_study_spaces, retrieve_ranked_page, decode_cursor, get_buildings_with_spaces
+from utils.scraper_service import SCRAPER
 from utils.update_room_availability import update_availability
-from personal_model.store_personal_model_data import add_user, delete_bookmarks, store_bookmarks, store_filter_info, store_spot_feedback, store_spot_view, store_study_session, check_bookmark_status, get_bookmarked_space_info
+from personal_model.event_queue import EVENT_QUEUE
+from personal_model.model_cache import MODEL_CACHE
+from personal_model.store_personal_model_data import add_user, delete_bookmarks, store_bookmarks, store_filter_info, store_spot_feedback, store_spot_view, store_study_session, check_bookmark_status, get_bookmarked_space_info, missing_fields, store_events
 from automation import updater_service
 app = Flask(__name__)
 import os
@@ -25,6 +32,10 @@ _scheduler = BackgroundScheduler()
 _JOB_ID = "global_update_job"
 
 CACHE = {"updated_at": None, "payload": None}
+# (catalog_version, json_body, etag) for /api/buildings
+BUILDINGS_CACHE = {"entry": None}
+# Most events accepted by one /api/personal_model/events request
+MAX_BULK_EVENTS = 500
 
 @app.route('/')
 def index():
@@ -32,13 +43,29 @@ def index():
 
 @app.route('/api/buildings', methods=['GET'])
 def get_buildings():
-    """Get all available buildings"""
+    """
+    Get all available buildings.
+
+    The serialized response only changes with the catalog, so it is built
+    once per catalog version and sent with an ETag; clients that send it
+    back in If-None-Match get a 304 with no body.
+    """
     try:
-        buildings = get_buildings_with_spaces()
-        return jsonify({
-            "success": True,
-            "data": buildings
-        })
+        catalog_version = CATALOG.get().version
+        entry = BUILDINGS_CACHE["entry"]
+        if entry is None or entry[0] != catalog_version:
+            body = json.dumps({
+                "success": True,
+                "data": get_buildings_with_spaces()
+            }, sort_keys=True)
+            entry = (catalog_version, body, hashlib.sha1(body.encode("utf-8")).hexdigest())
+            BUILDINGS_CACHE["entry"] = entry
+
+        _, body, etag = entry
+        response = app.response_class(body, mimetype="application/json")
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -70,19 +97,46 @@ def search_spaces():
                 "error": "user_id is required for personalized ranking"
             }), 400
 
-        # Call new ranking pipeline
-        results = retrieve_ranked_study_spaces(
-            user_id=user_id,
-            filters=filters,
-            user_location=user_location,
-            debug=debug
-        )
-
+        # Optional pagination: {"limit": 10} for the first page, then pass
+        # back the returned next_cursor to get the following page
+        limit = data.get("limit")
+        cursor = data.get("cursor")
+        if limit is None:
+            results = retrieve_ranked_study_spaces(
+                user_id=user_id,
+                filters=filters,
+                user_location=user_location,
+                debug=debug
+            )
+            next_cursor = None
+        else:
+            if isinstance(limit, bool) or not isinstance(limit, int) or limit <= 0:
+                return jsonify({
+                    "success": False,
+                    "error": "limit must be a positive integer"
+                }), 400
+            if cursor is not None:
+                try:
+                    decode_cursor(cursor)
+                except ValueError as e:
+                    return jsonify({
+                        "success": False,
+                        "error": str(e)
+                    }), 400
+            results, next_cursor = retrieve_ranked_page(
+                user_id=user_id,
+                filters=filters,
+                user_location=user_location,
+                debug=debug,
+                limit=limit,
+                cursor=cursor
+            )
 
         return jsonify({
             "success": True,
             "count": len(results),
-            "data": results
+            "data": results,
+            "next_cursor": next_cursor
         })
 
     except Exception as e:
@@ -158,6 +212,11 @@ def search_filter_todata():
                 "error": "filters must be a JSON object"
             }), 400
 
+        if missing_fields("search_filter", filters):
+           return jsonify({
+                "success": False,
+                "error": "filters miss required fields"
+            }), 400
 
         print("Received filters:", filters)
         store_filter_info(user_id, filters, debug)
@@ -199,8 +258,7 @@ def study_session_todata():
                 "error": "session must be a JSON object"
             }), 400
 
-        fields = session.keys()
-        if "study_space_id" not in fields or "building_id" not in fields or "started_at" not in fields or "ended_at" not in fields or "start_date" not in fields or "end_date" not in fields:
+        if missing_fields("study_session", session):
            return jsonify({
                 "success": False,
                 "error": "session miss required fields"
@@ -246,8 +304,7 @@ def add_bookmarks_todata():
                 "error": "bookmark must be a JSON object"
             }), 400
 
-        fields = bookmark.keys()
-        if "study_space_id" not in fields or "building_id" not in fields or "created_at" not in fields:
+        if missing_fields("add_bookmark", bookmark):
            return jsonify({
                 "success": False,
                 "error": "bookmark miss required fields"
@@ -293,8 +350,7 @@ def delete_bookmarks_todata():
                 "error": "bookmark must be a JSON object"
             }), 400
 
-        fields = bookmark.keys()
-        if "study_space_id" not in fields:
+        if missing_fields("delete_bookmark", bookmark):
            return jsonify({
                 "success": False,
                 "error": "bookmark miss required fields (study_space_id)"
@@ -361,8 +417,7 @@ def spot_view_todata():
                 "error": "view must be a JSON object"
             }), 400
 
-        fields = view.keys()
-        if "study_space_id" not in fields or "building_id" not in fields or "opened_at" not in fields:
+        if missing_fields("spot_view", view):
            return jsonify({
                 "success": False,
                 "error": "view miss required fields"
@@ -409,8 +464,7 @@ def spot_feedback_todata():
                 "error": "feedback must be a JSON object"
             }), 400
 
-        fields = feedback.keys()
-        if "study_space_id" not in fields or "building_id" not in fields or "rating" not in fields or "updated_at" not in fields:
+        if missing_fields("spot_feedback", feedback):
            return jsonify({
                 "success": False,
                 "error": "feedback miss required fields"
@@ -430,6 +484,63 @@ def spot_feedback_todata():
         }), 500
 
 
+@app.route('/api/personal_model/events', methods=['POST'])
+def events_todata():
+    """
+    Store a batch of events (e.g. buffered offline) in one request.
+
+    Body: {"user_id": ..., "events": [{"type": <event type>, "data": {...}}, ...]}
+    where the event types are search_filter, study_session, add_bookmark,
+    delete_bookmark, spot_view and spot_feedback, and data is what the
+    matching single-event endpoint takes. Every event gets a status in
+    "results"; invalid or failed events do not stop the others.
+    """
+    try:
+        data = request.get_json(silent=True)
+
+        if not data:
+            return jsonify({
+                "success": False,
+                "error": "No JSON body provided"
+            }), 400
+
+        user_id = data.get("user_id")
+        events = data.get("events")
+        debug = data.get("debug", False)
+
+        if not user_id:
+            return jsonify({
+                "success": False,
+                "error": "user_id is required"
+            }), 400
+
+        if not isinstance(events, list):
+            return jsonify({
+                "success": False,
+                "error": "events must be a JSON array"
+            }), 400
+
+        if len(events) > MAX_BULK_EVENTS:
+            return jsonify({
+                "success": False,
+                "error": f"at most {MAX_BULK_EVENTS} events per request"
+            }), 400
+
+        print(f"Received {len(events)} events for user:", user_id)
+        results = store_events(user_id, events, debug)
+        return jsonify({
+            "success": True,
+            "stored": sum(r["status"] == "stored" for r in results),
+            "results": results
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
 @app.route('/api/personal_model/get_history', methods=['POST'])
 def get_study_session_history():
     try:
@@ -512,7 +623,11 @@ def health_check():
     """Health check endpoint"""
     return jsonify({
         "success": True,
-        "message": "API is running"
+        "message": "API is running",
+        "personal_model_cache": MODEL_CACHE.stats(),
+        "event_queue": EVENT_QUEUE.stats(),
+        "availability_scraper": SCRAPER.last_report,
+        "availability_changes": AVAILABILITY_CHANGES.stats()
     })
 
 
@@ -0,0 +1,26 @@
+-- Secondary indexes for the hot read paths. Every statement is idempotent,
+-- so this file can be applied to an existing app.db as a migration
+-- (python utils/migrate_db.py) as well as after schema.sql on a fresh one.
+
+-- Open-slot lookups: AvailabilitySnapshot.from_db reads only available slots,
+-- ordered per room by start time, straight out of this partial index
+CREATE INDEX IF NOT EXISTS idx_room_availability_open
+ON room_availability(study_space_id, start_time, end_time, scraped_at)
+WHERE is_available = 1;
+
+-- One row per slot: the diff ingest (availability_sync.py) updates and
+-- deletes slots by (study_space_id, start_time)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_room_availability_slot
+ON room_availability(study_space_id, start_time);
+
+-- avg_traffic_between: per building/location time-range aggregation
+CREATE INDEX IF NOT EXISTS idx_library_traffic_location_time
+ON library_traffic(building_id, location_name, timestamp, traffic_percentage);
+
+-- Weather lookups by rounded (date, hour)
+CREATE INDEX IF NOT EXISTS idx_hourly_weather_date_hour
+ON hourly_weather(date, hour);
+
+-- Spaces per building are served from the in-memory catalog (catalog.py),
+-- which loads study_spaces whole; nothing filters the table by building_id
+DROP INDEX IF EXISTS idx_study_spaces_building;
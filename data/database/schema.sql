@@ -2,8 +2,10 @@
 DROP TABLE IF EXISTS study_spaces;
 DROP TABLE IF EXISTS buildings;
 DROP TABLE IF EXISTS library_traffic;
+DROP TABLE IF EXISTS library_traffic_latest;
 DROP TABLE IF EXISTS hourly_weather;
 DROP TABLE IF EXISTS room_availability;
+DROP TABLE IF EXISTS room_availability_scrapes;
 
 -- Create Building/Location Table 
 CREATE TABLE buildings (
@@ -40,6 +42,15 @@ CREATE TABLE library_traffic (
     FOREIGN KEY (building_id) REFERENCES buildings(building_id)
 );
 
+-- Newest library traffic reading per location, upserted at ingest time
+CREATE TABLE library_traffic_latest (
+    location_name TEXT PRIMARY KEY,
+    building_id TEXT,
+    traffic_count INTEGER,
+    traffic_percentage REAL,
+    timestamp TEXT
+);
+
 -- Create hourly weather table
 CREATE TABLE IF NOT EXISTS hourly_weather (
     time_local TEXT PRIMARY KEY,
@@ -62,4 +73,10 @@ CREATE TABLE IF NOT EXISTS room_availability (
     is_available INTEGER NOT NULL,
     scraped_at TEXT NOT NULL,
     FOREIGN KEY (study_space_id) REFERENCES study_spaces(study_space_id)
-);
\ No newline at end of file
+);
+
+-- When each room's availability was last scraped
+CREATE TABLE IF NOT EXISTS room_availability_scrapes (
+    study_space_id INTEGER PRIMARY KEY,
+    scraped_at TEXT NOT NULL
+);
@@ -4,6 +4,7 @@ DROP TABLE IF EXISTS study_sessions;
 DROP TABLE IF EXISTS bookmarks;
 DROP TABLE IF EXISTS spot_feedback;
 DROP TABLE IF EXISTS spot_detail_views;
+DROP TABLE IF EXISTS user_profile_aggregates;
 DROP TABLE IF EXISTS users;
 
 CREATE TABLE IF NOT EXISTS users (
@@ -27,6 +28,8 @@ CREATE TABLE IF NOT EXISTS study_sessions (
   start_weather_time_local TEXT,
 
   session_traffic REAL,
+  -- set once session_enrichment.py has looked up traffic and weather
+  enriched_at TEXT,
   FOREIGN KEY (user_id) REFERENCES users(user_id)
 );
 
@@ -36,6 +39,9 @@ ON study_sessions(user_id, start_date);
 CREATE INDEX IF NOT EXISTS idx_sessions_weather_time
 ON study_sessions(start_weather_time_local);
 
+CREATE INDEX IF NOT EXISTS idx_sessions_pending_enrichment
+ON study_sessions(session_id) WHERE enriched_at IS NULL;
+
 CREATE TABLE IF NOT EXISTS bookmarks (
   user_id TEXT NOT NULL,
   study_space_id INTEGER NOT NULL,
@@ -88,3 +94,14 @@ ON spot_feedback(user_id);
 
 CREATE INDEX IF NOT EXISTS idx_views_user_time
 ON spot_detail_views(user_id, opened_at);
+
+-- Running per-user preference statistics, maintained by
+-- personal_model/aggregates.py alongside every event write
+CREATE TABLE IF NOT EXISTS user_profile_aggregates (
+  user_id TEXT NOT NULL,
+  event_type TEXT NOT NULL,
+  attribute TEXT NOT NULL,
+  value_count INTEGER NOT NULL DEFAULT 0,
+  value_sum REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, event_type, attribute)
+);
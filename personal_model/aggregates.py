@@ -0,0 +1,380 @@
+"""
+aggregates.py - Running per-user preference statistics in user_data.db
+
+PersonalModel recomputes counts, means and value_counts over a user's whole
+event history on every fit. user_profile_aggregates keeps those numbers up to
+date instead: every batch of event writes (event_queue.py) adds the
+contribution of the rows it wrote and subtracts that of the rows it replaced
+or deleted, in the same transaction, so the table always matches the event
+tables.
+
+One row per (user_id, event_type, attribute):
+
+    count                  value_count = number of events
+    <attr>                 value_count / value_sum = non-null count and sum,
+                           for the means in PersonalModel.event_stats()
+    <attr>=<value>         value_count = number of events with that value
+                           (building_id, study_space_id and the spot
+                           attributes, "None" for missing values)
+    reserved_ms:<date>     value_sum = duration of sessions in must-reserve
+                           rooms that started on <date>
+
+Spot attributes come from joining each event against the catalog, so the
+catalog version a user's aggregates were built with is kept under
+event_type "meta"; when it no longer matches, the user is rebuilt from the
+raw event tables. load_user_context() builds the same structure as
+PersonalModel.user_context_for_ranking() from these rows, without pandas.
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.preferences import analyze_stats, user_preference
+from utils.catalog import get_catalog
+from utils.db import get_connection
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
+APP_DB = BASE_DIR / "data" / "database" / "app.db"
+
+EVENT_TABLES = ["study_sessions", "bookmarks", "spot_feedback", "spot_detail_views", "search_filters"]
+
+# attributes joined from the catalog for every spot event
+SPOT_ATTRS = ["capacity", "has_printer", "is_indoor", "is_talking_allowed", "tech_enhanced", "must_reserve"]
+SEARCH_ATTRS = ["min_capacity", "max_capacity", "has_printer", "is_indoor", "is_talking_allowed", "tech_enhanced"]
+
+META = "meta"
+CATALOG_VERSION = "catalog_version"
+
+
+def create_aggregates_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_profile_aggregates (
+            user_id TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            attribute TEXT NOT NULL,
+            value_count INTEGER NOT NULL DEFAULT 0,
+            value_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, event_type, attribute)
+        )
+    """)
+
+
+def fetch_rows(cur, table, where, params):
+    """Rows of an event table as dicts, e.g. the row a write is about to replace"""
+    cur.execute(f"SELECT * FROM {table} WHERE {where}", params)
+    columns = [d[0] for d in cur.description]
+    return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def _spot_attributes(row, catalog):
+    """The enrichment PersonalModel.enrich_and_store() does for one event row"""
+    space = catalog.spaces.get(row["study_space_id"])
+    building_id = row.get("building_id")
+    if building_id is None and space is not None:
+        building_id = space.building_id
+    building = catalog.buildings.get(str(building_id)) if building_id is not None else None
+
+    attrs = {a: getattr(space, a) if space is not None else None for a in SPOT_ATTRS}
+    attrs["has_printer"] = building.has_printer if building is not None else None
+    attrs["building_id"] = str(building_id) if building_id is not None else None
+    return attrs
+
+
+def contributions(event_type, row, catalog):
+    """(attribute, count, sum) triples one event row adds to its user's aggregates"""
+    out = [("count", 1, 0)]
+
+    if event_type == "search_filters":
+        for a in SEARCH_ATTRS:
+            value = row.get(a)
+            if value is not None:
+                out.append((a, 1, value))
+        for a in ("min_capacity", "max_capacity"):
+            out.append((f"{a}={row.get(a)}", 1, 0))
+        return out
+
+    attrs = _spot_attributes(row, catalog)
+    for a in SPOT_ATTRS:
+        value = attrs[a]
+        if value is not None:
+            out.append((a, 1, value))
+        out.append((f"{a}={value}", 1, 0))
+    if attrs["building_id"] is not None:
+        out.append((f"building_id={attrs['building_id']}", 1, 0))
+
+    if event_type == "study_sessions":
+        out.append((f"study_space_id={row['study_space_id']}", 1, 0))
+        if row.get("session_traffic") is not None:
+            out.append(("session_traffic", 1, row["session_traffic"]))
+        if attrs["must_reserve"] == 1 and row.get("duration_ms") is not None:
+            out.append((f"reserved_ms:{row['start_date']}", 1, row["duration_ms"]))
+    return out
+
+
+def _apply(cur, user_id, deltas):
+    cur.executemany("""
+        INSERT INTO user_profile_aggregates (user_id, event_type, attribute, value_count, value_sum)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, event_type, attribute) DO UPDATE SET
+            value_count = value_count + excluded.value_count,
+            value_sum = value_sum + excluded.value_sum
+    """, [(user_id, event_type, attribute, count, total) for (event_type, attribute), (count, total) in deltas.items()])
+    cur.execute("""
+        DELETE FROM user_profile_aggregates
+        WHERE user_id = ? AND event_type != ? AND value_count = 0
+    """, (user_id, META))
+
+
+def _stored_catalog_version(cur, user_id):
+    cur.execute("""
+        SELECT value_count FROM user_profile_aggregates
+        WHERE user_id = ? AND event_type = ? AND attribute = ?
+    """, (user_id, META, CATALOG_VERSION))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def rebuild_user(cur, user_id, catalog):
+    """Recompute one user's aggregates from the raw event tables"""
+    create_aggregates_table(cur)
+    cur.execute("DELETE FROM user_profile_aggregates WHERE user_id = ?", (user_id,))
+    deltas = {}
+    for table in EVENT_TABLES:
+        for row in fetch_rows(cur, table, "user_id = ?", (user_id,)):
+            _accumulate(deltas, table, contributions(table, row, catalog), 1)
+    deltas[(META, CATALOG_VERSION)] = [catalog.version, 0]
+    _apply(cur, user_id, deltas)
+
+
+def _accumulate(deltas, event_type, items, sign):
+    for attribute, count, total in items:
+        entry = deltas.setdefault((event_type, attribute), [0, 0])
+        entry[0] += sign * count
+        entry[1] += sign * total
+
+
+def record_changes(cur, table, removed=(), added=(), user_ids=(), app_db=APP_DB):
+    """
+    Update aggregates for any number of rows removed from and added to one
+    event table in the current transaction (e.g. a batch of writes): the
+    rows read before the writes are subtracted, the rows read after added.
+
+    Users in user_ids are brought up to date even if no row of theirs
+    changed.
+    """
+    create_aggregates_table(cur)
+    catalog = get_catalog(app_db).get()
+
+    changes = {user_id: [] for user_id in user_ids}
+    for sign, rows in ((-1, removed), (1, added)):
+        for row in rows:
+            changes.setdefault(row["user_id"], []).append((sign, row))
+
+    for user_id, rows in changes.items():
+        if _stored_catalog_version(cur, user_id) != catalog.version:
+            # first write for this user, or the catalog changed since the
+            # aggregates were built; the raw tables already include the writes
+            rebuild_user(cur, user_id, catalog)
+            continue
+
+        deltas = {}
+        for sign, row in rows:
+            _accumulate(deltas, table, contributions(table, row, catalog), sign)
+        _apply(cur, user_id, deltas)
+
+
+def rebuild_all(user_db=USER_DB, app_db=APP_DB):
+    """Backfill / repair every user's aggregates, e.g. after bulk-loading events"""
+    conn = get_connection(user_db)
+    catalog = get_catalog(app_db).get()
+    with conn:
+        cur = conn.cursor()
+        create_aggregates_table(cur)
+        user_ids = set()
+        for table in ["users"] + EVENT_TABLES:
+            cur.execute(f"SELECT DISTINCT user_id FROM {table}")
+            user_ids.update(row[0] for row in cur.fetchall())
+        for user_id in sorted(user_ids):
+            rebuild_user(cur, user_id, catalog)
+    return len(user_ids)
+
+
+def _parse_value(text):
+    if text == "None":
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+def _histogram(attrs, name, parse=_parse_value):
+    """{value: count} for the "<name>=<value>" rows, most frequent first"""
+    prefix = name + "="
+    counts = {parse(a[len(prefix):]): c for a, (c, _) in attrs.items() if a.startswith(prefix)}
+    return dict(sorted(counts.items(), key=lambda kv: (-kv[1], str(kv[0]))))
+
+
+def _mean(attrs, name):
+    count, total = attrs.get(name, (0, 0.0))
+    return total / count if count else float("nan")
+
+
+def _extreme(attrs, name, pick):
+    values = [v for v in _histogram(attrs, name) if v is not None]
+    return pick(values) if values else float("nan")
+
+
+def event_stats_from_aggregates(attrs, event_name):
+    """PersonalModel.event_stats() computed from one event type's aggregate rows"""
+    count = attrs.get("count", (0, 0))[0]
+    if count == 0:
+        return {
+            "event": event_name,
+            "count": 0,
+            "avg_capacity": None,
+            "has_printer_pct": None,
+            "is_indoor_pct": None,
+            "is_talking_allowed_pct": None,
+            "tech_enhanced_pct": None,
+            "building_counts": {},
+        }
+
+    if event_name == "search_filters":
+        return {
+            "event": event_name,
+            "count": count,
+            "avg_capacity": {
+                "min_capacity": _mean(attrs, "min_capacity"),
+                "max_capacity": _mean(attrs, "max_capacity"),
+            },
+            "min_capacity": _extreme(attrs, "min_capacity", min),
+            "max_capacity": _extreme(attrs, "max_capacity", max),
+            "has_printer_pct": _mean(attrs, "has_printer"),
+            "is_indoor_pct": _mean(attrs, "is_indoor"),
+            "is_talking_allowed_pct": _mean(attrs, "is_talking_allowed"),
+            "tech_enhanced_pct": _mean(attrs, "tech_enhanced"),
+        }
+
+    stats = {
+        "event": event_name,
+        "count": count,
+        "building_counts": _histogram(attrs, "building_id", parse=str),
+        "avg_capacity": _mean(attrs, "capacity"),
+        "min_capacity": _extreme(attrs, "capacity", min),
+        "max_capacity": _extreme(attrs, "capacity", max),
+        "has_printer_pct": _mean(attrs, "has_printer"),
+        "is_indoor_pct": _mean(attrs, "is_indoor"),
+        "is_talking_allowed_pct": _mean(attrs, "is_talking_allowed"),
+        "tech_enhanced_pct": _mean(attrs, "tech_enhanced"),
+    }
+    if event_name == "study_sessions":
+        stats["session_traffic"] = _mean(attrs, "session_traffic")
+    stats["must_reserve_pct"] = _mean(attrs, "must_reserve")
+    return stats
+
+
+def load_aggregates(user_id, user_db=USER_DB, app_db=APP_DB, today=None):
+    """
+    {event_type: {attribute: (value_count, value_sum)}} for one user, with
+    only today's reserved_ms row. Rebuilds the user first if their
+    aggregates are missing or were built against another catalog version.
+    """
+    today = today or date.today().isoformat()
+    conn = get_connection(user_db)
+    catalog = get_catalog(app_db).get()
+    cur = conn.cursor()
+    create_aggregates_table(cur)
+
+    if _stored_catalog_version(cur, user_id) != catalog.version:
+        with conn:
+            rebuild_user(cur, user_id, catalog)
+
+    cur.execute("""
+        SELECT event_type, attribute, value_count, value_sum
+        FROM user_profile_aggregates
+        WHERE user_id = ? AND (attribute NOT LIKE 'reserved_ms:%' OR attribute = ?)
+    """, (user_id, f"reserved_ms:{today}"))
+
+    aggregates = {table: {} for table in EVENT_TABLES}
+    for event_type, attribute, count, total in cur.fetchall():
+        if event_type in aggregates:
+            aggregates[event_type][attribute] = (count, total)
+    return aggregates
+
+
+def reserved_hours(aggregates, today):
+    """Hours of must-reserve sessions that started on today (an ISO date)"""
+    return aggregates["study_sessions"].get(f"reserved_ms:{today}", (0, 0))[1] / 3_600_000
+
+
+def low_rating_spots(feedback):
+    """study_space_ids the user rated below 3, from their spot_feedback rows"""
+    return [row["study_space_id"] for row in feedback if row["rating"] is not None and row["rating"] < 3]
+
+
+def bookmarked_spots(bookmarks):
+    """study_space_ids of the user's bookmark rows, newest first"""
+    newest_first = sorted(bookmarks, key=lambda row: row["created_at"] or "", reverse=True)
+    return [row["study_space_id"] for row in newest_first]
+
+
+def load_user_context(user_id, user_db=USER_DB, app_db=APP_DB, today=None):
+    """
+    The dict PersonalModel.user_context_for_ranking() returns, read from
+    user_profile_aggregates. Cost depends on the number of distinct
+    attribute values, not on the length of the user's history.
+    """
+    today = today or date.today().isoformat()
+    aggregates = load_aggregates(user_id, user_db, app_db, today)
+
+    # low ratings and bookmarks are per-spot lists, at most one row per spot
+    cur = get_connection(user_db).cursor()
+    feedback = fetch_rows(cur, "spot_feedback", "user_id = ?", (user_id,))
+    bookmarks = fetch_rows(cur, "bookmarks", "user_id = ?", (user_id,))
+    return user_context_from_aggregates(aggregates, feedback, bookmarks, today)
+
+
+def user_context_from_aggregates(aggregates, feedback, bookmarks, today):
+    """load_user_context() for aggregates and rows that are already loaded"""
+    sessions = aggregates["study_sessions"]
+    hours = reserved_hours(aggregates, today)
+
+    event_stats = {
+        "study_session": event_stats_from_aggregates(sessions, "study_sessions"),
+        "bookmarks": event_stats_from_aggregates(aggregates["bookmarks"], "bookmarks"),
+        "spot_feedback": event_stats_from_aggregates(aggregates["spot_feedback"], "spot_feedback"),
+        "spot_detail_views": event_stats_from_aggregates(aggregates["spot_detail_views"], "spot_detail_views"),
+        "search_filters": event_stats_from_aggregates(aggregates["search_filters"], "search_filters"),
+    }
+    average_preference = analyze_stats([
+        event_stats["study_session"],
+        event_stats["bookmarks"],
+        event_stats["spot_detail_views"],
+        event_stats["search_filters"],
+    ], hours)
+
+    return {
+        "event_stats": event_stats,
+        "average_preference": average_preference,
+        "preference": user_preference(average_preference, hours),
+        "history": {
+            "building_counts": _histogram(sessions, "building_id", parse=str),
+            "study_spot_count": _histogram(sessions, "study_space_id", parse=int),
+        },
+        "low_rating_rooms": low_rating_spots(feedback),
+        "bookmarks": bookmarked_spots(bookmarks),
+    }
+
+
+if __name__ == "__main__":
+    users = rebuild_all()
+    print(f"  Rebuilt preference aggregates for {users} users")
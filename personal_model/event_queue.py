@@ -0,0 +1,269 @@
+"""
+event_queue.py - Write-behind queue for personal-model events
+
+Every /api/personal_model/* POST used to open a transaction on user_data.db,
+insert one row and commit (one fsync per event), so bursts of events from
+many clients serialised on SQLite's write lock inside request threads. The
+store_* functions in store_personal_model_data.py now submit an Event here
+and return; a single writer thread drains the queue and writes every batch
+of up to BATCH_SIZE events (or whatever arrived within FLUSH_INTERVAL
+seconds) in one transaction:
+
+  * consecutive events with the same statement run as one executemany(), so
+    events are applied in the order they were submitted
+  * user_profile_aggregates is updated for each run from the rows read
+    before and after it (see aggregates.record_changes)
+  * cached personal models of the affected users are invalidated after the
+    commit
+
+If a batch fails it is rolled back and retried one event at a time, so one
+bad event does not take the others with it.
+
+submit() returns a Future that completes when its event is written (or
+holds the error that dropped it). flush() waits until everything submitted
+so far is written (reads that must see a user's own writes call it first);
+close() drains the queue and stops the writer, and is registered with
+atexit. With synchronous=True (or PERSONAL_MODEL_WRITE_MODE=sync) submit()
+writes the event before returning and raises its errors, as the store_*
+functions used to.
+"""
+
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.aggregates import fetch_rows, record_changes
+from personal_model.model_cache import MODEL_CACHE
+from utils.db import get_connection
+
+# Most events written in one transaction
+BATCH_SIZE = 200
+# Seconds the writer waits for more events before writing a batch
+FLUSH_INTERVAL = 0.05
+# Events that can be waiting before submit() blocks
+MAX_PENDING = 10000
+# Seconds submit() blocks on a full queue before raising queue.Full
+SUBMIT_TIMEOUT = 5
+
+WRITE_MODE = os.getenv("PERSONAL_MODEL_WRITE_MODE", "async")
+
+# One write to an event table.
+#   sql:    INSERT/DELETE statement, params its parameters
+#   key:    (user_id, study_space_id) for tables keyed by user and spot
+#           (bookmarks, spot_feedback), None for append-only tables
+Event = namedtuple("Event", ["db_path", "table", "sql", "params", "user_id", "key"])
+
+_FLUSH = object()
+_STOP = object()
+
+
+def _rows_for_keys(cur, table, keys):
+    """Current rows for (user_id, study_space_id) keys, once each however the ids were typed"""
+    rows = {}
+    for key in keys:
+        for row in fetch_rows(cur, table, "user_id = ? AND study_space_id = ?", key):
+            rows[(row["user_id"], row["study_space_id"])] = row
+    return list(rows.values())
+
+
+def _write_run(cur, events):
+    """executemany() one run of events sharing a statement, keeping the aggregates in step"""
+    table = events[0].table
+    params = [e.params for e in events]
+    user_ids = list(dict.fromkeys(e.user_id for e in events))
+
+    if events[0].key is not None:
+        keys = list(dict.fromkeys(e.key for e in events))
+        before = _rows_for_keys(cur, table, keys)
+        cur.executemany(events[0].sql, params)
+        after = _rows_for_keys(cur, table, keys)
+    else:
+        # rowids only grow, so the new rows are the ones past the old maximum
+        last_rowid = cur.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {table}").fetchone()[0]
+        before = []
+        cur.executemany(events[0].sql, params)
+        after = fetch_rows(cur, table, "rowid > ?", (last_rowid,))
+
+    record_changes(cur, table, removed=before, added=after, user_ids=user_ids)
+
+
+def write_events(events):
+    """
+    Write events to their databases, one transaction per database, and
+    invalidate the affected users' cached models. Raises on failure, after
+    rolling back.
+    """
+    by_db = {}
+    for event in events:
+        by_db.setdefault(str(event.db_path), []).append(event)
+
+    for db_path, db_events in by_db.items():
+        conn = get_connection(db_path)
+        with conn:
+            # sqlite3 only issues BEGIN at the first INSERT/DELETE, so take the
+            # write lock before the rows each run is diffed against are read;
+            # otherwise another writer could commit in between and its rows
+            # would be counted as ours
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.cursor()
+            run = [db_events[0]]
+            for event in db_events[1:]:
+                if event.sql == run[0].sql:
+                    run.append(event)
+                else:
+                    _write_run(cur, run)
+                    run = [event]
+            _write_run(cur, run)
+
+    for user_id in dict.fromkeys(e.user_id for e in events):
+        MODEL_CACHE.invalidate(user_id)
+
+
+class EventQueue:
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_pending=MAX_PENDING, synchronous=WRITE_MODE == "sync"):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._submit_lock = threading.Lock()
+        self._done = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, event):
+        """
+        Queue one Event for writing (or write it now in synchronous mode);
+        returns a Future that completes once it is written
+        """
+        future = Future()
+        with self._submit_lock:
+            if not (self.synchronous or self._closed):
+                self._start()
+                self._queue.put((event, future), timeout=SUBMIT_TIMEOUT)
+                with self._done:
+                    self.submitted += 1
+                return future
+
+        write_events([event])
+        with self._done:
+            self.submitted += 1
+            self.written += 1
+            self.batches += 1
+        future.set_result(None)
+        return future
+
+    def flush(self, timeout=None):
+        """Wait until every event submitted before this call has been written (or has failed)"""
+        with self._done:
+            target = self.submitted
+            if self.written + self.failed >= target:
+                return True
+        # cut the writer's wait for a fuller batch short
+        self._queue.put(_FLUSH)
+        with self._done:
+            return self._done.wait_for(lambda: self.written + self.failed >= target, timeout)
+
+    def close(self):
+        """Write everything still queued and stop the writer thread"""
+        with self._submit_lock:
+            self._closed = True
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def stats(self):
+        with self._done:
+            return {
+                "mode": "sync" if self.synchronous else "async",
+                "pending": self.submitted - self.written - self.failed,
+                "submitted": self.submitted,
+                "written": self.written,
+                "failed": self.failed,
+                "batches": self.batches,
+            }
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="personal-model-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _next_batch(self):
+        """Block for the next event, then gather more for up to flush_interval; None once stopped"""
+        item = self._queue.get()
+        while item is _FLUSH:
+            item = self._queue.get()
+        if item is _STOP:
+            return None
+
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _FLUSH:
+                break
+            if item is _STOP:
+                # write what we have, then stop
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._write(batch)
+
+    def _write(self, batch):
+        """Write a batch of (event, future) pairs and complete their futures"""
+        errors = [None] * len(batch)
+        try:
+            write_events([event for event, _ in batch])
+        except Exception as e:
+            print(f"[event_queue] Batch of {len(batch)} events failed ({e}); retrying one at a time")
+            for i, (event, _) in enumerate(batch):
+                try:
+                    write_events([event])
+                except Exception as e:
+                    errors[i] = e
+                    print(f"[event_queue] Dropped {event.table} event for {event.user_id}: {e}")
+
+        failed = sum(error is not None for error in errors)
+        with self._done:
+            self.written += len(batch) - failed
+            self.failed += failed
+            self.batches += 1
+            self._done.notify_all()
+
+        for (_, future), error in zip(batch, errors):
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+
+EVENT_QUEUE = EventQueue()
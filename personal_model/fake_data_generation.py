@@ -1,4 +1,5 @@
 import sqlite3
+import sys
 from pathlib import Path
 
 
@@ -8,6 +9,9 @@ APP_DB = BASE_DIR / "data" / "database" / "app.db"
 SCHEMA_PATH = BASE_DIR / "data" / "database" / "user_data_schema.sql"
 
 FAKE_DATA_PATH = BASE_DIR / "personal_model" / "fake_user_data.json"
+sys.path.append(str(BASE_DIR))
+
+from personal_model.aggregates import rebuild_all
 
 
 def main():
@@ -373,6 +377,9 @@ def main():
     user_conn.commit()
     user_conn.close()
 
+    # the rows above bypass store_personal_model_data, so rebuild the aggregates
+    rebuild_all(USER_DB, APP_DB)
+
     print("Fake user data inserted into user_data.db")
 
 
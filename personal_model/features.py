@@ -0,0 +1,101 @@
+"""
+features.py - One-hot matrix of the spot attributes the personal model scores
+
+The six attributes probability() looks at never change for a space, so each
+catalog version is encoded once into a matrix with one row per space and one
+column per (attribute, value) seen in the catalog. A user's smoothed
+marginals become a weight vector over the same columns, and scoring any set
+of spaces is one matrix-vector product:
+
+    score = X[rows] @ w,   w[(attr, value)] = sum over events of
+                           event_weight * P(attr = value | event) / n_attrs(event)
+
+which is the weighted average of score_spot_condition() over the events.
+Values a user has seen but no catalog space has (or NaN/None) get no
+column, exactly as a dict lookup for them never matched.
+"""
+
+import sys
+import weakref
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+PROBABILITY_ATTRS = [
+    "must_reserve", "tech_enhanced", "capacity",
+    "is_indoor", "is_talking_allowed", "has_printer"
+]
+
+# Feature matrices, built once per catalog version
+_features = weakref.WeakKeyDictionary()
+
+
+class SpaceFeatures:
+    """
+    rows:     {study_space_id: row index}, for spaces with a building
+              (spaces without one were never scored)
+    columns:  {(attr, value): column index}
+    matrix:   float64 array, len(rows) x len(columns), one 1 per attribute
+    """
+
+    def __init__(self, catalog, attrs=PROBABILITY_ATTRS):
+        self.attrs = attrs
+        spaces = [s for s in catalog.spaces.values() if s.building_name is not None]
+        self.rows = {s.study_space_id: i for i, s in enumerate(spaces)}
+
+        self.columns = {}
+        for attr in attrs:
+            for value in sorted({getattr(s, attr) for s in spaces if getattr(s, attr) is not None}):
+                self.columns[(attr, value)] = len(self.columns)
+
+        self.matrix = np.zeros((len(spaces), len(self.columns)))
+        for i, space in enumerate(spaces):
+            for attr in attrs:
+                column = self.columns.get((attr, getattr(space, attr)))
+                if column is not None:
+                    self.matrix[i, column] = 1.0
+
+    def weight_vector(self, weighted_prefs):
+        """
+        Encode [(event_weight, {attr: {value: probability}}), ...] as one
+        vector over the columns, normalised by the total event weight.
+        """
+        w = np.zeros(len(self.columns))
+        total_weight = sum(weight for weight, _ in weighted_prefs)
+        for weight, pref in weighted_prefs:
+            used = [a for a in self.attrs if pref.get(a)]
+            if not used:
+                continue
+            scale = weight / len(used) / total_weight
+            for attr in used:
+                for value, p in pref[attr].items():
+                    column = self.columns.get((attr, value))
+                    if column is not None:
+                        w[column] += scale * p
+        return w
+
+    def score(self, spots, w):
+        """
+        [(spot, score)] for the spots that have a feature row, in input order;
+        ids that are unknown or have no building are left out.
+        """
+        known = [spot for spot in spots if spot in self.rows]
+        if not known:
+            return []
+        scores = self.matrix[[self.rows[spot] for spot in known]] @ w
+        return list(zip(known, scores.tolist()))
+
+    def score_all(self, w):
+        """{study_space_id: score} for every space in the catalog"""
+        return dict(zip(self.rows, (self.matrix @ w).tolist()))
+
+
+def space_features(catalog):
+    """The SpaceFeatures for a catalog version, built on first use"""
+    features = _features.get(catalog)
+    if features is None:
+        features = _features[catalog] = SpaceFeatures(catalog)
+    return features
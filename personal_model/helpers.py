@@ -7,6 +7,7 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT_DIR))
 
 from personal_model.floor_info import correspondence
+from utils.db import get_connection
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
@@ -47,9 +48,9 @@ def get_closest_time_weather(date, start_time):
         LIMIT 1;
     """
 
-    with sqlite3.connect(APP_DB) as conn:
-        conn.row_factory = sqlite3.Row
-        row = conn.execute(query, (d, t)).fetchone()
+    cur = get_connection(APP_DB).cursor()
+    cur.row_factory = sqlite3.Row
+    row = cur.execute(query, (d, t)).fetchone()
     return dict(row)["weather_text"] if row else None
 
 def avg_traffic_between(building_id: str, location_name: str, start_date: str, start_hour: str, end_date: str, end_hour: str):
@@ -86,9 +87,9 @@ def avg_traffic_between(building_id: str, location_name: str, start_date: str, s
     FROM hourly;
     """
 
-    with sqlite3.connect(APP_DB) as conn:
-        conn.row_factory = sqlite3.Row
-        row = conn.execute(sql, (building_id, location_name, start_iso, end_iso)).fetchone()
+    cur = get_connection(APP_DB).cursor()
+    cur.row_factory = sqlite3.Row
+    row = cur.execute(sql, (building_id, location_name, start_iso, end_iso)).fetchone()
 
     # If no data at all in that interval
     if row is None or row["hours_counted"] == 0:
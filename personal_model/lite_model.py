@@ -0,0 +1,138 @@
+"""
+lite_model.py - PersonalModel without pandas, for the search hot path
+
+Most users have a handful of events, so building DataFrames, merging them
+against the catalog and casting columns costs far more than the statistics
+themselves. LitePersonalModel answers the same questions from the user's
+user_profile_aggregates rows (see aggregates.py) and the catalog records:
+
+    user_context_for_ranking()   same dict as PersonalModel's
+    probability(spots)           same (spot, score) list, best first
+    low_rating_spot(feedback)    spot_feedback rows -> ids rated below 3
+    bookmarks_room(bookmarks)    bookmarks rows -> ids, newest first
+
+PersonalModel stays the reference implementation for offline analysis;
+model_cache.py picks which one search uses (PERSONAL_MODEL_IMPL).
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.aggregates import (
+    bookmarked_spots,
+    fetch_rows,
+    load_aggregates,
+    low_rating_spots,
+    reserved_hours,
+    user_context_from_aggregates,
+    _parse_value,
+)
+from personal_model.features import PROBABILITY_ATTRS, space_features
+from utils.catalog import get_catalog
+from utils.db import get_connection
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
+APP_DB = BASE_DIR / "data" / "database" / "app.db"
+
+
+class _Missing:
+    """
+    Key for events whose spot attribute is unknown. pandas counts those as
+    NaN, which takes part in the smoothing but never matches a spot.
+    """
+
+    def __repr__(self):
+        return "<missing>"
+
+
+MISSING = _Missing()
+
+
+class LitePersonalModel():
+    def __init__(self, user_id, USER_DB=USER_DB, APP_DB=APP_DB):
+        self.user_id = user_id
+        self.USER_DB = USER_DB
+        self.APP_DB = APP_DB
+        self.today = date.today().isoformat()
+
+        self.aggregates = load_aggregates(user_id, USER_DB, APP_DB, self.today)
+
+        cur = get_connection(USER_DB).cursor()
+        self.feedback = fetch_rows(cur, "spot_feedback", "user_id = ?", (user_id,))
+        self.bookmarks = fetch_rows(cur, "bookmarks", "user_id = ?", (user_id,))
+
+        self.hours = reserved_hours(self.aggregates, self.today)
+
+    def event_count(self, event_type):
+        return self.aggregates[event_type].get("count", (0, 0))[0]
+
+    def low_rating_spot(self, feedback):
+        return low_rating_spots(feedback)
+
+    def bookmarks_room(self, bookmarks):
+        return bookmarked_spots(bookmarks)
+
+    def user_context_for_ranking(self):
+        self.user_context = user_context_from_aggregates(self.aggregates, self.feedback, self.bookmarks, self.today)
+        self.event_stats = self.user_context["event_stats"]
+        self.average_preference = self.user_context["average_preference"]
+        self.filter_preference = self.user_context["preference"]
+        self.history = self.user_context["history"]
+        self.low_rating = self.user_context["low_rating_rooms"]
+        self.bookmarks_spots = self.user_context["bookmarks"]
+        return self.user_context
+
+    def filter_out_low_rating_spot(self, spots):
+        # same in-place removal as PersonalModel, so both return the same spots
+        for spot in spots:
+            if spot in self.low_rating:
+                spots.remove(spot)
+        return spots
+
+    def build_marginal_pref(self, event_type, attrs, alpha=1.0):
+        """
+        PersonalModel.build_marginal_pref() from the "<attr>=<value>" counts:
+        {attr: {value: (count + alpha) / (n + alpha * k)}}
+        """
+        counts = self.aggregates[event_type]
+        n = self.event_count(event_type)
+        if n == 0:
+            return {a: {} for a in attrs}
+
+        pref = {}
+        for a in attrs:
+            prefix = a + "="
+            histogram = {}
+            for attribute, (c, _) in counts.items():
+                if attribute.startswith(prefix):
+                    value = _parse_value(attribute[len(prefix):])
+                    histogram[MISSING if value is None else value] = c
+
+            k = len(histogram)
+            pref[a] = {val: (c + alpha) / (n + alpha * k) for val, c in histogram.items()}
+        return pref
+
+    def probability(self, spots):
+        #given a list of spot_id, return the probability that the user will like the spot in descending order
+        spots = self.filter_out_low_rating_spot(spots)
+
+        # cold-start check
+        if not (self.event_count("study_sessions") or self.event_count("bookmarks") or self.event_count("spot_detail_views")):
+            return [(spot, 0.5) for spot in spots]
+
+        attrs = PROBABILITY_ATTRS
+        pref_sessions = self.build_marginal_pref("study_sessions", attrs)
+        pref_bookmarks = self.build_marginal_pref("bookmarks", attrs)
+        pref_views = self.build_marginal_pref("spot_detail_views", attrs)
+
+        weighted_prefs = [(1.0, pref_sessions), (1.5, pref_bookmarks), (0.5, pref_views)]
+
+        features = space_features(get_catalog(self.APP_DB).get())
+        results = features.score(spots, features.weight_vector(weighted_prefs))
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results
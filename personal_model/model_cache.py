@@ -0,0 +1,118 @@
+"""
+model_cache.py - Keep fitted PersonalModels in memory between searches
+
+Building a personal model reads the user's events (or their aggregates),
+joins them against the catalog and derives every statistic, yet a user
+searches many times for every event they generate. Fitted models (with
+user_context_for_ranking() already computed) are kept in a process-level LRU
+keyed by user_id.
+
+A cached model is thrown away when:
+  * store_personal_model_data writes an event for that user (invalidate())
+  * the date changes, since reserved hours are counted for "today"
+  * the catalog version changes, since events are joined against it
+
+PERSONAL_MODEL_IMPL chooses the implementation: "lite" (the default,
+LitePersonalModel reading user_profile_aggregates) or "pandas" (the original
+PersonalModel). pandas is only imported when it is selected.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.lite_model import LitePersonalModel, USER_DB, APP_DB
+from utils.catalog import get_catalog
+
+MAX_MODELS = 256
+PERSONAL_MODEL_IMPL = os.getenv("PERSONAL_MODEL_IMPL", "lite")
+
+
+def model_class(impl=PERSONAL_MODEL_IMPL):
+    """The PersonalModel implementation named by impl ("lite" or "pandas")"""
+    if impl == "lite":
+        return LitePersonalModel
+    if impl == "pandas":
+        from personal_model.personal_model_process import PersonalModel
+        return PersonalModel
+    raise ValueError(f"Unknown PERSONAL_MODEL_IMPL: {impl!r}")
+
+
+class ModelCache:
+    def __init__(self, max_models=MAX_MODELS, impl=PERSONAL_MODEL_IMPL):
+        self.max_models = max_models
+        self.model_class = model_class(impl)
+        self._lock = threading.Lock()
+        self._models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # bumped by every invalidate(); a model built while any event was
+        # being written may already be stale, so it is returned but not cached
+        self._generation = 0
+
+    def get(self, user_id, USER_DB=USER_DB, APP_DB=APP_DB):
+        """
+        Return a fitted PersonalModel for user_id, building it on a miss.
+        The returned model is shared and must be treated as read-only.
+        """
+        key = (user_id, str(USER_DB), str(APP_DB))
+        stamp = (date.today().isoformat(), get_catalog(APP_DB).get().version)
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        model = self.model_class(user_id, USER_DB=USER_DB, APP_DB=APP_DB)
+        model.user_context_for_ranking()
+
+        with self._lock:
+            if generation != self._generation:
+                return model
+            self._models[key] = (stamp, model)
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+                self.evictions += 1
+        return model
+
+    def invalidate(self, user_id):
+        """Drop every cached model for user_id; call after committing one of their events"""
+        with self._lock:
+            self._generation += 1
+            stale = [key for key in self._models if key[0] == user_id]
+            for key in stale:
+                del self._models[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._models),
+                "max_size": self.max_models,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+MODEL_CACHE = ModelCache()
@@ -1,14 +1,40 @@
 from datetime import date
-import math
-import sqlite3
+import sys
+import weakref
 from pathlib import Path
 import pandas as pd
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.features import PROBABILITY_ATTRS, space_features
+from personal_model.preferences import analyze_stats, user_preference
+from utils.catalog import get_catalog
+from utils.db import get_connection
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
 APP_DB = BASE_DIR / "data" / "database" / "app.db"
 
+# DataFrames of the study_spaces / buildings tables, built once per catalog version
+_catalog_frames = weakref.WeakKeyDictionary()
+
+
+def catalog_frames(catalog):
+    frames = _catalog_frames.get(catalog)
+    if frames is None:
+        space_columns, space_rows = catalog.space_table
+        building_columns, building_rows = catalog.building_table
+        df_spaces = pd.DataFrame.from_records(space_rows, columns=space_columns, coerce_float=True)
+        df_buildings = pd.DataFrame.from_records(building_rows, columns=building_columns, coerce_float=True)
+
+        df_spaces["study_space_id"] = df_spaces["study_space_id"].astype("int64")
+        df_spaces["building_id"] = df_spaces["building_id"].astype("string")
+        df_buildings["building_id"] = df_buildings["building_id"].astype("string")
+
+        frames = _catalog_frames[catalog] = (df_spaces, df_buildings)
+    return frames
+
 
 class PersonalModel():
     def __init__(self, user_id, USER_DB=USER_DB, APP_DB=APP_DB):
@@ -36,23 +62,16 @@ class PersonalModel():
         return hours
 
     def enrich_and_store(self):
-        # load dimension tables from APP_DB (static info)
-        with sqlite3.connect(self.APP_DB) as conn:
-            df_spaces = pd.read_sql_query("SELECT * FROM study_spaces;", conn)
-            df_buildings = pd.read_sql_query("SELECT * FROM buildings;", conn)
-
-        df_spaces["study_space_id"] = df_spaces["study_space_id"].astype("int64")
-        df_spaces["building_id"] = df_spaces["building_id"].astype("string")
-        df_buildings["building_id"] = df_buildings["building_id"].astype("string")
+        # dimension tables from APP_DB (static info), shared through the catalog
+        df_spaces, df_buildings = catalog_frames(get_catalog(self.APP_DB).get())
 
         # helper to load per-user event table from USER_DB
         def load_user_table(table_name: str) -> pd.DataFrame:
-            with sqlite3.connect(self.USER_DB) as conn:
-                return pd.read_sql_query(
-                    f"SELECT * FROM {table_name} WHERE user_id = ?;",
-                    conn,
-                    params=(self.user_id,)
-                )
+            return pd.read_sql_query(
+                f"SELECT * FROM {table_name} WHERE user_id = ?;",
+                get_connection(self.USER_DB),
+                params=(self.user_id,)
+            )
 
         # load the 4 event tables from USER_DB (filtered by user_id)
         df_sessions = load_user_table("study_sessions")
@@ -201,119 +220,10 @@ class PersonalModel():
     
 
     def analyze_stats(self, event_stats_list):
-        EVENT_WEIGHTS = {
-        "study_sessions": 1.0,
-        "bookmarks": 1.5,
-        "spot_detail_views": 0.5,
-        "search_filters": 0.5,
-        }
-
-        ATTRS = [
-            "avg_capacity",
-            "min_capacity",
-            "max_capacity",
-            "has_printer_pct",
-            "is_indoor_pct",
-            "is_talking_allowed_pct",
-            "tech_enhanced_pct",
-            "must_reserve_pct"
-        ]
-
-        DEFAULTS = {
-            "avg_capacity": 100.5,
-            "min_capacity": 1,
-            "max_capacity": 200,
-            "has_printer_pct": 0.5,
-            "is_indoor_pct": 0.5,
-            "is_talking_allowed_pct": 0.5,
-            "tech_enhanced_pct": 0.5,
-            "must_reserve_pct": 0.5
-        }
-
-        weighted_sum = {a: 0.0 for a in ATTRS}
-        total_weight = 0.0
-        average_traffic = None
-
-        for stats in event_stats_list:
-            event = stats.get("event")
-            w = EVENT_WEIGHTS.get(event)
-            if w is None:
-                continue
-
-            if event == "study_sessions":
-                average_traffic = stats.get("session_traffic")
-
-            if stats.get("count", 0) == 0:
-                continue
-
-            for a in ATTRS:
-                val = stats.get(a)
-                if val is not None and not (isinstance(val, float) and math.isnan(val)):
-                    weighted_sum[a] += w * val
-
-            total_weight += w
-
-        result = {}
-
-        # cold start case
-        if total_weight == 0:
-            result = DEFAULTS.copy()
-        else:
-            for a in ATTRS:
-                value = weighted_sum[a] / total_weight
-                if isinstance(value, float) and math.isnan(value):
-                    result[a] = DEFAULTS[a]
-                else:
-                    result[a] = value
-
-        # handle traffic default
-        result["library_traffic"] = 0.5 if average_traffic is None else average_traffic
-        result["can_reserve_room"] = 1 if  total_weight == 0 or self.hours <= 2 and result.get("must_reserve_pct") > 0.5 else 0
-        return result
+        return analyze_stats(event_stats_list, self.hours)
 
     def user_preference(self, average_preference):
-        preference = {}
-
-        min_capacity = average_preference.get("min_capacity")
-        max_capacity = average_preference.get("max_capacity")
-
-        preference["min_capacity"] = math.floor(min_capacity) if min_capacity is not None else None
-        preference["max_capacity"] = math.ceil(max_capacity) if max_capacity is not None else None
-
-        indoor_pct = average_preference.get("is_indoor_pct")
-        preference["is_indoor"] = (
-            0 if indoor_pct is not None and indoor_pct < 0.5
-            else 1 if indoor_pct is not None
-            else None
-        )
-
-        talking_pct = average_preference.get("is_talking_allowed_pct")
-        preference["is_talking_allowed"] = (
-            0 if talking_pct is not None and talking_pct < 0.5
-            else 1 if talking_pct is not None
-            else None
-        )
-
-        library_traffic = average_preference.get("library_traffic")
-        if library_traffic is not None:
-            preference["library_traffic_range"] = (
-                max(0, library_traffic - 0.2),
-                min(1, library_traffic + 0.2),
-            )
-        else:
-            preference["library_traffic_range"] = None
-
-        printer_pct = average_preference.get("has_printer_pct")
-        preference["has_printer"] = (
-            0 if printer_pct is not None and printer_pct < 0.5
-            else 1 if printer_pct is not None
-            else None
-        )
-        preference['must_reserve'] = (
-            0 if self.hours >= 2 or average_preference.get("must_reserve_pct") < 0.5
-            else 1
-        )
-        return preference
+        return user_preference(average_preference, self.hours)
 
     def room_history(self, df_sessions):
         history = {
@@ -429,49 +339,26 @@ class PersonalModel():
             
     def probability(self, spots):
         #given a list of spot_id, return the probability that the user will like the spot in descending order
-        results = []
         spots = self.filter_out_low_rating_spot(spots)
 
         # cold-start check
         if self.df_sessions.empty and self.df_bookmarks.empty and self.df_views.empty:
             return [(spot, 0.5) for spot in spots]
 
-        attrs = [
-            "must_reserve", "tech_enhanced", "capacity",
-            "is_indoor", "is_talking_allowed", "has_printer"
-        ]
+        attrs = PROBABILITY_ATTRS
 
         pref_sessions  = self.build_marginal_pref(self.df_sessions, attrs)
         pref_bookmarks = self.build_marginal_pref(self.df_bookmarks, attrs)
         pref_views     = self.build_marginal_pref(self.df_views, attrs)
 
-        for spot in spots:
-            with sqlite3.connect(self.APP_DB) as conn:
-                query = """
-                    SELECT s.must_reserve, s.tech_enhanced, s.capacity,
-                        s.is_indoor, s.is_talking_allowed, b.has_printer
-                    FROM study_spaces s
-                    JOIN buildings b
-                    ON s.building_id = b.building_id
-                    WHERE s.study_space_id = ?
-                """
-                df = pd.read_sql_query(query, conn, params=(spot,))
-                spot_condition = df.iloc[0].to_dict()
-
-            s_score = self.score_spot_condition(pref_sessions, spot_condition)
-            b_score = self.score_spot_condition(pref_bookmarks, spot_condition)
-            v_score = self.score_spot_condition(pref_views, spot_condition)
-
-            final_score = (1.0*s_score + 1.5*b_score + 0.5*v_score) / (1.0 + 1.5 + 0.5)
-
-            results.append((spot, final_score))
+        weighted_prefs = [(1.0, pref_sessions), (1.5, pref_bookmarks), (0.5, pref_views)]
 
+        # one matrix-vector product over the catalog's one-hot spot features;
+        # spots without a building row can't be scored (the old JOIN found nothing for them)
+        features = space_features(get_catalog(self.APP_DB).get())
+        results = features.score(spots, features.weight_vector(weighted_prefs))
         results.sort(key=lambda x: x[1], reverse=True)
         return results
-                
-
-    
-
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+"""
+preferences.py - Turn per-event statistics into ranking preferences
+
+Pure functions shared by PersonalModel (which computes the event statistics
+with pandas) and by the aggregate loader in aggregates.py and
+LitePersonalModel (which read them from user_profile_aggregates). Nothing
+here depends on pandas.
+
+For search_filters, avg_capacity is the mean of min_capacity and of
+max_capacity side by side (a pandas Series from PersonalModel, a dict from the
+aggregates); it is weighted element-wise.
+"""
+
+import math
+
+EVENT_WEIGHTS = {
+    "study_sessions": 1.0,
+    "bookmarks": 1.5,
+    "spot_detail_views": 0.5,
+    "search_filters": 0.5,
+}
+
+ATTRS = [
+    "avg_capacity",
+    "min_capacity",
+    "max_capacity",
+    "has_printer_pct",
+    "is_indoor_pct",
+    "is_talking_allowed_pct",
+    "tech_enhanced_pct",
+    "must_reserve_pct"
+]
+
+DEFAULTS = {
+    "avg_capacity": 100.5,
+    "min_capacity": 1,
+    "max_capacity": 200,
+    "has_printer_pct": 0.5,
+    "is_indoor_pct": 0.5,
+    "is_talking_allowed_pct": 0.5,
+    "tech_enhanced_pct": 0.5,
+    "must_reserve_pct": 0.5
+}
+
+
+def _is_nan(value):
+    return isinstance(value, float) and math.isnan(value)
+
+
+def _add_weighted(total, weight, value):
+    if isinstance(value, dict):
+        if not isinstance(total, dict):
+            total = {k: total for k in value}
+        return {k: total[k] + weight * v for k, v in value.items()}
+    return total + weight * value
+
+
+def _divide(value, divisor):
+    if isinstance(value, dict):
+        return {k: v / divisor for k, v in value.items()}
+    return value / divisor
+
+
+def analyze_stats(event_stats_list, hours):
+    """
+    Weighted average of the per-event statistics (sessions, bookmarks,
+    views, search filters), falling back to DEFAULTS for a cold start.
+
+    Args:
+        event_stats_list (list[dict]): Output of PersonalModel.event_stats()
+        hours (float): Hours of reserved rooms the user has used today
+    """
+    weighted_sum = {a: 0.0 for a in ATTRS}
+    total_weight = 0.0
+    average_traffic = None
+
+    for stats in event_stats_list:
+        event = stats.get("event")
+        w = EVENT_WEIGHTS.get(event)
+        if w is None:
+            continue
+
+        if event == "study_sessions":
+            average_traffic = stats.get("session_traffic")
+
+        if stats.get("count", 0) == 0:
+            continue
+
+        for a in ATTRS:
+            val = stats.get(a)
+            if val is not None and not _is_nan(val):
+                weighted_sum[a] = _add_weighted(weighted_sum[a], w, val)
+
+        total_weight += w
+
+    result = {}
+
+    # cold start case
+    if total_weight == 0:
+        result = DEFAULTS.copy()
+    else:
+        for a in ATTRS:
+            value = _divide(weighted_sum[a], total_weight)
+            if _is_nan(value):
+                result[a] = DEFAULTS[a]
+            else:
+                result[a] = value
+
+    # handle traffic default
+    result["library_traffic"] = 0.5 if average_traffic is None else average_traffic
+    result["can_reserve_room"] = 1 if  total_weight == 0 or hours <= 2 and result.get("must_reserve_pct") > 0.5 else 0
+    return result
+
+
+def user_preference(average_preference, hours):
+    """Preferences used as filters/ranking signals, derived from analyze_stats() output"""
+    preference = {}
+
+    min_capacity = average_preference.get("min_capacity")
+    max_capacity = average_preference.get("max_capacity")
+
+    preference["min_capacity"] = math.floor(min_capacity) if min_capacity is not None else None
+    preference["max_capacity"] = math.ceil(max_capacity) if max_capacity is not None else None
+
+    indoor_pct = average_preference.get("is_indoor_pct")
+    preference["is_indoor"] = (
+        0 if indoor_pct is not None and indoor_pct < 0.5
+        else 1 if indoor_pct is not None
+        else None
+    )
+
+    talking_pct = average_preference.get("is_talking_allowed_pct")
+    preference["is_talking_allowed"] = (
+        0 if talking_pct is not None and talking_pct < 0.5
+        else 1 if talking_pct is not None
+        else None
+    )
+
+    library_traffic = average_preference.get("library_traffic")
+    if library_traffic is not None:
+        preference["library_traffic_range"] = (
+            max(0, library_traffic - 0.2),
+            min(1, library_traffic + 0.2),
+        )
+    else:
+        preference["library_traffic_range"] = None
+
+    printer_pct = average_preference.get("has_printer_pct")
+    preference["has_printer"] = (
+        0 if printer_pct is not None and printer_pct < 0.5
+        else 1 if printer_pct is not None
+        else None
+    )
+    preference['must_reserve'] = (
+        0 if hours >= 2 or average_preference.get("must_reserve_pct") < 0.5
+        else 1
+    )
+    return preference
+
@@ -0,0 +1,182 @@
+"""
+session_enrichment.py - Fill in study-session traffic and weather off the request path
+
+Looking up a session's library traffic (avg_traffic_between, or the
+hour-by-hour non_library_traffic estimate) and the closest hourly weather
+used to happen inside store_study_session, which sits behind the app's
+"stop studying" button. Sessions are now stored with session_traffic and
+start_weather_time_local left NULL and enriched_at NULL, and SESSION_ENRICHER
+fills them in afterwards:
+
+  * store_study_session() calls SESSION_ENRICHER.notify(); the worker thread
+    wakes up, flushes the event queue (so the new rows are committed) and
+    enriches every pending session, BATCH_SIZE rows per transaction
+  * it also wakes every POLL_INTERVAL seconds to pick up anything left over,
+    e.g. sessions stored just before a restart
+  * user_profile_aggregates is updated with the new session_traffic values
+    and cached models of the affected users are invalidated
+
+enriched_at marks a session as done (even if no traffic or weather could be
+found), so rows are never looked up twice. Running this file enriches
+every pending session, e.g. historical rows bulk-loaded without enrichment:
+
+    python personal_model/session_enrichment.py
+"""
+
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.aggregates import fetch_rows, record_changes
+from personal_model.event_queue import EVENT_QUEUE
+from personal_model.helpers import get_closest_time_weather, get_library_traffic
+from personal_model.model_cache import MODEL_CACHE
+from utils.db import get_connection
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
+
+# Sessions enriched per transaction
+BATCH_SIZE = 100
+# Seconds between checks for pending sessions when nothing calls notify()
+POLL_INTERVAL = 60
+
+_migrated = set()
+
+
+def ensure_enrichment_column(cur):
+    """
+    Add study_sessions.enriched_at to databases created before it existed.
+    Sessions that already have traffic or weather were enriched on insert.
+    """
+    cur.execute("PRAGMA table_info(study_sessions)")
+    if "enriched_at" not in [row[1] for row in cur.fetchall()]:
+        cur.execute("ALTER TABLE study_sessions ADD COLUMN enriched_at TEXT")
+        cur.execute("""
+            UPDATE study_sessions SET enriched_at = CURRENT_TIMESTAMP
+            WHERE session_traffic IS NOT NULL OR start_weather_time_local IS NOT NULL
+        """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sessions_pending_enrichment
+        ON study_sessions(session_id) WHERE enriched_at IS NULL
+    """)
+
+
+def _lookup(row):
+    """(session_traffic, start_weather_time_local) for one session row"""
+    try:
+        traffic = get_library_traffic(row["building_id"], row["study_space_id"], row["started_at"], row["ended_at"], row["start_date"], row["end_date"])
+        weather = get_closest_time_weather(row["start_date"], row["started_at"])
+        return traffic, weather
+    except Exception as e:
+        # malformed times etc.; mark the row done rather than retrying forever
+        print(f"[session_enrichment] Could not enrich session {row['session_id']}: {e}")
+        return None, None
+
+
+def enrich_pending(user_db=USER_DB, batch_size=BATCH_SIZE, debug=False):
+    """Enrich up to batch_size pending sessions in one transaction; returns how many"""
+    conn = get_connection(user_db)
+    cur = conn.cursor()
+    if str(user_db) not in _migrated:
+        with conn:
+            ensure_enrichment_column(cur)
+        _migrated.add(str(user_db))
+
+    pending = fetch_rows(cur, "study_sessions", "enriched_at IS NULL ORDER BY session_id LIMIT ?", (batch_size,))
+    if not pending:
+        return 0
+
+    # app.db lookups happen before the user_data.db write transaction opens
+    enriched_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    updates = []
+    for row in pending:
+        traffic, weather = _lookup(row)
+        if debug:
+            print(f"session {row['session_id']}: traffic {traffic}, weather {weather}")
+        updates.append((traffic, weather, enriched_at, row["session_id"]))
+
+    ids = [row["session_id"] for row in pending]
+    where = f"session_id IN ({', '.join('?' * len(ids))})"
+    with conn:
+        # lock before reading the rows the aggregates are diffed against, as
+        # event_queue.write_events() does
+        cur.execute("BEGIN IMMEDIATE")
+        before = fetch_rows(cur, "study_sessions", where, ids)
+        cur.executemany("""
+            UPDATE study_sessions SET
+                session_traffic = COALESCE(session_traffic, ?),
+                start_weather_time_local = COALESCE(start_weather_time_local, ?),
+                enriched_at = ?
+            WHERE session_id = ? AND enriched_at IS NULL
+        """, updates)
+        after = fetch_rows(cur, "study_sessions", where, ids)
+        record_changes(cur, "study_sessions", removed=before, added=after)
+
+    for user_id in dict.fromkeys(row["user_id"] for row in pending):
+        MODEL_CACHE.invalidate(user_id)
+    return len(pending)
+
+
+def enrich_all(user_db=USER_DB, batch_size=BATCH_SIZE, debug=False):
+    """Enrich every pending session, batch by batch; returns how many"""
+    total = 0
+    while True:
+        count = enrich_pending(user_db, batch_size, debug)
+        if count == 0:
+            return total
+        total += count
+
+
+class SessionEnricher:
+    def __init__(self, user_db=USER_DB, poll_interval=POLL_INTERVAL,
+                 synchronous=os.getenv("PERSONAL_MODEL_WRITE_MODE", "async") == "sync"):
+        # every database a session was stored in; USER_DB unless tests point elsewhere
+        self.user_dbs = {str(user_db)}
+        self.poll_interval = poll_interval
+        self.synchronous = synchronous
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.enriched = 0
+
+    def notify(self, user_db=None):
+        """A session was stored; enrich it soon (now, in synchronous mode)"""
+        if user_db is not None:
+            self.user_dbs.add(str(user_db))
+        if self.synchronous:
+            self._enrich()
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-enricher", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                self._enrich()
+            except Exception as e:
+                print(f"[session_enrichment] Enrichment pass failed: {e}")
+            self._wake.wait(self.poll_interval)
+
+    def _enrich(self):
+        EVENT_QUEUE.flush()
+        for user_db in list(self.user_dbs):
+            self.enriched += enrich_all(user_db)
+
+
+SESSION_ENRICHER = SessionEnricher()
+
+
+if __name__ == "__main__":
+    count = enrich_all(debug="--debug" in sys.argv)
+    print(f"  Enriched {count} study sessions")
@@ -1,13 +1,15 @@
 import datetime
-import sqlite3
 from pathlib import Path
 import sys
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT_DIR))
 
-from personal_model.helpers import get_closest_time_weather, get_library_traffic, round_to_nearest_hour
+from personal_model.helpers import get_closest_time_weather
+from personal_model.event_queue import EVENT_QUEUE, Event
+from personal_model.session_enrichment import SESSION_ENRICHER
 from utils.query import get_space_details
+from utils.db import get_connection
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
@@ -15,98 +17,91 @@ SCHEMA_PATH = BASE_DIR / "data" / "database" / "user_data_schema.sql"
 APP_DB = BASE_DIR / "data" / "database" / "app.db"
 
     
+def search_filter_event(user_id, filter):
+    """Event for one search_filters row"""
+    return Event(USER_DB, "search_filters", """
+        INSERT OR REPLACE INTO search_filters (
+            user_id,
+            min_capacity,
+            max_capacity,
+            tech_enhanced,
+            has_printer,
+            is_indoor,
+            is_talking_allowed
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            user_id,
+            filter["min_capacity"],
+            filter["max_capacity"],
+            filter["tech_enhanced"],
+            filter["has_printer"],
+            filter["is_indoor"],  
+            filter["is_talking_allowed"],
+        ), user_id, None)
+
+
 def store_filter_info(user_id, filter, debug):
     if debug:
         print(f"user id: {user_id}")
         print(f"filter data: {filter}")
     
-    user_conn = sqlite3.connect(USER_DB)
-    user_cur = user_conn.cursor()
-    user_cur.execute("""
-    INSERT OR REPLACE INTO search_filters (
-        user_id,
-        min_capacity,
-        max_capacity,
-        tech_enhanced,
-        has_printer,
-        is_indoor,
-        is_talking_allowed
-    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        user_id,
-        filter["min_capacity"],
-        filter["max_capacity"],
-        filter["tech_enhanced"],
-        filter["has_printer"],
-        filter["is_indoor"],  
-        filter["is_talking_allowed"],
-    ))
-    
-    user_conn.commit()
-    user_conn.close()
+    EVENT_QUEUE.submit(search_filter_event(user_id, filter))
 
-    print("user filter data inserted into user_data.db")
+    print("user filter data queued for user_data.db")
   
 
+def study_session_event(user_id, data):
+    """
+    Event for one study_sessions row. Traffic and weather are left NULL for
+    session_enrichment.py to fill in.
+    """
+    return Event(USER_DB, "study_sessions", """
+                INSERT OR REPLACE INTO study_sessions (
+                    user_id,
+                    study_space_id,
+                    building_id,
+                    started_at,
+                    ended_at,
+                    duration_ms,
+                    ended_reason,
+                    start_date,
+                    end_date,
+                    start_weather_time_local,
+                    session_traffic
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?,?,?,?)
+            """, (
+                user_id,
+                data["study_space_id"],
+                data["building_id"],
+                data["started_at"],
+                data["ended_at"],
+                data["duration_ms"],
+                None if "ended_reason" not in data.keys() else data["ended_reason"],
+                data["start_date"],
+                data["end_date"],
+                None,
+                None
+            ), user_id, None)
+
+
 def store_study_session(user_id:str, data:dict, debug:bool):
     if debug:
         print(f"user id: {user_id}")
         print(f"data: {data}")
     
-    start_time = data["started_at"]
-    end_time = data["ended_at"]
-    start_date = data["start_date"]
-    end_date = data["end_date"]
-    
-    session_traffic = get_library_traffic(data["building_id"], data["study_space_id"], start_time, end_time, start_date, end_date)
-
-    start_weather_time_local = get_closest_time_weather(start_date, start_time)
+    EVENT_QUEUE.submit(study_session_event(user_id, data))
+    SESSION_ENRICHER.notify(USER_DB)
 
-    if debug:
-        print(f"traffic: {session_traffic}")
-        print(f"weather: {start_weather_time_local}")
-
-    user_conn = sqlite3.connect(USER_DB)
-    user_cur = user_conn.cursor()
-    user_cur.execute("""
-            INSERT OR REPLACE INTO study_sessions (
-                user_id,
-                study_space_id,
-                building_id,
-                started_at,
-                ended_at,
-                duration_ms,
-                ended_reason,
-                start_date,
-                end_date,
-                start_weather_time_local,
-                session_traffic
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?,?,?,?)
-        """, (
-            user_id,
-            data["study_space_id"],
-            data["building_id"],
-            data["started_at"],
-            data["ended_at"],
-            data["duration_ms"],
-            None if "ended_reason" not in data.keys() else data["ended_reason"],
-            data["start_date"],
-            data["end_date"],
-            start_weather_time_local,
-            session_traffic
-        ))
-    
-    user_conn.commit()
-    user_conn.close()
-
-    print("user study session data inserted into user_data.db")    
+    print("user study session data queued for user_data.db")    
 
 def check_bookmark_status(user_id, study_space_id, debug=False):
     if debug:
         print(f"user_id: {user_id}")
         print(f"study_space_id: {study_space_id}")
 
-    user_conn = sqlite3.connect(USER_DB)
+    # the user's own queued bookmark writes must be visible
+    EVENT_QUEUE.flush()
+    user_conn = get_connection(USER_DB)
     user_cur = user_conn.cursor()
 
     user_cur.execute("""
@@ -123,8 +118,6 @@ def check_bookmark_status(user_id, study_space_id, debug=False):
 
     result = user_cur.fetchone()[0]  
 
-    user_conn.close()
-
     return bool(result)
 
 
@@ -132,7 +125,8 @@ def get_bookmarked_space_ids(user_id: str, debug: bool = False):
     if debug:
         print(f"user_id: {user_id}")
 
-    user_conn = sqlite3.connect(USER_DB)
+    EVENT_QUEUE.flush()
+    user_conn = get_connection(USER_DB)
     user_cur = user_conn.cursor()
 
     user_cur.execute("""
@@ -143,7 +137,6 @@ def get_bookmarked_space_ids(user_id: str, debug: bool = False):
     """, (user_id,))
 
     ids = [row[0] for row in user_cur.fetchall()]
-    user_conn.close()
 
     if debug:
         print(f"bookmarked ids: {ids}")
@@ -164,12 +157,7 @@ def get_bookmarked_space_info(user_id: str, debug: bool = False):
     if not bookmarked_ids:
         return []
     
-    user_conn = sqlite3.connect(APP_DB)
-    
-    try:
-        details = get_space_details(user_conn, bookmarked_ids)
-    finally:
-        user_conn.close()
+    details = get_space_details(get_connection(APP_DB), bookmarked_ids)
 
     id_to_idx = {str(sid): i for i, sid in enumerate(bookmarked_ids)}
     details.sort(key=lambda x: id_to_idx.get(str(x.get("id")), 10**9))
@@ -177,51 +165,78 @@ def get_bookmarked_space_info(user_id: str, debug: bool = False):
     if debug:
         print(f"returned {len(details)} bookmarked spaces")
     return details
+
+
+def add_bookmark_event(user_id, data):
+    """Event that adds (or replaces) one bookmark"""
+    return Event(USER_DB, "bookmarks", """
+            INSERT OR REPLACE INTO bookmarks (
+                user_id,
+                study_space_id,
+                building_id,
+                created_at
+            ) VALUES (?,?,?,?)
+            """, (
+                user_id,
+                data["study_space_id"],
+                data["building_id"],
+                data["created_at"]
+            ), user_id, (user_id, data["study_space_id"]))
+
+
 def store_bookmarks(user_id, data, debug):
     if debug:
         print(f"user_id: {user_id}")
         print(f"data: {data}")
 
-    user_conn = sqlite3.connect(USER_DB)
-    user_cur = user_conn.cursor()
-    user_cur.execute("""
-        INSERT OR REPLACE INTO bookmarks (
-            user_id,
-            study_space_id,
-            building_id,
-            created_at
-        ) VALUES (?,?,?,?)
-        """, (
-            user_id,
-            data["study_space_id"],
-            data["building_id"],
-            data["created_at"]
-        ))
-    
-    user_conn.commit()
-    user_conn.close()
+    EVENT_QUEUE.submit(add_bookmark_event(user_id, data))
+
+    print("user bookmarks data queued for user_data.db") 
+
+def delete_bookmark_event(user_id, data):
+    """Event that removes one bookmark"""
+    return Event(USER_DB, "bookmarks", """
+            DELETE FROM bookmarks
+            WHERE user_id = ? AND study_space_id = ?
+            """, (
+                user_id,
+                data["study_space_id"]
+            ), user_id, (user_id, data["study_space_id"]))
 
-    print("user bookmarks data inserted into user_data.db") 
 
 def delete_bookmarks(user_id, data, debug):
     if debug:
         print(f"user_id: {user_id}")
         print(f"data: {data}")
 
-    user_conn = sqlite3.connect(USER_DB)
-    user_cur = user_conn.cursor()
-    user_cur.execute("""
-        DELETE FROM bookmarks
-        WHERE user_id = ? AND study_space_id = ?
-        """, (
-            user_id,
-            data["study_space_id"]
-        ))
-    
-    user_conn.commit()
-    user_conn.close()
+    EVENT_QUEUE.submit(delete_bookmark_event(user_id, data))
 
-    print("user bookmarks data deleted from user_data.db") 
+    print("user bookmarks deletion queued for user_data.db") 
+
+
+def spot_view_event(user_id, data):
+    """Event for one spot_detail_views row"""
+    return Event(USER_DB, "spot_detail_views", """
+            INSERT OR REPLACE INTO spot_detail_views (
+                user_id,
+                study_space_id,
+                building_id,
+                opened_at,
+                closed_at,
+                dwell_ms,
+                source,
+                list_rank                    
+            ) VALUES (?,?,?,?,?,?,?,?)
+            """, (
+                user_id,
+                data["study_space_id"],
+                data["building_id"],
+                data["opened_at"],
+                data["closed_at"] if "closed_at" in data.keys() else None,
+                data["dwell_ms"] if "dwell_ms" in data.keys() else None,
+                data["source"] if "source" in data.keys() else None,
+                data["list_rank"] if "list_rank" in data.keys() else None
+            ), user_id, None)
 
 
 def store_spot_view(user_id, data, debug):
@@ -229,34 +244,28 @@ def store_spot_view(user_id, data, debug):
         print(f"user_id: {user_id}")
         print(f"data: {data}")
 
-    user_conn = sqlite3.connect(USER_DB)
-    user_cur = user_conn.cursor()
-    user_cur.execute("""
-        INSERT OR REPLACE INTO spot_detail_views (
-            user_id,
-            study_space_id,
-            building_id,
-            opened_at,
-            closed_at,
-            dwell_ms,
-            source,
-            list_rank                    
-        ) VALUES (?,?,?,?,?,?,?,?)
-        """, (
-            user_id,
-            data["study_space_id"],
-            data["building_id"],
-            data["opened_at"],
-            data["closed_at"] if "closed_at" in data.keys() else None,
-            data["dwell_ms"] if "dwell_ms" in data.keys() else None,
-            data["source"] if "source" in data.keys() else None,
-            data["list_rank"] if "list_rank" in data.keys() else None
-        ))
-    
-    user_conn.commit()
-    user_conn.close()
+    EVENT_QUEUE.submit(spot_view_event(user_id, data))
+
+    print("user spot view data queued for user_data.db") 
 
-    print("user bookmarks data inserted into user_data.db") 
+
+def spot_feedback_event(user_id, data):
+    """Event that sets the user's rating of one spot"""
+    return Event(USER_DB, "spot_feedback", """
+            INSERT OR REPLACE INTO spot_feedback(
+                user_id,
+                study_space_id,
+                building_id,
+                rating,
+                updated_at              
+            ) VALUES (?,?,?,?,?)
+            """, (
+                user_id,
+                data["study_space_id"],
+                data["building_id"],
+                data["rating"],
+                data["updated_at"]
+            ), user_id, (user_id, data["study_space_id"]))
 
 
 def store_spot_feedback(user_id, data, debug):
@@ -264,28 +273,89 @@ def store_spot_feedback(user_id, data, debug):
         print(f"user_id: {user_id}")
         print(f"data: {data}")
 
-    user_conn = sqlite3.connect(USER_DB)
-    user_cur = user_conn.cursor()
-    user_cur.execute("""
-        INSERT OR REPLACE INTO spot_feedback(
-            user_id,
-            study_space_id,
-            building_id,
-            rating,
-            updated_at              
-        ) VALUES (?,?,?,?,?)
-        """, (
-            user_id,
-            data["study_space_id"],
-            data["building_id"],
-            data["rating"],
-            data["updated_at"]
-        ))
-    
-    user_conn.commit()
-    user_conn.close()
+    EVENT_QUEUE.submit(spot_feedback_event(user_id, data))
+
+    print("user spot feedback data queued for user_data.db") 
+
+
+# Bulk event types: required fields (the same the single-event endpoints
+# check) and the function building the Event
+EVENT_TYPES = {
+    "search_filter": (("min_capacity", "max_capacity", "tech_enhanced", "has_printer", "is_indoor", "is_talking_allowed"), search_filter_event),
+    "study_session": (("study_space_id", "building_id", "started_at", "ended_at", "start_date", "end_date"), study_session_event),
+    "add_bookmark": (("study_space_id", "building_id", "created_at"), add_bookmark_event),
+    "delete_bookmark": (("study_space_id",), delete_bookmark_event),
+    "spot_view": (("study_space_id", "building_id", "opened_at"), spot_view_event),
+    "spot_feedback": (("study_space_id", "building_id", "rating", "updated_at"), spot_feedback_event),
+}
+
+
+def missing_fields(event_type, data):
+    """Required fields of event_type that data lacks"""
+    required, _ = EVENT_TYPES[event_type]
+    return [f for f in required if f not in data]
 
-    print("user spot feedback data inserted into user_data.db") 
+
+def store_events(user_id, events, debug):
+    """
+    Write a list of {"type": ..., "data": {...}} events for one user, e.g. a
+    client's offline buffer, and return one status per event:
+    {"index", "type", "status": "stored" | "invalid" | "failed", "error"?}
+
+    Valid events go through EVENT_QUEUE like single events do, so they are
+    written in the order given, after anything the user sent before, and
+    batched with them; the call returns once every one of them is written
+    or has failed.
+    """
+    results = [None] * len(events)
+    valid = []
+    for i, item in enumerate(events):
+        event_type = item.get("type") if isinstance(item, dict) else None
+        data = item.get("data") if isinstance(item, dict) else None
+
+        if event_type not in EVENT_TYPES:
+            results[i] = {"index": i, "type": event_type, "status": "invalid", "error": "unknown event type"}
+            continue
+        if not isinstance(data, dict):
+            results[i] = {"index": i, "type": event_type, "status": "invalid", "error": "data must be a JSON object"}
+            continue
+        missing = missing_fields(event_type, data)
+        if missing:
+            results[i] = {"index": i, "type": event_type, "status": "invalid", "error": f"{event_type} miss required fields ({', '.join(missing)})"}
+            continue
+
+        try:
+            event = EVENT_TYPES[event_type][1](user_id, data)
+        except KeyError as e:
+            results[i] = {"index": i, "type": event_type, "status": "invalid", "error": f"{event_type} miss field {e}"}
+            continue
+        valid.append((i, event_type, event))
+
+    if debug:
+        print(f"user_id: {user_id}")
+        print(f"valid events: {len(valid)}")
+
+    submitted = []
+    for i, event_type, event in valid:
+        try:
+            submitted.append((i, event_type, EVENT_QUEUE.submit(event)))
+        except Exception as e:
+            # synchronous mode writes (and fails) right here
+            results[i] = {"index": i, "type": event_type, "status": "failed", "error": str(e)}
+
+    for i, event_type, future in submitted:
+        error = future.exception()
+        if error is None:
+            results[i] = {"index": i, "type": event_type, "status": "stored"}
+        else:
+            results[i] = {"index": i, "type": event_type, "status": "failed", "error": str(error)}
+
+    if any(event.table == "study_sessions" for _, _, event in valid):
+        SESSION_ENRICHER.notify(USER_DB)
+
+    stored = sum(r["status"] == "stored" for r in results)
+    print(f"{stored} of {len(events)} user events stored in user_data.db")
+    return results
 
 
 def add_user(user_id, data, debug):
@@ -294,20 +364,18 @@ def add_user(user_id, data, debug):
         print(f"data: {data}")
     
 
-    user_conn = sqlite3.connect(USER_DB)
-    user_cur = user_conn.cursor()
-    user_cur.execute("""
-        INSERT INTO users (
-            user_id,
-            created_at      
-        ) VALUES (?,?)
-        """, (
-            user_id,
-            data["created_at"],
-        ))
-    
-    user_conn.commit()
-    user_conn.close()
+    user_conn = get_connection(USER_DB)
+    with user_conn:
+        user_cur = user_conn.cursor()
+        user_cur.execute("""
+            INSERT INTO users (
+                user_id,
+                created_at      
+            ) VALUES (?,?)
+            """, (
+                user_id,
+                data["created_at"],
+            ))
 
     print("user inserted into user_data.db") 
 
@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model import store_personal_model_data as store
+from personal_model.event_queue import EventQueue
+from personal_model.session_enrichment import SessionEnricher
+from support import scratch_user_db
+
+
+@pytest.fixture
+def user_db(tmp_path, monkeypatch):
+    """
+    Point the store_* functions at a scratch user_data.db, with events and
+    session enrichment written synchronously. Tests that need another
+    EVENT_QUEUE monkeypatch it over this one.
+    """
+    db_path = scratch_user_db(tmp_path)
+    monkeypatch.setattr(store, "USER_DB", db_path)
+    monkeypatch.setattr(store, "EVENT_QUEUE", EventQueue(synchronous=True))
+    monkeypatch.setattr(store, "SESSION_ENRICHER", SessionEnricher(db_path, synchronous=True))
+    return db_path
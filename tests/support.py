@@ -0,0 +1,77 @@
+"""
+Helpers shared by the personal-model tests: scratch copies of user_data.db
+and checks that the aggregates agree with the pandas PersonalModel.
+"""
+
+import math
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.aggregates import load_user_context, rebuild_all
+from personal_model.personal_model_process import PersonalModel
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
+APP_DB = BASE_DIR / "data" / "database" / "app.db"
+
+
+def scratch_user_db(tmp_path):
+    """A copy of user_data.db under tmp_path with freshly rebuilt aggregates"""
+    db_path = tmp_path / "user_data.db"
+    shutil.copy(USER_DB, db_path)
+    rebuild_all(db_path, APP_DB)
+    return db_path
+
+
+def plain(value):
+    """Turn pandas/numpy values into plain Python for comparison"""
+    if isinstance(value, pd.Series):
+        return plain(value.to_dict())
+    if isinstance(value, dict):
+        return {str(k): plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(v) for v in value]
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def assert_same(actual, expected, path="context"):
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict), path
+        assert set(actual) == set(expected), path
+        for key in expected:
+            assert_same(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert isinstance(actual, list) and len(actual) == len(expected), path
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            assert_same(a, e, f"{path}[{i}]")
+    elif isinstance(expected, float) and isinstance(actual, (int, float)):
+        if math.isnan(expected):
+            assert math.isnan(actual), path
+        else:
+            assert math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-9), path
+    else:
+        assert actual == expected, path
+
+
+def user_ids(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT user_id FROM users")]
+    finally:
+        conn.close()
+
+
+def assert_matches_pandas_model(db_path):
+    for user_id in user_ids(db_path):
+        expected = PersonalModel(user_id, USER_DB=db_path, APP_DB=APP_DB).user_context_for_ranking()
+        actual = load_user_context(user_id, db_path, APP_DB)
+        assert_same(plain(actual), plain(expected), user_id)
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model import store_personal_model_data as store
+from support import assert_matches_pandas_model, scratch_user_db
+
+
+def test_aggregates_match_pandas_model(tmp_path):
+    assert_matches_pandas_model(scratch_user_db(tmp_path))
+
+
+def test_writes_keep_aggregates_current(user_db):
+    db_path = user_db
+
+    store.store_filter_info("USER_002", {
+        "min_capacity": 3,
+        "max_capacity": 12,
+        "tech_enhanced": 1,
+        "has_printer": 1,
+        "is_indoor": 1,
+        "is_talking_allowed": 0,
+    }, debug=False)
+    store.store_study_session("USER_002", {
+        "study_space_id": 44696,
+        "building_id": "LLIB",
+        "started_at": "10:23",
+        "ended_at": "13:45",
+        "start_date": "2026-02-09",
+        "end_date": "2026-02-09",
+        "duration_ms": 3 * 60 * 60 * 1000,
+        "ended_reason": "user_left",
+    }, debug=False)
+    store.store_spot_view("USER_002", {
+        "study_space_id": 44668,
+        "building_id": "SLIB",
+        "opened_at": "2026-02-22 17:30:00",
+        "closed_at": "2026-02-22 17:35:30",
+        "dwell_ms": 330000,
+    }, debug=False)
+
+    # replacing and deleting must take the old row's contribution back out
+    bookmark = {"study_space_id": 44668, "building_id": "SLIB", "created_at": "2026-02-22 17:45:00"}
+    store.store_bookmarks("USER_002", bookmark, debug=False)
+    store.store_bookmarks("USER_002", dict(bookmark, created_at="2026-02-23 09:00:00"), debug=False)
+    store.store_spot_feedback("USER_002", {"study_space_id": 44668, "building_id": "SLIB", "rating": 2, "updated_at": "2026-02-22 18:00:00"}, debug=False)
+    store.store_spot_feedback("USER_002", {"study_space_id": 44668, "building_id": "SLIB", "rating": 5, "updated_at": "2026-02-22 18:05:00"}, debug=False)
+    store.EVENT_QUEUE.flush()
+    assert_matches_pandas_model(db_path)
+
+    store.delete_bookmarks("USER_002", bookmark, debug=False)
+    store.EVENT_QUEUE.flush()
+    assert_matches_pandas_model(db_path)
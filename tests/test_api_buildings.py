@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import api
+
+
+def test_buildings_honor_if_none_match():
+    client = api.app.test_client()
+
+    first = client.get("/api/buildings")
+    assert first.status_code == 200
+    assert first.get_json()["success"] is True
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/buildings", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+    changed = client.get("/api/buildings", headers={"If-None-Match": '"stale"'})
+    assert changed.status_code == 200
+    assert changed.data == first.data
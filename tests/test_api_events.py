@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import pytest
+
+import api
+from personal_model import store_personal_model_data as store
+from personal_model.event_queue import EventQueue
+from support import assert_matches_pandas_model
+
+
+@pytest.mark.parametrize("synchronous", [True, False])
+def test_bulk_events_report_per_event_status(user_db, monkeypatch, synchronous):
+    db_path = user_db
+    client = api.app.test_client()
+    queue = EventQueue(synchronous=synchronous)
+    monkeypatch.setattr(store, "EVENT_QUEUE", queue)
+
+    events = [
+        {"type": "spot_view", "data": {"study_space_id": 44668, "building_id": "SLIB", "opened_at": "2026-02-22 17:30:00"}},
+        {"type": "add_bookmark", "data": {"study_space_id": 44672, "building_id": "LLIB", "created_at": "2026-02-22 17:31:00"}},
+        {"type": "spot_view", "data": {"study_space_id": 44672, "building_id": "LLIB"}},
+        {"type": "spot_feedback", "data": {"study_space_id": 44672, "building_id": "LLIB", "rating": 1, "updated_at": "2026-02-22 17:32:00"}},
+        {"type": "add_bookmark", "data": {"study_space_id": 44700, "building_id": "LLIB", "created_at": None}},
+        {"type": "teleport", "data": {}},
+        {"type": "search_filter", "data": {"min_capacity": 2}},
+        {"type": "delete_bookmark", "data": {"study_space_id": 44672}},
+    ]
+    response = client.post("/api/personal_model/events", json={"user_id": "USER_003", "events": events})
+    assert response.status_code == 200
+    body = response.get_json()
+
+    assert [r["status"] for r in body["results"]] == [
+        "stored", "stored", "invalid", "stored", "failed", "invalid", "invalid", "stored",
+    ]
+    assert body["stored"] == 4
+    assert "opened_at" in body["results"][2]["error"]
+
+    # every valid event went through the queue; the bookmark was added and
+    # then deleted, in request order
+    assert queue.stats()["written"] == 4
+    assert not store.check_bookmark_status("USER_003", 44672)
+    queue.close()
+    assert_matches_pandas_model(db_path)
+
+
+def test_bulk_events_validate_the_request():
+    client = api.app.test_client()
+
+    assert client.post("/api/personal_model/events", json={"events": []}).status_code == 400
+    assert client.post("/api/personal_model/events", json={"user_id": "USER_003", "events": {}}).status_code == 400
+    too_many = [{"type": "spot_view", "data": {}}] * (api.MAX_BULK_EVENTS + 1)
+    assert client.post("/api/personal_model/events", json={"user_id": "USER_003", "events": too_many}).status_code == 400
@@ -0,0 +1,53 @@
+import sys
+import sqlite3
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.availability_index import AvailabilitySnapshot
+
+SCHEMA_PATH = ROOT_DIR / "data" / "database" / "schema.sql"
+
+
+def make_db():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA_PATH.read_text())
+    conn.executemany(
+        "INSERT INTO study_spaces (study_space_id, name, must_reserve) VALUES (?, ?, ?)",
+        [(1, "open table", 0), (2, "room a", 1), (3, "room b", 1), (4, "room c", 1)],
+    )
+    slots = [
+        # room a: 15:00 taken, 15:30 free
+        (2, "2026-03-16T15:00:00-07:00", "2026-03-16T15:30:00-07:00", 0, "now"),
+        (2, "2026-03-16T15:30:00-07:00", "2026-03-16T16:00:00-07:00", 1, "now"),
+        # room b: only a late-evening slot
+        (3, "2026-03-16T22:00:00-07:00", "2026-03-16T22:30:00-07:00", 1, "now"),
+        # room c: free, but scraped two days ago
+        (4, "2026-03-16T15:30:00-07:00", "2026-03-16T16:00:00-07:00", 1, "stale"),
+    ]
+    for space_id, start, end, available, age in slots:
+        modifier = "-1 hours" if age == "now" else "-48 hours"
+        conn.execute(
+            """INSERT INTO room_availability (study_space_id, start_time, end_time, is_available, scraped_at)
+               VALUES (?, ?, ?, ?, datetime('now', ?))""",
+            (space_id, start, end, available, modifier),
+        )
+    return conn
+
+
+def test_next_slot_requires_exact_fresh_open_slot():
+    snapshot = AvailabilitySnapshot.from_db(make_db())
+    ids = [1, 2, 3, 4, 99]
+
+    assert snapshot.available_at(ids, "2026-03-16T15:30:00-07:00", "2026-03-16T16:00:00-07:00") == [1, 2]
+    assert snapshot.available_at(ids, "2026-03-16T15:00:00-07:00", "2026-03-16T15:30:00-07:00") == [1]
+
+
+def test_window_finds_any_open_slot_until_end_of_day():
+    snapshot = AvailabilitySnapshot.from_db(make_db())
+    ids = [1, 2, 3, 4, 99]
+
+    assert snapshot.available_between(ids, "2026-03-16T15:00:00-07:00", "2026-03-16T23:30:00-07:00") == [1, 2, 3]
+    assert snapshot.available_between(ids, "2026-03-16T16:00:00-07:00", "2026-03-16T23:30:00-07:00") == [1, 3]
+    assert snapshot.available_between(ids, "2026-03-16T16:00:00-07:00", "2026-03-16T21:30:00-07:00") == [1]
@@ -0,0 +1,111 @@
+import sys
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.availability_index import AvailabilitySnapshot
+from utils.availability_sync import AvailabilityDiff, ChangeFeed, sync_room_availability
+
+SCHEMA_PATH = ROOT_DIR / "data" / "database" / "schema.sql"
+INDEXES_PATH = ROOT_DIR / "data" / "database" / "indexes.sql"
+
+
+def make_db():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA_PATH.read_text())
+    conn.executescript(INDEXES_PATH.read_text())
+    conn.executemany(
+        "INSERT INTO study_spaces (study_space_id, name, must_reserve) VALUES (?, ?, 1)",
+        [(1, "room a"), (2, "room b")],
+    )
+    conn.commit()
+    return conn
+
+
+def slot(start, available):
+    return {"start": f"2026-03-16T{start}:00-07:00", "end": f"2026-03-16T{start}:30-07:00", "isAvailable": available}
+
+
+def rows(conn):
+    return conn.execute(
+        "SELECT study_space_id, substr(start_time, 12, 5), is_available, scraped_at FROM room_availability ORDER BY 1, 2"
+    ).fetchall()
+
+
+def test_diff_keeps_unchanged_slots_as_they_were():
+    conn = make_db()
+
+    first = {"1": [slot("15", True), slot("16", True)], "2": [slot("15", False)]}
+    diff = sync_room_availability(conn, [(first, "2026-03-16T14:00:00")])
+    assert (len(diff.inserted), diff.updated, diff.deleted, diff.unchanged) == (3, [], [], 0)
+
+    # 15:00 in room a expired, 16:00 got booked, room b is unchanged, 17:00 is new
+    second = {"1": [slot("16", False), slot("17", True)], "2": [slot("15", False)]}
+    diff = sync_room_availability(conn, [(second, "2026-03-16T14:05:00")])
+    assert diff.inserted == [(1, slot("17", True)["start"])]
+    assert diff.updated == [(1, slot("16", True)["start"])]
+    assert diff.deleted == [(1, slot("15", True)["start"])]
+    assert diff.unchanged == 1
+
+    # unchanged rows keep their scraped_at, the room scrape time moves on
+    assert rows(conn) == [
+        (1, "16:00", 0, "2026-03-16T14:05:00"),
+        (1, "17:00", 1, "2026-03-16T14:05:00"),
+        (2, "15:00", 0, "2026-03-16T14:00:00"),
+    ]
+    assert conn.execute("SELECT * FROM room_availability_scrapes ORDER BY 1").fetchall() == [
+        (1, "2026-03-16T14:05:00"),
+        (2, "2026-03-16T14:05:00"),
+    ]
+
+    # a room that disappears from the scrape loses its slots
+    diff = sync_room_availability(conn, [({"1": [slot("16", False), slot("17", True)]}, "2026-03-16T14:10:00")])
+    assert diff.deleted == [(2, slot("15", True)["start"])]
+    assert conn.execute("SELECT study_space_id FROM room_availability_scrapes").fetchall() == [(1,)]
+
+
+def test_failed_sync_leaves_the_previous_scrape():
+    conn = make_db()
+    sync_room_availability(conn, [({"1": [slot("15", True)], "2": [slot("15", True)]}, "2026-03-16T14:00:00")])
+    before = rows(conn)
+
+    # room b's slot is deleted before the bad slot fails its insert
+    broken = dict(slot("16", True), end=None)
+    with pytest.raises(sqlite3.IntegrityError):
+        sync_room_availability(conn, [({"1": [slot("15", False), broken]}, "2026-03-16T14:05:00")])
+    assert not conn.in_transaction
+    assert rows(conn) == before
+
+
+def test_unchanged_slot_stays_fresh_through_its_room():
+    conn = make_db()
+    data = {"1": [slot("15", True)]}
+    sync_room_availability(conn, [(data, "2026-03-10T09:00:00")])
+    conn.execute("INSERT OR REPLACE INTO room_availability_scrapes VALUES (1, datetime('now'))")
+
+    start, end = slot("15", True)["start"], slot("15", True)["end"]
+    assert AvailabilitySnapshot.from_db(conn).available_at([1], start, end) == [1]
+
+    conn.execute("DELETE FROM room_availability_scrapes")
+    assert AvailabilitySnapshot.from_db(conn).available_at([1], start, end) == []
+
+
+def test_change_feed_reports_changed_spaces():
+    feed = ChangeFeed(max_entries=2)
+    assert feed.since(0) == []
+
+    feed.publish(AvailabilityDiff([(1, "a")], [], [], 0))
+    feed.publish(AvailabilityDiff([], [(2, "b")], [(3, "c")], 5))
+    assert feed.changed_spaces(0) == {1, 2, 3}
+    assert feed.changed_spaces(1) == {2, 3}
+    assert feed.changed_spaces(2) == set()
+
+    # version 1 drops off, so anyone still at 0 has to assume everything changed
+    feed.publish(AvailabilityDiff([], [], [], 7))
+    assert feed.since(0) is None
+    assert feed.changed_spaces(1) == {2, 3}
+    assert feed.stats()["unchanged"] == 7
@@ -0,0 +1,56 @@
+import sys
+import sqlite3
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.catalog import Catalog, CatalogCache, bump_catalog_version
+
+SCHEMA_PATH = ROOT_DIR / "data" / "database" / "schema.sql"
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_PATH.read_text())
+    conn.execute("ALTER TABLE study_spaces ADD COLUMN floor TEXT")
+    conn.executemany(
+        "INSERT INTO buildings (building_id, name, has_printer, latitude, longitude) VALUES (?, ?, ?, ?, ?)",
+        [("SCI", "Science Library", 1, 33.6, -117.8), ("LLIB", "Langson Library", None, 33.7, -117.9)],
+    )
+    conn.executemany(
+        "INSERT INTO study_spaces (study_space_id, name, capacity, must_reserve, building_id, floor) VALUES (?, ?, ?, ?, ?, ?)",
+        [(7, "room b", 4, 1, "SCI", "2nd Floor"), (3, "room a", 6, 0, "SCI", None), (5, "table", 1, 0, "LLIB", "1st Floor")],
+    )
+    conn.commit()
+    return conn
+
+
+def test_catalog_joins_spaces_to_buildings():
+    catalog = Catalog.from_db(make_db(":memory:"))
+
+    assert list(catalog.spaces) == [3, 5, 7]
+    assert list(catalog.buildings) == ["LLIB", "SCI"]
+    assert catalog.spaces[7].building_name == "Science Library"
+    assert catalog.spaces[7].floor == "2nd Floor"
+    assert catalog.spaces[5].has_printer is None
+    assert (catalog.spaces[3].latitude, catalog.spaces[3].longitude) == (33.6, -117.8)
+    assert [s.study_space_id for s in catalog.spaces_by_building["SCI"]] == [3, 7]
+
+
+def test_cache_reloads_only_after_version_bump(tmp_path):
+    db_path = tmp_path / "app.db"
+    conn = make_db(db_path)
+    cache = CatalogCache(db_path, check_interval=0)
+    first = cache.get()
+
+    conn.execute("UPDATE study_spaces SET name = 'renamed' WHERE study_space_id = 3")
+    conn.commit()
+    assert cache.get() is first
+
+    bump_catalog_version(conn)
+    conn.commit()
+    second = cache.get()
+    assert second is not first
+    assert second.spaces[3].name == "renamed"
+    conn.close()
@@ -0,0 +1,65 @@
+import sys
+import threading
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils import db
+
+
+def in_thread(target):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(target()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_short_lived_threads_reuse_pooled_connections(tmp_path):
+    path = tmp_path / "pool.db"
+
+    first = in_thread(lambda: db.get_connection(path))
+    # the second thread gets the connection the first one gave back
+    assert in_thread(lambda: db.get_connection(path)) is first
+    assert in_thread(lambda: db.get_connection(path).execute("PRAGMA journal_mode").fetchone()) == ("wal",)
+
+    # while a thread holds it, others get their own
+    assert db.get_connection(path) is first
+    assert in_thread(lambda: db.get_connection(path)) is not first
+    db.close_connections()
+
+
+def test_open_transaction_is_rolled_back_on_release(tmp_path):
+    path = tmp_path / "pool.db"
+    conn = db.get_connection(path)
+    with conn:
+        conn.execute("CREATE TABLE t (x)")
+    db.close_connections()
+
+    def leave_open():
+        conn = db.get_connection(path)
+        conn.execute("INSERT INTO t VALUES (1)")
+        return conn
+
+    conn = in_thread(leave_open)
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (0,)
+
+
+def test_idle_connections_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "POOL_SIZE", 2)
+    path = tmp_path / "pool.db"
+    barrier = threading.Barrier(4)
+
+    def hold():
+        conn = db.get_connection(path)
+        barrier.wait()
+        return conn
+
+    threads = [threading.Thread(target=hold) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert db._pool(str(path)).qsize() == 2
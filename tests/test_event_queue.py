@@ -0,0 +1,91 @@
+import sys
+import threading
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model import store_personal_model_data as store
+from personal_model.event_queue import EventQueue, _rows_for_keys, write_events
+from support import assert_matches_pandas_model
+
+
+def bookmark(space_id, created_at):
+    return {"study_space_id": space_id, "building_id": "SLIB", "created_at": created_at}
+
+
+def test_events_are_batched_in_order(user_db, monkeypatch):
+    event_queue = EventQueue(batch_size=100, flush_interval=1.0)
+    monkeypatch.setattr(store, "EVENT_QUEUE", event_queue)
+    db_path = user_db
+
+    for i in range(20):
+        store.store_spot_view("USER_003", {
+            "study_space_id": 44668,
+            "building_id": "SLIB",
+            "opened_at": f"2026-02-22 17:{i:02d}:00",
+        }, debug=False)
+    # add, remove, add again: only submission order gives the right answer
+    store.store_bookmarks("USER_003", bookmark(44672, "2026-02-22 18:00:00"), debug=False)
+    store.delete_bookmarks("USER_003", bookmark(44672, None), debug=False)
+    store.store_bookmarks("USER_003", bookmark(44672, "2026-02-22 18:10:00"), debug=False)
+    store.delete_bookmarks("USER_003", bookmark(44668, None), debug=False)
+
+    assert event_queue.flush(timeout=10)
+    stats = event_queue.stats()
+    assert (stats["written"], stats["failed"], stats["pending"]) == (24, 0, 0)
+    assert stats["batches"] == 1
+
+    assert store.check_bookmark_status("USER_003", 44672)
+    assert not store.check_bookmark_status("USER_003", 44668)
+    assert_matches_pandas_model(db_path)
+    event_queue.close()
+
+
+def test_failed_event_does_not_drop_the_batch(user_db, monkeypatch):
+    event_queue = EventQueue(batch_size=100, flush_interval=1.0)
+    monkeypatch.setattr(store, "EVENT_QUEUE", event_queue)
+    db_path = user_db
+
+    store.store_bookmarks("USER_003", bookmark(44672, "2026-02-22 18:00:00"), debug=False)
+    store.store_bookmarks("USER_003", bookmark(44668, None), debug=False)  # created_at is NOT NULL
+    store.store_bookmarks("USER_003", bookmark(44700, "2026-02-22 18:20:00"), debug=False)
+
+    event_queue.close()
+    stats = event_queue.stats()
+    assert (stats["written"], stats["failed"]) == (2, 1)
+    assert store.check_bookmark_status("USER_003", 44700)
+    assert_matches_pandas_model(db_path)
+
+
+def test_synchronous_mode_writes_before_returning(user_db, monkeypatch):
+    event_queue = EventQueue(synchronous=True)
+    monkeypatch.setattr(store, "EVENT_QUEUE", event_queue)
+
+    store.store_bookmarks("USER_003", bookmark(44672, "2026-02-22 18:00:00"), debug=False)
+    assert event_queue.stats()["pending"] == 0
+    assert store.check_bookmark_status("USER_003", 44672)
+
+
+def test_concurrent_writers_do_not_double_count(user_db, monkeypatch):
+    first = store.add_bookmark_event("USER_003", bookmark(44672, "2026-02-22 18:00:00"))
+    second = store.add_bookmark_event("USER_003", bookmark(44672, "2026-02-22 18:05:00"))
+    other = threading.Thread(target=write_events, args=([second],))
+    interleaved = []
+
+    def rows_for_keys(cur, table, keys):
+        rows = _rows_for_keys(cur, table, keys)
+        if threading.current_thread() is not other and not interleaved:
+            # give the other writer every chance to commit between our
+            # "before" read and our write
+            interleaved.append(True)
+            other.start()
+            other.join(0.5)
+        return rows
+
+    monkeypatch.setattr("personal_model.event_queue._rows_for_keys", rows_for_keys)
+    write_events([first])
+    other.join()
+
+    assert interleaved
+    assert_matches_pandas_model(user_db)
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.features import PROBABILITY_ATTRS, space_features
+from personal_model.personal_model_process import PersonalModel
+from utils.catalog import get_catalog
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
+APP_DB = BASE_DIR / "data" / "database" / "app.db"
+
+
+def test_matrix_is_one_hot_per_attribute():
+    catalog = get_catalog(APP_DB).get()
+    features = space_features(catalog)
+    assert space_features(catalog) is features
+
+    for space_id, row in features.rows.items():
+        space = catalog.spaces[space_id]
+        known = sum(getattr(space, a) is not None for a in PROBABILITY_ATTRS)
+        assert features.matrix[row].sum() == known
+        for attr in PROBABILITY_ATTRS:
+            column = features.columns.get((attr, getattr(space, attr)))
+            assert column is None or features.matrix[row, column] == 1.0
+
+
+def test_score_all_matches_per_spot_scoring():
+    model = PersonalModel("USER_001", USER_DB, APP_DB)
+    prefs = [
+        (1.0, model.build_marginal_pref(model.df_sessions, PROBABILITY_ATTRS)),
+        (1.5, model.build_marginal_pref(model.df_bookmarks, PROBABILITY_ATTRS)),
+        (0.5, model.build_marginal_pref(model.df_views, PROBABILITY_ATTRS)),
+    ]
+    catalog = get_catalog(APP_DB).get()
+    features = space_features(catalog)
+    scores = features.score_all(features.weight_vector(prefs))
+
+    assert set(scores) == {s.study_space_id for s in catalog.spaces.values() if s.building_name is not None}
+    for space_id, score in scores.items():
+        condition = {a: getattr(catalog.spaces[space_id], a) for a in PROBABILITY_ATTRS}
+        expected = sum(w * model.score_spot_condition(pref, condition) for w, pref in prefs) / 3.0
+        assert score == pytest.approx(expected, rel=1e-12)
@@ -0,0 +1,71 @@
+import sys
+import json
+import os
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.filter_index import FilterIndex
+
+
+def write_index(path, indexes, mtime_ns):
+    with open(path, "w") as f:
+        json.dump(indexes, f)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_index_is_loaded_once(tmp_path):
+    path = tmp_path / "filters_index.json"
+    write_index(path, {"indoor": {"true": [1, 2]}}, 1_000_000_000)
+
+    index = FilterIndex(path)
+    first = index.get()
+    assert first == {"indoor": {"true": [1, 2]}}
+    assert index.get() is first
+
+
+def test_index_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "filters_index.json"
+    write_index(path, {"indoor": {"true": [1, 2]}}, 1_000_000_000)
+
+    index = FilterIndex(path)
+    index.get()
+
+    write_index(path, {"indoor": {"true": [1, 2, 3]}}, 2_000_000_000)
+    assert index.get() == {"indoor": {"true": [1, 2, 3]}}
+
+
+def test_bitmaps_match_set_intersection(tmp_path):
+    path = tmp_path / "filters_index.json"
+    indexes = {
+        "capacity_ranges": {"1-4": [1, 2], "5-10": [3, 4]},
+        "indoor": {"true": [1, 3, 4], "false": [2]},
+        "tech_enhanced": {"true": [3], "false": [1, 2, 4]},
+        "building": {"LLIB": [1, 3], "SLIB": [2, 4]},
+    }
+    write_index(path, indexes, 1_000_000_000)
+    bitmaps = FilterIndex(path).bitmaps()
+
+    assert list(bitmaps.match([("indoor", "true"), ("capacity_ranges", "5-10")])) == [3, 4]
+    assert list(bitmaps.match([("indoor", "true"), ("tech_enhanced", "false")])) == [1, 4]
+    assert list(bitmaps.match([("capacity_ranges", "20+")])) == []
+    assert list(bitmaps.match([])) == []
+
+    not_llib = bitmaps.negate(bitmaps.bitmap("building", "LLIB"))
+    assert bitmaps.to_ids(not_llib) == [2, 4]
+    either = bitmaps.bitmap("building", "LLIB") | bitmaps.bitmap("indoor", "false")
+    assert bitmaps.to_ids(either) == [1, 2, 3]
+
+
+def test_memoize_all_covers_every_combination(tmp_path):
+    path = tmp_path / "filters_index.json"
+    indexes = {
+        "indoor": {"true": [1, 3], "false": [2]},
+        "tech_enhanced": {"true": [3], "false": [1, 2]},
+    }
+    write_index(path, indexes, 1_000_000_000)
+    bitmaps = FilterIndex(path).bitmaps()
+
+    # (unset, true, false) for each of the two filters
+    assert bitmaps.memoize_all(("indoor", "tech_enhanced")) == 9
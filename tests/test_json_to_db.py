@@ -0,0 +1,43 @@
+import shutil
+import sys
+import sqlite3
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.json_to_db import DB_PATH, INGESTED_TABLES, rebuild
+
+COUNTS = "SELECT (SELECT COUNT(*) FROM study_spaces), (SELECT COUNT(*) FROM room_availability), (SELECT COUNT(*) FROM study_spaces WHERE floor IS NOT NULL)"
+
+
+def test_rebuild_from_scratch_matches_json(tmp_path):
+    db_path = tmp_path / "app.db"
+    rebuild(db_path)
+
+    conn = sqlite3.connect(db_path)
+    spaces, slots, with_floor = conn.execute(COUNTS).fetchone()
+    assert spaces > 0 and slots > 0 and with_floor > 0
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'idx_room_availability_slot'").fetchone()
+    assert not (tmp_path / "app.db.rebuild").exists()
+
+
+def test_rebuild_replaces_live_database_and_keeps_ingested_tables(tmp_path):
+    db_path = tmp_path / "app.db"
+    shutil.copy(DB_PATH, db_path)
+
+    reader = sqlite3.connect(db_path)
+    reader.execute("PRAGMA journal_mode=WAL")
+    kept = {t: reader.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in INGESTED_TABLES}
+    version = reader.execute("PRAGMA user_version").fetchone()[0]
+    with reader:
+        reader.execute("DELETE FROM room_availability")
+
+    rebuild(db_path)
+
+    # the open connection sees the new contents without reconnecting
+    assert reader.execute(COUNTS).fetchone()[1] > 0
+    assert {t: reader.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in INGESTED_TABLES} == kept
+    assert reader.execute("PRAGMA user_version").fetchone()[0] == version + 1
+    assert reader.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
@@ -0,0 +1,90 @@
+import sys
+import sqlite3
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import utils.library_traffic as library_traffic
+from utils.library_traffic import LibraryTraffic
+
+SCHEMA_PATH = ROOT_DIR / "data" / "database" / "schema.sql"
+
+
+def reading(location, percentage, timestamp):
+    return {
+        "libraryName": "Langson Library",
+        "locationName": location,
+        "trafficCount": int(percentage * 100),
+        "trafficPercentage": percentage,
+        "timestamp": timestamp,
+    }
+
+
+def test_latest_table_keeps_newest_reading_per_location():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA_PATH.read_text())
+    conn.execute("INSERT INTO buildings (building_id, name) VALUES ('LLIB', 'Langson Library')")
+    cur = conn.cursor()
+
+    traffic = LibraryTraffic(None, [], None)
+    traffic.create_latest_table(cur)
+    traffic.insert_library_traffic_data(cur, reading("1st Floor", 0.4, "2026-03-15T22:00:00.000Z"))
+    traffic.insert_library_traffic_data(cur, reading("1st Floor", 0.7, "2026-03-15T22:05:00.000Z"))
+    # a late-arriving older reading must not overwrite the newer one
+    traffic.insert_library_traffic_data(cur, reading("1st Floor", 0.1, "2026-03-15T21:55:00.000Z"))
+    traffic.insert_library_traffic_data(cur, reading("Basement", 0.2, "2026-03-15T22:05:00.000Z"))
+
+    latest = cur.execute(
+        "SELECT location_name, building_id, traffic_percentage FROM library_traffic_latest ORDER BY location_name"
+    ).fetchall()
+    assert latest == [("1st Floor", "LLIB", 0.7), ("Basement", "LLIB", 0.2)]
+    assert cur.execute("SELECT COUNT(*) FROM library_traffic").fetchone()[0] == 4
+
+
+def test_latest_table_is_seeded_from_history():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA_PATH.read_text())
+    conn.execute("DROP TABLE library_traffic_latest")
+    conn.executemany(
+        "INSERT INTO library_traffic (building_id, location_name, traffic_percentage, timestamp) VALUES (?, ?, ?, ?)",
+        [
+            ("LLIB", "1st Floor", 0.3, "2026-03-15T21:00:00.000Z"),
+            ("LLIB", "1st Floor", 0.6, "2026-03-15T22:00:00.000Z"),
+            ("LLIB", "Basement", 0.5, "2026-03-15T20:00:00.000Z"),
+        ],
+    )
+    cur = conn.cursor()
+
+    LibraryTraffic(None, [], None).create_latest_table(cur)
+
+    latest = cur.execute(
+        "SELECT location_name, traffic_percentage FROM library_traffic_latest ORDER BY location_name"
+    ).fetchall()
+    assert latest == [("1st Floor", 0.6), ("Basement", 0.5)]
+
+
+def test_update_writes_the_new_latest_readings(tmp_path, monkeypatch):
+    db_path = tmp_path / "app.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_PATH.read_text())
+    conn.execute("INSERT INTO buildings (building_id, name) VALUES ('LLIB', 'Langson Library')")
+    conn.commit()
+    traffic = LibraryTraffic(None, [], db_path)
+    traffic.insert_library_traffic_data(conn.cursor(), reading("1st Floor", 0.4, "2026-03-15T22:00:00.000Z"))
+    conn.commit()
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"data": [reading("1st Floor", 0.9, "2026-03-15T22:05:00.000Z")]}
+
+    monkeypatch.setattr(library_traffic.requests, "get", lambda *args, **kwargs: Response())
+    traffic.update_database()
+
+    latest = conn.execute("SELECT location_name, traffic_percentage FROM library_traffic_latest").fetchall()
+    assert latest == [("1st Floor", 0.9)]
+    # one reading per library queried, plus the original
+    assert conn.execute("SELECT COUNT(*) FROM library_traffic").fetchone()[0] == 4
@@ -0,0 +1,58 @@
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.fake_user_generate import FAKE_DATA_PATH, SCHEMA_PATH, insert_dicts
+from personal_model.lite_model import LitePersonalModel
+from personal_model.model_cache import ModelCache
+from personal_model.personal_model_process import PersonalModel
+from utils.catalog import get_catalog
+from support import APP_DB, assert_same, plain
+
+def fake_user_db(db_path):
+    """A user_data.db holding only fake_user_data.json"""
+    with open(FAKE_DATA_PATH, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+
+    user_ids = sorted({row["user_id"] for rows in payload.values() for row in rows})
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+    cur = conn.cursor()
+    insert_dicts("users", [{"user_id": u, "created_at": "2026-01-01 00:00:00"} for u in user_ids], cur)
+    for table, rows in payload.items():
+        insert_dicts(table, rows, cur)
+    conn.commit()
+    conn.close()
+    return user_ids
+
+
+def test_lite_model_matches_pandas_model(tmp_path):
+    db_path = tmp_path / "user_data.db"
+    user_ids = fake_user_db(db_path)
+    all_spots = list(get_catalog(APP_DB).get().spaces)
+
+    for user_id in user_ids + ["NO_SUCH_USER"]:
+        pandas_model = PersonalModel(user_id, USER_DB=db_path, APP_DB=APP_DB)
+        lite_model = LitePersonalModel(user_id, USER_DB=db_path, APP_DB=APP_DB)
+
+        expected = pandas_model.user_context_for_ranking()
+        actual = lite_model.user_context_for_ranking()
+        assert_same(plain(actual), plain(expected), user_id)
+        assert lite_model.hours == pandas_model.hours
+
+        # unknown ids are dropped the same way by both
+        spots = all_spots + [10, 11]
+        expected_scores = pandas_model.probability(list(spots))
+        actual_scores = lite_model.probability(list(spots))
+        assert [s for s, _ in actual_scores] == [s for s, _ in expected_scores]
+        assert_same([p for _, p in actual_scores], [p for _, p in expected_scores], user_id)
+
+
+def test_cache_builds_the_configured_model():
+    assert ModelCache(impl="lite").model_class is LitePersonalModel
+    assert ModelCache(impl="pandas").model_class is PersonalModel
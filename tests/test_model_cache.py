@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model.model_cache import ModelCache
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
+APP_DB = BASE_DIR / "data" / "database" / "app.db"
+
+
+def test_models_are_reused_until_invalidated():
+    cache = ModelCache(max_models=1)
+
+    first = cache.get("USER_001", USER_DB, APP_DB)
+    assert first.user_context["average_preference"] is not None
+    assert cache.get("USER_001", USER_DB, APP_DB) is first
+
+    cache.invalidate("USER_001")
+    second = cache.get("USER_001", USER_DB, APP_DB)
+    assert second is not first
+
+    cache.get("USER_002", USER_DB, APP_DB)
+    stats = cache.stats()
+    assert stats["size"] == 1
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+    assert stats["evictions"] == 1
+    assert stats["invalidations"] == 1
@@ -1,10 +1,13 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT_DIR))
 
 from personal_model.personal_model_process import PersonalModel
+from utils.catalog import get_catalog
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 USER_DB = BASE_DIR / "data" / "database" / "user_data.db"
@@ -48,6 +51,30 @@ def test_user_7_edgecase():
     result = user7.probability([44672, 34681, 10, 11, 12, 34680, 44700])
     print(result)
 
+def test_batched_probability_matches_per_spot_scoring():
+    user1 = PersonalModel("USER_001", USER_DB, APP_DB)
+    user1.user_context_for_ranking()
+    attrs = ["must_reserve", "tech_enhanced", "capacity", "is_indoor", "is_talking_allowed", "has_printer"]
+    prefs = [
+        (1.0, user1.build_marginal_pref(user1.df_sessions, attrs)),
+        (1.5, user1.build_marginal_pref(user1.df_bookmarks, attrs)),
+        (0.5, user1.build_marginal_pref(user1.df_views, attrs)),
+    ]
+
+    spots = [44672, 34681, 10, 11, 12, 34680, 44700]
+    expected = []
+    catalog = get_catalog(APP_DB).get()
+    for spot in user1.filter_out_low_rating_spot(list(spots)):
+        condition = {a: getattr(catalog.spaces[spot], a) for a in attrs}
+        scores = [w * user1.score_spot_condition(pref, condition) for w, pref in prefs]
+        expected.append((spot, (scores[0] + scores[1] + scores[2]) / 3.0))
+    expected.sort(key=lambda x: x[1], reverse=True)
+
+    # the matrix-vector product sums in a different order, so allow rounding error
+    actual = user1.probability(list(spots))
+    assert [spot for spot, _ in actual] == [spot for spot, _ in expected]
+    assert [p for _, p in actual] == pytest.approx([p for _, p in expected], rel=1e-12)
+
 def main():
     #print('='*50, "user7", '='*50)
     #test_user_1()
@@ -0,0 +1,128 @@
+"""
+Run the hot read paths and the availability ingest against a fresh app.db
+built from schema.sql plus indexes.sql, capture the SQL they actually issue,
+and fail if any statement's EXPLAIN QUERY PLAN falls back to a full table
+scan, or if an index in indexes.sql is used by none of them.
+
+Statements without a WHERE clause read whole tables on purpose (the catalog
+loader, every study space for the traffic join) and are exempt, as are
+NOT IN (SELECT ...) sweeps, which visit every row by design.
+"""
+
+import re
+import sys
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+import utils.query as query
+import personal_model.helpers as helpers
+from utils.availability_index import AvailabilitySnapshot
+from utils.availability_sync import sync_room_availability
+from utils.catalog import CatalogCache
+from utils.db import get_connection
+from utils.migrate_db import migrate
+from utils.weather_api import WeatherAPI
+
+SCHEMA_PATH = ROOT_DIR / "data" / "database" / "schema.sql"
+INDEXES_PATH = ROOT_DIR / "data" / "database" / "indexes.sql"
+
+_real_connect = sqlite3.connect
+
+
+def make_app_db(path):
+    conn = _real_connect(path)
+    conn.executescript(SCHEMA_PATH.read_text())
+    conn.execute("ALTER TABLE study_spaces ADD COLUMN floor TEXT")
+    conn.execute("INSERT INTO buildings (building_id, name) VALUES ('LLIB', 'Langson Library')")
+    conn.execute(
+        "INSERT INTO study_spaces (study_space_id, name, must_reserve, building_id, floor) VALUES (1, 'room', 1, 'LLIB', '1st Floor')"
+    )
+    now = datetime.now()
+    rounded = WeatherAPI().round_to_nearest_hour(now)
+    conn.execute(
+        "INSERT INTO hourly_weather (time_local, date, hour, is_raining, weather_text, fetched_at) VALUES (?, ?, ?, 0, 'Clear', ?)",
+        (rounded.isoformat(), rounded.strftime("%Y-%m-%d"), rounded.strftime("%H:00"), now.isoformat()),
+    )
+    conn.commit()
+    conn.close()
+    migrate(path)
+
+
+def capture_statements(monkeypatch):
+    statements = []
+
+    def connect(*args, **kwargs):
+        conn = _real_connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", connect)
+    return statements
+
+
+def query_plan(conn, sql):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+def full_scans(plan, sql):
+    cte_names = set(re.findall(r"(\w+)\s+AS\s*\(", sql, flags=re.IGNORECASE))
+    scans = []
+    for detail in plan:
+        match = re.match(r"SCAN (\w+)", detail)
+        if match and "USING" not in detail and match.group(1) not in cte_names:
+            scans.append(detail)
+    return scans
+
+
+def slot(start, available):
+    return {"start": f"2026-03-16T{start}:00-07:00", "end": f"2026-03-16T{start}:30-07:00", "isAvailable": available}
+
+
+def test_hot_queries_use_indexes(tmp_path, monkeypatch):
+    db_path = tmp_path / "app.db"
+    make_app_db(db_path)
+
+    monkeypatch.setattr(query, "DB_PATH", db_path)
+    monkeypatch.setattr(helpers, "APP_DB", db_path)
+    statements = capture_statements(monkeypatch)
+
+    conn = get_connection(db_path)
+    # slot inserts, then an update and a delete
+    sync_room_availability(conn, [({"1": [slot("15", True), slot("16", True)]}, "2026-03-16T14:00:00")])
+    sync_room_availability(conn, [({"1": [slot("16", False)]}, "2026-03-16T14:05:00")])
+    AvailabilitySnapshot.from_db(conn)
+    CatalogCache(db_path).get()
+    query.get_current_weather()
+    query.get_study_space_traffic_closest_now()
+    helpers.avg_traffic_between("LLIB", "1st Floor", "2026-03-15", "10:00", "2026-03-15", "12:00")
+    helpers.get_closest_time_weather("2026-03-15", "10:10")
+    WeatherAPI(DB_PATH=db_path).update_weather_database()
+
+    checked = [s for s in statements if re.match(r"\s*(SELECT|WITH|UPDATE|DELETE)", s, flags=re.IGNORECASE)]
+    assert "SELECT * FROM study_spaces" in checked
+    assert "SELECT * FROM buildings" in checked
+    assert any(s.lstrip().startswith("UPDATE room_availability") for s in checked)
+    assert any(s.startswith("DELETE FROM room_availability WHERE") for s in checked)
+    assert any("library_traffic" in s and "WHERE" in s for s in checked)
+    assert any("hourly_weather" in s for s in checked)
+
+    check_conn = _real_connect(db_path)
+    regressions = {}
+    used = set()
+    for sql in checked:
+        plan = query_plan(check_conn, sql)
+        used.update(re.findall(r"USING (?:COVERING )?INDEX (\w+)", " ".join(plan)))
+        if "WHERE" not in sql.upper() or "NOT IN (SELECT" in sql.upper():
+            continue
+        scans = full_scans(plan, sql)
+        if scans:
+            regressions[sql.strip()] = scans
+    check_conn.close()
+
+    assert regressions == {}
+    declared = set(re.findall(r"CREATE (?:UNIQUE )?INDEX IF NOT EXISTS (\w+)", INDEXES_PATH.read_text()))
+    assert declared - used == set()
@@ -0,0 +1,87 @@
+import sys
+import copy
+import random
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.query import compute_final_score, score_spaces, ranking_key, select_page
+
+
+def random_spaces(rng, n):
+    spaces = []
+    for i in range(n):
+        located = rng.random() > 0.1
+        spaces.append({
+            "id": i,
+            "latitude": 33.64 + rng.uniform(-0.03, 0.03) if located else None,
+            "longitude": -117.84 + rng.uniform(-0.03, 0.03) if located else None,
+        })
+    return spaces
+
+
+def random_traffic(rng, n):
+    traffic_map = {}
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.1:
+            continue
+        # quarter-step values put some deviations exactly on rounding ties
+        pct = None if roll < 0.2 else rng.choice([rng.random(), rng.randint(0, 40) / 40])
+        traffic_map[i] = {"traffic_percentage": pct, "traffic_estimated": roll < 0.5}
+    return traffic_map
+
+
+def assert_same_as_scalar(spaces, probability_map, **kwargs):
+    expected_spaces = copy.deepcopy(spaces)
+    expected = [compute_final_score(space, probability_map, **kwargs) for space in expected_spaces]
+
+    actual = score_spaces(spaces, probability_map, **kwargs)
+
+    assert actual == expected
+    assert spaces == expected_spaces
+
+
+def test_vectorized_scores_match_compute_final_score():
+    rng = random.Random(7)
+    for _ in range(50):
+        n = rng.randint(1, 120)
+        spaces = random_spaces(rng, n)
+        probability_map = {i: rng.choice([rng.random(), rng.randint(0, 8) / 8]) for i in range(n) if rng.random() > 0.2}
+        traffic_map = random_traffic(rng, n)
+        user_location = {"latitude": 33.6461, "longitude": -117.8427}
+
+        assert_same_as_scalar(copy.deepcopy(spaces), probability_map, user_location=user_location,
+                              traffic_map=traffic_map, preferred_traffic_range=(0.2, 0.45))
+        assert_same_as_scalar(copy.deepcopy(spaces), probability_map, user_location=user_location,
+                              traffic_map=traffic_map, preferred_traffic_range=None)
+        assert_same_as_scalar(copy.deepcopy(spaces), {}, user_location=user_location, traffic_map=None,
+                              prob_weight=0, distance_weight=1, traffic_weight=0)
+        assert_same_as_scalar(copy.deepcopy(spaces), probability_map, user_location=None,
+                              traffic_map=traffic_map, preferred_traffic_range=(0.5, 0.5))
+
+
+def test_empty_input():
+    assert score_spaces([], {}) == []
+
+
+def test_pages_follow_full_ranking_with_demotion():
+    rng = random.Random(3)
+    # few distinct scores so many ties are broken by id
+    spaces = [{"id": i, "score": rng.randint(0, 5) / 5} for i in rng.sample(range(200), 60)]
+    demoted_ids = {s["id"] for s in spaces[::7]}
+
+    # the old ranking: stable score sort over id order, then low-rated spots moved last
+    full = sorted(sorted(spaces, key=lambda s: s["id"]), key=lambda s: s["score"], reverse=True)
+    expected = [s["id"] for s in full if s["id"] not in demoted_ids] + [s["id"] for s in full if s["id"] in demoted_ids]
+    assert [s["id"] for s in sorted(spaces, key=lambda s: ranking_key(s, demoted_ids))] == expected
+
+    pages = []
+    cursor = None
+    while True:
+        page, cursor = select_page(list(reversed(spaces)), demoted_ids, 7, cursor)
+        pages.extend(s["id"] for s in page)
+        if cursor is None:
+            break
+    assert pages == expected
@@ -0,0 +1,133 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.scraper_service import ScraperService
+
+SLOT = {"start": "s", "end": "e", "isAvailable": True}
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = 0
+        self.closed = False
+
+    async def new_context(self):
+        self.contexts += 1
+        return FakeContext()
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    async def new_page(self):
+        page = FakePage()
+        page.context = self
+        return page
+
+    async def close(self):
+        pass
+
+
+class FakePage:
+    pass
+
+
+class FakePlaywright:
+    async def stop(self):
+        pass
+
+
+def fake_service(max_runs=3, fail=(), delay=0.0, source_timeout=5):
+    browsers = []
+    threads = set()
+
+    async def launcher():
+        browsers.append(FakeBrowser())
+        return FakePlaywright(), browsers[-1]
+
+    async def scrape(page, url):
+        threads.add(threading.current_thread().name)
+        await asyncio.sleep(delay)
+        if url in fail:
+            raise RuntimeError("page crashed")
+        return {url: [SLOT]}
+
+    service = ScraperService({"A": "a", "B": "b"}, max_runs=max_runs, source_timeout=source_timeout,
+                             launcher=launcher, scrape=scrape)
+    return service, browsers, threads
+
+
+def test_browser_and_pages_stay_warm_between_runs():
+    service, browsers, threads = fake_service()
+    try:
+        assert service.scrape_all(timeout=5) == {"A": {"a": [SLOT]}, "B": {"b": [SLOT]}}
+        service.scrape_all(timeout=5)
+        # one launch, one context per source, all on the scraper thread
+        assert len(browsers) == 1
+        assert browsers[0].contexts == 2
+        assert threads == {"availability-scraper"}
+    finally:
+        service.close()
+    assert browsers[0].closed
+
+
+def test_sources_are_scraped_concurrently():
+    service, _, _ = fake_service(delay=0.3)
+    try:
+        started = time.monotonic()
+        service.scrape_all(timeout=5)
+        assert time.monotonic() - started < 0.55
+        assert service.last_report["A"]["rooms"] == 1
+        assert service.last_report["B"]["slots"] == 1
+        assert service.last_report["B"]["error"] is None
+    finally:
+        service.close()
+
+
+def test_slow_source_times_out_without_holding_up_the_others():
+    service, _, _ = fake_service(delay=0.5, source_timeout=0.1)
+    try:
+        assert service.scrape_all(timeout=5) == {}
+        assert "timed out" in service.last_report["A"]["error"]
+        assert service.last_report["A"]["seconds"] < 0.4
+    finally:
+        service.close()
+
+
+def test_browser_is_recycled_after_max_runs():
+    service, browsers, _ = fake_service(max_runs=2)
+    try:
+        for _ in range(5):
+            service.scrape_all(timeout=5)
+        assert service.launches == 3
+        assert [b.closed for b in browsers] == [True, True, False]
+    finally:
+        service.close()
+
+
+def test_failed_source_is_left_out_and_crash_relaunches():
+    service, browsers, _ = fake_service(fail={"b"})
+    try:
+        assert list(service.scrape_all(timeout=5)) == ["A"]
+        assert service.last_report["B"]["error"] == "page crashed"
+        # the failed source gets a new context next run, the other keeps its page
+        service.scrape_all(timeout=5)
+        assert browsers[0].contexts == 3
+
+        browsers[0].connected = False
+        service.scrape_all(timeout=5)
+        service.scrape_all(timeout=5)
+        assert len(browsers) == 2
+    finally:
+        service.close()
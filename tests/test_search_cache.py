@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from utils.search_cache import SearchCache, canonical_filters
+
+
+def test_canonical_filters_ignore_key_order():
+    assert canonical_filters({"indoor": True, "capacity_range": "1-4"}) == canonical_filters({"capacity_range": "1-4", "indoor": True})
+    assert canonical_filters({"indoor": True}) != canonical_filters({"indoor": False})
+
+
+def test_values_are_copied_and_bounded():
+    cache = SearchCache(max_entries=2)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [1, 2, 3], {"indoor": True}
+
+    ids, _ = cache.get_or_compute("a", compute)
+    ids.append(99)
+    assert cache.get_or_compute("a", compute) == ([1, 2, 3], {"indoor": True})
+    assert len(calls) == 1
+
+    cache.put("b", [2])
+    cache.get("a")
+    cache.put("c", [3])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+    cache.invalidate()
+    assert cache.get("a") is None
+
+
+def test_entries_expire():
+    cache = SearchCache(ttl_seconds=-1)
+    cache.put("a", [1])
+    assert cache.get("a") is None
+
+
+def test_value_computed_across_an_invalidate_is_not_stored():
+    cache = SearchCache()
+
+    def compute():
+        # ingest finishes while the old data is being read
+        cache.invalidate()
+        return [1]
+
+    assert cache.get_or_compute("a", compute) == [1]
+    assert cache.get("a") is None
+    assert cache.get_or_compute("a", lambda: [2]) == [2]
+    assert cache.get("a") == [2]
@@ -0,0 +1,74 @@
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from personal_model import store_personal_model_data as store
+from personal_model.aggregates import rebuild_all
+from personal_model.session_enrichment import enrich_all
+from support import APP_DB, USER_DB, assert_matches_pandas_model
+
+SESSION = {
+    "study_space_id": 44696,
+    "building_id": "LLIB",
+    "started_at": "10:23",
+    "ended_at": "13:45",
+    "start_date": "2026-02-09",
+    "end_date": "2026-02-09",
+    "duration_ms": 3 * 60 * 60 * 1000,
+}
+
+
+def session_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("""
+            SELECT session_id, session_traffic, start_weather_time_local, enriched_at
+            FROM study_sessions ORDER BY session_id
+        """).fetchall()
+    finally:
+        conn.close()
+
+
+def test_sessions_are_stored_first_and_enriched_after(user_db):
+    db_path = user_db
+    enricher = store.SESSION_ENRICHER
+
+    # the insert itself leaves the enrichment columns empty
+    event = store.study_session_event("USER_002", SESSION)
+    assert event.params[-2:] == (None, None)
+
+    store.store_study_session("USER_002", SESSION, debug=False)
+    assert enricher.enriched == 1
+    session_id, traffic, _, enriched_at = session_rows(db_path)[-1]
+    assert traffic is not None
+    assert enriched_at is not None
+    assert_matches_pandas_model(db_path)
+
+
+def test_backfill_migrates_and_enriches_historical_rows(tmp_path):
+    db_path = tmp_path / "user_data.db"
+    shutil.copy(USER_DB, db_path)
+    conn = sqlite3.connect(db_path)
+    if "enriched_at" in [row[1] for row in conn.execute("PRAGMA table_info(study_sessions)")]:
+        conn.execute("DROP INDEX IF EXISTS idx_sessions_pending_enrichment")
+        conn.execute("ALTER TABLE study_sessions DROP COLUMN enriched_at")
+    conn.execute("""
+        INSERT INTO study_sessions (user_id, study_space_id, building_id, started_at, ended_at,
+                                    duration_ms, start_date, end_date)
+        VALUES ('USER_002', 44696, 'LLIB', '09:00', '11:00', 7200000, '2026-02-10', '2026-02-10')
+    """)
+    conn.commit()
+    conn.close()
+    rebuild_all(db_path, APP_DB)
+
+    # only the row that was never enriched is looked up
+    assert enrich_all(db_path) == 1
+    assert enrich_all(db_path) == 0
+    rows = session_rows(db_path)
+    assert all(enriched_at is not None for *_, enriched_at in rows)
+    assert rows[-1][1] is not None
+    assert_matches_pandas_model(db_path)
@@ -0,0 +1,161 @@
+"""
+availability_index.py - In-memory index of open reservation slots
+
+Searches ask two questions about rooms that must be reserved: "is the next
+30-minute slot free?" and "is any slot free between now and 11:30 PM?".
+Instead of answering them with a LEFT JOIN against room_availability on every
+request, the open slots are loaded once per ingest into a per-room sorted
+array of slot start times, so both questions are a binary search.
+
+update_room_availability.update_database() calls rebuild() after every
+successful ingest; the new snapshot is built off to the side and swapped in
+with a single assignment, so readers never see a half-built index.
+"""
+
+import sys
+import threading
+from bisect import bisect_left
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "data" / "database" / "app.db"
+sys.path.append(str(BASE_DIR))
+
+from utils.db import get_connection
+
+# Slots scraped longer ago than this are treated as unknown (unavailable)
+FRESHNESS_WINDOW = timedelta(hours=24)
+
+
+def freshness_cutoff():
+    """
+    Oldest scraped_at that still counts as fresh, formatted like SQLite's
+    datetime('now', '-24 hours') so comparisons match the SQL they replace.
+    """
+    cutoff = datetime.now(timezone.utc) - FRESHNESS_WINDOW
+    return cutoff.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class AvailabilitySnapshot:
+    """
+    One immutable version of the index.
+
+    must_reserve: {study_space_id: must_reserve flag from study_spaces}
+    open_slots:   {study_space_id: (starts, ends, scraped_ats)} for slots with
+                  is_available = 1, as parallel lists sorted by start time;
+                  scraped_ats are when the slot was last confirmed
+    """
+
+    def __init__(self, must_reserve, open_slots):
+        self.must_reserve = must_reserve
+        self.open_slots = open_slots
+
+    @classmethod
+    def from_db(cls, db_conn):
+        cursor = db_conn.cursor()
+
+        cursor.execute("SELECT study_space_id, must_reserve FROM study_spaces")
+        must_reserve = {row[0]: row[1] for row in cursor.fetchall()}
+
+        # a slot is as fresh as the last scrape of its room, even if the
+        # slot itself has not changed since (see availability_sync.py)
+        cursor.execute("""
+            SELECT r.study_space_id, r.start_time, r.end_time,
+                   MAX(r.scraped_at, COALESCE(s.scraped_at, r.scraped_at))
+            FROM room_availability r
+            LEFT JOIN room_availability_scrapes s ON s.study_space_id = r.study_space_id
+            WHERE r.is_available = 1
+            ORDER BY r.study_space_id, r.start_time
+        """)
+        open_slots = {}
+        for space_id, start_time, end_time, scraped_at in cursor.fetchall():
+            starts, ends, scraped = open_slots.setdefault(space_id, ([], [], []))
+            starts.append(start_time)
+            ends.append(end_time)
+            scraped.append(scraped_at)
+
+        return cls(must_reserve, open_slots)
+
+    def _is_open(self, space_id, slot_start, slot_end, exact, cutoff):
+        must_reserve = self.must_reserve.get(space_id)
+        if must_reserve == 0:
+            return True
+        if must_reserve != 1:
+            return False
+
+        slots = self.open_slots.get(space_id)
+        if slots is None:
+            return False
+        starts, ends, scraped = slots
+
+        i = bisect_left(starts, slot_start)
+        while i < len(starts) and starts[i] <= slot_end:
+            if exact:
+                if starts[i] != slot_start:
+                    return False
+                if ends[i] == slot_end and scraped[i] > cutoff:
+                    return True
+            elif scraped[i] > cutoff:
+                return True
+            i += 1
+        return False
+
+    def _select(self, space_ids, slot_start, slot_end, exact):
+        cutoff = freshness_cutoff()
+        result = []
+        seen = set()
+        for space_id in space_ids:
+            if space_id in seen:
+                continue
+            seen.add(space_id)
+            if self._is_open(space_id, slot_start, slot_end, exact, cutoff):
+                result.append(space_id)
+        return result
+
+    def available_between(self, space_ids, slot_start, slot_end):
+        """
+        Spaces that need no reservation, or have a fresh open slot starting
+        anywhere in [slot_start, slot_end].
+        """
+        return self._select(space_ids, slot_start, slot_end, exact=False)
+
+    def available_at(self, space_ids, slot_start, slot_end):
+        """
+        Spaces that need no reservation, or have a fresh open slot running
+        exactly from slot_start to slot_end.
+        """
+        return self._select(space_ids, slot_start, slot_end, exact=True)
+
+
+class AvailabilityIndex:
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._current = None
+
+    def rebuild(self, db_conn=None):
+        """Load a fresh snapshot from the database and swap it in"""
+        conn = db_conn if db_conn is not None else get_connection(self.db_path)
+        snapshot = AvailabilitySnapshot.from_db(conn)
+
+        with self._lock:
+            self._current = snapshot
+        return snapshot
+
+    def snapshot(self, db_conn=None):
+        """
+        Return the current snapshot, building it on first use (from db_conn
+        if given, otherwise from db_path).
+        """
+        current = self._current
+        if current is not None:
+            return current
+        with self._lock:
+            if self._current is None:
+                conn = db_conn if db_conn is not None else get_connection(self.db_path)
+                self._current = AvailabilitySnapshot.from_db(conn)
+            return self._current
+
+
+AVAILABILITY_INDEX = AvailabilityIndex()
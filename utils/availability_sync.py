@@ -0,0 +1,190 @@
+"""
+availability_sync.py - Apply a scrape to room_availability as a diff
+
+Most 30-minute slots are unchanged between two 5-minute scrapes.
+sync_room_availability() compares the scrape with the table, keyed by
+(study_space_id, start_time), and sorts every slot into
+
+  * inserted: new slots
+  * updated: slots whose end_time or is_available changed
+  * deleted: slots that are no longer listed (expired, or their room is gone)
+  * unchanged: everything else, which keeps its row id and scraped_at
+
+and only writes the inserted, updated and deleted slots, so the table ends
+up holding exactly the scraped slots, as before. The read and the writes
+happen in one BEGIN IMMEDIATE transaction: searches (WAL readers) keep
+seeing the previous scrape until it commits, never a half-applied one, and
+a failed ingest rolls back to it.
+
+A slot's scraped_at is when its row last changed. How recently each room
+was scraped is kept in room_availability_scrapes, one row per room, and
+AvailabilitySnapshot counts a slot as fresh if either is recent enough.
+
+Every ingest's diff is published on AVAILABILITY_CHANGES, a short numbered
+feed of (study_space_id, start_time) changes that caches can use to tell
+whether (and for which rooms) availability moved since they last looked.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+# Diffs AVAILABILITY_CHANGES keeps
+MAX_FEED_ENTRIES = 100
+
+# inserted, updated, deleted: lists of (study_space_id, start_time)
+# unchanged: number of scraped slots already in the table as they were
+AvailabilityDiff = namedtuple("AvailabilityDiff", ["inserted", "updated", "deleted", "unchanged"])
+
+
+def create_availability_tables(cursor):
+    """
+    Create room_availability_scrapes and drop duplicate (study_space_id,
+    start_time) rows left by the old delete-and-reinsert ingest, so the
+    unique index in indexes.sql can be built.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS room_availability_scrapes (
+            study_space_id INTEGER PRIMARY KEY,
+            scraped_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        DELETE FROM room_availability
+        WHERE availability_id NOT IN (
+            SELECT MAX(availability_id) FROM room_availability
+            GROUP BY study_space_id, start_time
+        )
+    """)
+
+
+def diff_slots(existing, scraped):
+    """
+    existing, scraped: {(study_space_id, start_time): (end_time, is_available)}
+    """
+    inserted, updated = [], []
+    unchanged = 0
+    for key, value in scraped.items():
+        current = existing.get(key)
+        if current is None:
+            inserted.append(key)
+        elif current != value:
+            updated.append(key)
+        else:
+            unchanged += 1
+    deleted = [key for key in existing if key not in scraped]
+    return AvailabilityDiff(inserted, updated, deleted, unchanged)
+
+
+def sync_room_availability(conn, locations):
+    """
+    Make room_availability hold exactly the slots in locations, a list of
+    ({room_id: [slot, ...]}, scraped_at) pairs, one per scraped location,
+    and record when each room was scraped. Returns the AvailabilityDiff.
+    """
+    scraped = {}
+    room_scraped_at = {}
+    for availability_data, scraped_at in locations:
+        for room_id, time_slots in availability_data.items():
+            room_scraped_at[int(room_id)] = scraped_at
+            for slot in time_slots:
+                key = (int(room_id), slot["start"])
+                scraped[key] = (slot["end"], 1 if slot["isAvailable"] else 0)
+
+    if conn.in_transaction:
+        raise RuntimeError("sync_room_availability() must not run inside an open transaction")
+
+    # take the write lock before reading, so the diff is against what we write over
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute("SELECT study_space_id, start_time, end_time, is_available FROM room_availability")
+        existing = {(row[0], row[1]): (row[2], row[3]) for row in rows}
+
+        diff = diff_slots(existing, scraped)
+
+        conn.executemany(
+            "DELETE FROM room_availability WHERE study_space_id = ? AND start_time = ?",
+            diff.deleted
+        )
+        conn.executemany("""
+            UPDATE room_availability SET end_time = ?, is_available = ?, scraped_at = ?
+            WHERE study_space_id = ? AND start_time = ?
+        """, [(*scraped[key], room_scraped_at[key[0]], *key) for key in diff.updated])
+        conn.executemany("""
+            INSERT INTO room_availability (
+                study_space_id,
+                start_time,
+                end_time,
+                is_available,
+                scraped_at
+            ) VALUES (?, ?, ?, ?, ?)
+        """, [(*key, *scraped[key], room_scraped_at[key[0]]) for key in diff.inserted])
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO room_availability_scrapes (study_space_id, scraped_at) VALUES (?, ?)",
+            room_scraped_at.items()
+        )
+        conn.execute("""
+            DELETE FROM room_availability_scrapes
+            WHERE study_space_id NOT IN (SELECT study_space_id FROM room_availability)
+        """)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return diff
+
+
+class ChangeFeed:
+    def __init__(self, max_entries=MAX_FEED_ENTRIES):
+        self._lock = threading.Lock()
+        self._entries = deque(maxlen=max_entries)
+        self.version = 0
+
+    def publish(self, diff):
+        """Add one ingest's diff to the feed; returns its version"""
+        with self._lock:
+            self.version += 1
+            self._entries.append((self.version, time.time(), diff))
+            return self.version
+
+    def since(self, version):
+        """
+        [(version, diff), ...] published after version, oldest first, or None
+        if some of them have already dropped off the feed (the caller should
+        then treat everything as changed).
+        """
+        with self._lock:
+            if version >= self.version:
+                return []
+            if not self._entries or self._entries[0][0] > version + 1:
+                return None
+            return [(v, diff) for v, _, diff in self._entries if v > version]
+
+    def changed_spaces(self, version):
+        """study_space_ids with a slot changed after version, or None if unknown"""
+        diffs = self.since(version)
+        if diffs is None:
+            return None
+        return {
+            space_id
+            for _, diff in diffs
+            for space_id, _ in diff.inserted + diff.updated + diff.deleted
+        }
+
+    def stats(self):
+        with self._lock:
+            if not self._entries:
+                return {"version": self.version}
+            version, published_at, diff = self._entries[-1]
+            return {
+                "version": version,
+                "published_at": published_at,
+                "inserted": len(diff.inserted),
+                "updated": len(diff.updated),
+                "deleted": len(diff.deleted),
+                "unchanged": diff.unchanged,
+            }
+
+
+AVAILABILITY_CHANGES = ChangeFeed()
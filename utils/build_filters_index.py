@@ -4,6 +4,7 @@ build_index.py - Build inverted indexes for fast filter-based search
 
 import sqlite3
 import json
+import os
 from pathlib import Path
 from collections import defaultdict
 
@@ -84,9 +85,13 @@ def build_filter_indexes():
     # Convert defaultdicts to regular dicts for JSON
     indexes = {k: dict(v) for k, v in indexes.items()}
     
-    # Save to file
-    with open(INDEX_PATH, 'w') as f:
+    # Save to a temp file and rename it into place, so a search never reads
+    # a half-written index and FilterIndex picks up the new version on its
+    # next mtime check
+    tmp_path = INDEX_PATH.with_suffix(".json.tmp")
+    with open(tmp_path, 'w') as f:
         json.dump(indexes, f, indent=2)
+    os.replace(tmp_path, INDEX_PATH)
     
     print(f"  Built filter indexes")
     for filter_name, filter_values in indexes.items():
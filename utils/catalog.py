@@ -0,0 +1,175 @@
+"""
+catalog.py - Immutable in-memory copy of the study_spaces and buildings tables
+
+The catalog only changes when json_to_db.py repopulates app.db (a few times a
+term), but search, the building list and the personal model read it on every
+request. It is loaded once into compact records keyed by study_space_id and
+building_id, and request handlers hydrate results from those records without
+touching SQLite.
+
+json_to_db.py bumps app.db's PRAGMA user_version after every rewrite. The
+cache re-reads that header field at most every CHECK_INTERVAL seconds and
+loads a new catalog when it changes; the new version is swapped in whole, so
+a reader always sees one consistent catalog.
+"""
+
+import sys
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "data" / "database" / "app.db"
+sys.path.append(str(BASE_DIR))
+
+from utils.db import get_connection
+
+# Seconds between checks of PRAGMA user_version for a newer catalog
+CHECK_INTERVAL = 30
+
+Space = namedtuple("Space", [
+    "study_space_id",
+    "name",
+    "capacity",
+    "must_reserve",
+    "tech_enhanced",
+    "is_indoor",
+    "is_talking_allowed",
+    "building_id",
+    "floor",
+    "building_name",
+    "has_printer",
+    "latitude",
+    "longitude",
+])
+
+Building = namedtuple("Building", [
+    "building_id",
+    "name",
+    "has_printer",
+    "opening_time",
+    "closing_time",
+    "longitude",
+    "latitude",
+])
+
+
+class Catalog:
+    """
+    One immutable version of the catalog.
+
+    spaces:          {study_space_id: Space}, in ascending id order
+    buildings:       {building_id: Building}, in name order
+    space_table:     (columns, rows) of study_spaces exactly as SELECT * returns them
+    building_table:  (columns, rows) of buildings exactly as SELECT * returns them
+
+    The raw tables are kept for the personal model, which joins events
+    against every column of both tables.
+    """
+
+    def __init__(self, version, space_table, building_table):
+        self.version = version
+        self.space_table = space_table
+        self.building_table = building_table
+
+        building_columns, building_rows = building_table
+        buildings = [Building(**dict(zip(building_columns, row))) for row in building_rows]
+        buildings.sort(key=lambda b: b.name)
+        self.buildings = {b.building_id: b for b in buildings}
+
+        space_columns, space_rows = space_table
+        spaces = {}
+        for row in sorted(space_rows, key=lambda r: r[space_columns.index("study_space_id")]):
+            raw = dict(zip(space_columns, row))
+            building = self.buildings.get(raw["building_id"])
+            spaces[raw["study_space_id"]] = Space(
+                study_space_id=raw["study_space_id"],
+                name=raw["name"],
+                capacity=raw["capacity"],
+                must_reserve=raw["must_reserve"],
+                tech_enhanced=raw["tech_enhanced"],
+                is_indoor=raw["is_indoor"],
+                is_talking_allowed=raw["is_talking_allowed"],
+                building_id=raw["building_id"],
+                floor=raw.get("floor"),
+                building_name=building.name if building else None,
+                has_printer=building.has_printer if building else None,
+                latitude=building.latitude if building else None,
+                longitude=building.longitude if building else None,
+            )
+        self.spaces = spaces
+
+        self.spaces_by_building = {}
+        for space in spaces.values():
+            self.spaces_by_building.setdefault(space.building_id, []).append(space)
+
+    @classmethod
+    def from_db(cls, db_conn):
+        cursor = db_conn.cursor()
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+
+        def table(name):
+            cursor.execute(f"SELECT * FROM {name}")
+            columns = [d[0] for d in cursor.description]
+            return columns, cursor.fetchall()
+
+        return cls(version, table("study_spaces"), table("buildings"))
+
+
+class CatalogCache:
+    def __init__(self, db_path=DB_PATH, check_interval=CHECK_INTERVAL):
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._current = None
+        self._checked_at = 0.0
+
+    def _db_version(self):
+        return get_connection(self.db_path).execute("PRAGMA user_version").fetchone()[0]
+
+    def reload(self):
+        """Load the catalog from the database and swap it in"""
+        catalog = Catalog.from_db(get_connection(self.db_path))
+        with self._lock:
+            self._current = catalog
+            self._checked_at = time.monotonic()
+        return catalog
+
+    def get(self):
+        """Return the current catalog, reloading it if json_to_db has rewritten app.db"""
+        current = self._current
+        now = time.monotonic()
+        if current is not None and now - self._checked_at < self.check_interval:
+            return current
+
+        with self._lock:
+            if self._current is not None and now - self._checked_at < self.check_interval:
+                return self._current
+            if self._current is None or self._db_version() != self._current.version:
+                self._current = Catalog.from_db(get_connection(self.db_path))
+            self._checked_at = now
+            return self._current
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_catalog(db_path=DB_PATH):
+    """Return the shared CatalogCache for db_path"""
+    key = str(db_path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = CatalogCache(db_path)
+        return cache
+
+
+def bump_catalog_version(db_conn):
+    """Mark the catalog in db_conn's database as changed so running processes reload it"""
+    version = db_conn.execute("PRAGMA user_version").fetchone()[0]
+    db_conn.execute(f"PRAGMA user_version = {version + 1}")
+
+
+CATALOG = get_catalog(DB_PATH)
@@ -0,0 +1,112 @@
+"""
+db.py - Shared SQLite connections for app.db and user_data.db
+
+Opening a connection (and re-preparing every statement on it) used to cost
+more than most of the queries we run. get_connection() instead hands out
+long-lived connections, set up once with:
+
+    journal_mode=WAL      readers never block on the 5-minute ingest and vice versa
+    synchronous=NORMAL    safe under WAL, avoids an fsync per commit
+    busy_timeout          writers wait for the lock instead of failing
+    mmap_size             read pages straight from the page cache
+    cached_statements     statements stay prepared on the connection after first use
+
+A thread keeps the connection it checked out for as long as it runs. The
+dev server starts a thread per request, so when a thread exits its
+connections go back to a shared pool (up to POOL_SIZE idle ones per
+database; the rest are closed) and the next thread checks one out from
+there, statement cache included, instead of opening a new one. That is why
+connections are opened with check_same_thread=False; only one thread uses
+a connection at a time.
+
+Pooled connections are never closed by callers. Write through them with
+`with conn:` so a failed write rolls back instead of leaving a transaction
+open on a connection the next thread will get.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import weakref
+
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE = 64 * 1024 * 1024
+CACHED_STATEMENTS = 256
+# Idle connections kept per database
+POOL_SIZE = 8
+
+_local = threading.local()
+_pools_lock = threading.Lock()
+_pools = {}
+
+
+class _Checkout:
+    """A thread's checked-out connections, returned to the pool when it exits"""
+
+    def __init__(self):
+        self.connections = {}
+        # holds the dict, not self, so the checkout dies with the thread's locals
+        weakref.finalize(self, _release, self.connections)
+
+
+def _pool(key):
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = queue.LifoQueue(maxsize=POOL_SIZE)
+        return pool
+
+
+def _release(connections):
+    for key, conn in connections.items():
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            _pool(key).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    connections.clear()
+
+
+def _open(db_path):
+    conn = sqlite3.connect(
+        db_path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=False,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    return conn
+
+
+def get_connection(db_path):
+    """Return this thread's connection to db_path, checking one out on first use"""
+    checkout = getattr(_local, "checkout", None)
+    if checkout is None:
+        checkout = _local.checkout = _Checkout()
+    connections = checkout.connections
+
+    key = os.fspath(db_path)
+    conn = connections.get(key)
+    if conn is None:
+        try:
+            conn = _pool(key).get_nowait()
+        except queue.Empty:
+            conn = _open(db_path)
+        connections[key] = conn
+    return conn
+
+
+def close_connections():
+    """Close every connection held by the calling thread"""
+    checkout = getattr(_local, "checkout", None)
+    connections = checkout.connections if checkout is not None else {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
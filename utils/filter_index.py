@@ -0,0 +1,184 @@
+"""
+filter_index.py - Keep the pre-built filter index resident in memory
+
+The index in data/filters_index.json is parsed once per process and shared by
+every search. build_filter_indexes() replaces the file atomically, so a reader
+only has to compare the file's mtime/size against what it loaded to know when
+a new version has landed; the new index is then swapped in as a whole.
+
+Alongside the raw posting lists, each loaded version carries a bitmap form of
+the index: every study space gets a dense ordinal, and every posting list
+becomes a Python int with one bit per ordinal. Matching a filter combination
+is then a handful of integer ANDs instead of building and intersecting sets.
+"""
+
+import json
+import os
+import threading
+from itertools import product
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+INDEX_PATH = BASE_DIR / "data" / "filters_index.json"
+
+BITMAP_FILTERS = [
+    "capacity_ranges",
+    "talking_allowed",
+    "study_room",
+    "indoor",
+    "tech_enhanced",
+    "has_printer",
+    "building",
+]
+
+
+class FilterBitmaps:
+    """
+    Bitmap view of one version of the filter index.
+
+    Bitmaps are plain ints, so AND/OR/NOT are the &, | and negate() operations
+    and memory grows with the number of spaces / 8 per posting list.
+    """
+
+    def __init__(self, indexes):
+        space_ids = set()
+        for name in BITMAP_FILTERS:
+            for ids in indexes.get(name, {}).values():
+                space_ids.update(ids)
+
+        self.space_ids = sorted(space_ids)
+        self.ordinals = {space_id: i for i, space_id in enumerate(self.space_ids)}
+        self.all_bits = (1 << len(self.space_ids)) - 1
+
+        self.bitmaps = {}
+        for name in BITMAP_FILTERS:
+            self.bitmaps[name] = {
+                key: self.to_bitmap(ids)
+                for key, ids in indexes.get(name, {}).items()
+            }
+
+        self._memo = {}
+
+    def to_bitmap(self, space_ids):
+        bits = 0
+        for space_id in space_ids:
+            ordinal = self.ordinals.get(space_id)
+            if ordinal is not None:
+                bits |= 1 << ordinal
+        return bits
+
+    def to_ids(self, bits):
+        """Decode a bitmap back into study_space_ids in ascending order"""
+        ids = []
+        while bits:
+            low = bits & -bits
+            ids.append(self.space_ids[low.bit_length() - 1])
+            bits ^= low
+        return ids
+
+    def bitmap(self, filter_name, key):
+        """Posting list for one filter value, or None if the value is not indexed"""
+        return self.bitmaps.get(filter_name, {}).get(key)
+
+    def negate(self, bits):
+        return self.all_bits & ~bits
+
+    def match(self, terms):
+        """
+        AND together the posting lists for terms, a sequence of
+        (filter_name, key) pairs, and return the matching study_space_ids.
+
+        Results are memoized per combination for the lifetime of this index
+        version. An empty terms sequence matches nothing, same as
+        search_with_filters.
+        """
+        memo_key = tuple(sorted(terms))
+        ids = self._memo.get(memo_key)
+        if ids is not None:
+            return ids
+
+        if not memo_key:
+            ids = ()
+        else:
+            bits = self.all_bits
+            for filter_name, key in memo_key:
+                term_bits = self.bitmap(filter_name, key)
+                if term_bits is None:
+                    bits = 0
+                    break
+                bits &= term_bits
+            ids = tuple(self.to_ids(bits))
+
+        self._memo[memo_key] = ids
+        return ids
+
+    def memoize_all(self, filter_names=("capacity_ranges", "talking_allowed", "study_room",
+                                         "indoor", "tech_enhanced", "has_printer")):
+        """
+        Eagerly compute every combination of the given filters, where each
+        filter is either unset or pinned to one of its indexed values.
+        """
+        choices = [
+            [None] + [(name, key) for key in self.bitmaps.get(name, {})]
+            for name in filter_names
+        ]
+        for combo in product(*choices):
+            self.match([term for term in combo if term is not None])
+        return len(self._memo)
+
+
+class FilterIndex:
+    def __init__(self, index_path=INDEX_PATH, memoize_all=False):
+        self.index_path = Path(index_path)
+        self.memoize_all = memoize_all
+        self._lock = threading.Lock()
+        # (version, indexes, bitmaps) is replaced as one tuple so readers
+        # always see a consistent trio
+        self._current = (None, None, None)
+
+    def _file_version(self):
+        stat = os.stat(self.index_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        version, indexes, bitmaps = self._current
+        file_version = self._file_version()
+        if file_version == version:
+            return self._current
+
+        with self._lock:
+            # another thread may have reloaded while we waited
+            file_version = self._file_version()
+            if file_version != self._current[0]:
+                with open(self.index_path, "r") as f:
+                    indexes = json.load(f)
+                bitmaps = FilterBitmaps(indexes)
+                if self.memoize_all:
+                    bitmaps.memoize_all()
+                self._current = (file_version, indexes, bitmaps)
+            return self._current
+
+    def get(self):
+        """
+        Return the current index dict, reloading it first if the file on disk
+        has been rewritten since it was last loaded.
+
+        The returned dict is shared and must be treated as read-only.
+        """
+        return self._load()[1]
+
+    def bitmaps(self):
+        """Return the FilterBitmaps for the current index version"""
+        return self._load()[2]
+
+    def version(self):
+        """(mtime_ns, size) of the index file the current version was loaded from"""
+        return self._load()[0]
+
+    def reload(self):
+        """Force the next get() to re-read the index file"""
+        with self._lock:
+            self._current = (None, None, None)
+
+
+FILTER_INDEX = FilterIndex()
@@ -3,10 +3,20 @@ json_to_db.py is responsible for...
     * Parsing through data/scraped_info/room_info JSON files and inserting the study space information into the 'study_spaces' table.
     * Parsing through data/scraped_info/buildings.json to insert building information into the 'buildings' table.
 SQLite database is located at data/database/app.db. 
+
+Every table is loaded with executemany() over a generator of rows, all in
+one transaction, with the PRAGMAs in tune_for_bulk_load().
+
+    python utils/json_to_db.py             load the JSON files into the existing app.db
+    python utils/json_to_db.py --rebuild   build a fresh app.db from schema.sql and the
+                                           JSON files, keep the ingested traffic and
+                                           weather tables, and publish it in one step
 """
 
+import os
 import sqlite3
 import json
+import time
 from pathlib import Path
 from datetime import datetime
 import sys
@@ -15,6 +25,8 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT_DIR))
 
 from personal_model.floor_info import correspondence
+from utils.catalog import bump_catalog_version
+from utils.migrate_db import migrate_connection
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -22,6 +34,7 @@ ROOM_DATA_DIR = BASE_DIR / "data" / "scraped_info" / "room_info"
 ROOM_AVAILABILITY_DATA_DIR = BASE_DIR / "data" / "scraped_info" / "room_availability"
 BUILDINGS_DATA_DIR = BASE_DIR / "data" / "scraped_info"
 DB_PATH = BASE_DIR / "data" / "database" / "app.db"
+SCHEMA_PATH = BASE_DIR / "data" / "database" / "schema.sql"
 
 ROOMS_JSON = [
     ROOM_DATA_DIR / "ALP_room_info.json", 
@@ -42,6 +55,12 @@ ROOM_AVAILABILITY_JSON = [
     ROOM_AVAILABILITY_DATA_DIR / "Science_room_availability.json",
 ]
 
+# Tables the ingest jobs fill rather than the JSON files; --rebuild copies them over
+INGESTED_TABLES = ["library_traffic", "library_traffic_latest", "hourly_weather"]
+
+# Page cache for the load, in KiB (negative cache_size)
+BULK_CACHE_KIB = 64 * 1024
+
 def bool_to_int(value):
     """Convert Python boolean or None to SQLite-friendly int"""
     if value is None:
@@ -53,20 +72,9 @@ def load_json(path):
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def insert_buildings(cursor, buildings_dict):
-    """Insert buildings from JSON dict where keys are building_ids"""
+def building_rows(buildings_dict):
     for building_id, building_data in buildings_dict.items():
-        cursor.execute("""
-            INSERT OR REPLACE INTO buildings (
-                building_id,
-                name,
-                has_printer,
-                opening_time,
-                closing_time,
-                longitude,
-                latitude
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
+        yield (
             building_id,
             building_data["name"],
             bool_to_int(building_data.get("has_printer")),
@@ -74,22 +82,25 @@ def insert_buildings(cursor, buildings_dict):
             building_data.get("closing_time"),
             building_data.get("longitude"),
             building_data.get("latitude")
-        ))
+        )
 
-def insert_study_spaces(cursor, rooms):
+def insert_buildings(cursor, buildings_dict):
+    """Insert buildings from JSON dict where keys are building_ids"""
+    cursor.executemany("""
+        INSERT OR REPLACE INTO buildings (
+            building_id,
+            name,
+            has_printer,
+            opening_time,
+            closing_time,
+            longitude,
+            latitude
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, building_rows(buildings_dict))
+
+def study_space_rows(rooms):
     for r in rooms:
-        cursor.execute("""
-            INSERT OR REPLACE INTO study_spaces (
-                study_space_id,
-                name,
-                capacity,
-                must_reserve,
-                tech_enhanced,
-                is_indoor,
-                is_talking_allowed,
-                building_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        yield (
             r["id"],
             r["name"],
             r.get("capacity"),
@@ -98,115 +109,215 @@ def insert_study_spaces(cursor, rooms):
             bool_to_int(r.get("is_indoor")),
             bool_to_int(r.get("is_talking_allowed")),
             r.get("building_id")
-        ))
+        )
 
-def insert_room_availability(cursor, availability_data):
-    """Insert new availability data"""
-    scraped_at = datetime.now().isoformat()
-    
+def insert_study_spaces(cursor, rooms):
+    cursor.executemany("""
+        INSERT OR REPLACE INTO study_spaces (
+            study_space_id,
+            name,
+            capacity,
+            must_reserve,
+            tech_enhanced,
+            is_indoor,
+            is_talking_allowed,
+            building_id
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, study_space_rows(rooms))
+
+def room_availability_rows(availability_data, scraped_at):
     for room_id, time_slots in availability_data.items():
         for slot in time_slots:
-            cursor.execute("""
-                INSERT INTO room_availability (
-                    study_space_id,
-                    start_time,
-                    end_time,
-                    is_available,
-                    scraped_at
-                ) VALUES (?, ?, ?, ?, ?)
-            """, (
+            yield (
                 int(room_id),
                 slot["start"],
                 slot["end"],
                 1 if slot["isAvailable"] else 0,
                 scraped_at
-            ))
+            )
+
+def insert_room_availability(cursor, availability_data):
+    """Insert new availability data, replacing slots that are already there"""
+    scraped_at = datetime.now().isoformat()
+
+    cursor.executemany("""
+        INSERT OR REPLACE INTO room_availability (
+            study_space_id,
+            start_time,
+            end_time,
+            is_available,
+            scraped_at
+        ) VALUES (?, ?, ?, ?, ?)
+    """, room_availability_rows(availability_data, scraped_at))
             
-def add_floor_column():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+def add_floor_column(cursor):
     try:
-        cur.execute("ALTER TABLE study_spaces ADD COLUMN floor TEXT")
-        conn.commit()
+        cursor.execute("ALTER TABLE study_spaces ADD COLUMN floor TEXT")
     except sqlite3.OperationalError as e:
         # column already exists or other schema error
         if "duplicate column name" not in str(e).lower():
             raise
-    finally:
-        conn.close()
-
-def store_floor_info_manually_collected():
-    rooms = load_json(ROOMS_JSON[-1])
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    for r in rooms:
-        cur.execute("""
-            UPDATE study_spaces
-            SET floor = ?
-            WHERE study_space_id = ?
-        """, (
-            r.get("floor"),   # safer than manual key check
-            r["id"]
-    ))
-        
-    conn.commit()
-    conn.close()
-    
-def store_floor_information():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    updates = [
-        (building_and_floor[1], study_space_id)   # value[1] is floor text
-        for study_space_id, building_and_floor in correspondence.items()
-    ]
 
-    cur.executemany("""
+def update_floors(cursor, updates):
+    cursor.executemany("""
         UPDATE study_spaces
         SET floor = ?
         WHERE study_space_id = ?
     """, updates)
 
-    conn.commit()
-    conn.close()
+def store_floor_info_manually_collected(cursor):
+    rooms = load_json(ROOMS_JSON[-1])
+    update_floors(cursor, ((r.get("floor"), r["id"]) for r in rooms))
+    
+def store_floor_information(cursor):
+    update_floors(cursor, (
+        (building_and_floor[1], study_space_id)   # value[1] is floor text
+        for study_space_id, building_and_floor in correspondence.items()
+    ))
 
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def tune_for_bulk_load(conn, scratch=False):
+    """
+    PRAGMAs for one large write transaction. scratch=True is for a file no
+    other connection has open yet (--rebuild): no journal and no fsyncs,
+    since a crash just means building it again.
+    """
+    conn.execute(f"PRAGMA cache_size = -{BULK_CACHE_KIB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if scratch:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+    else:
+        conn.execute("PRAGMA synchronous = NORMAL")
 
+
+def populate(conn):
+    """Load every JSON file into conn's database in one transaction"""
     print("🗄️  Populating database...")
 
-    print(f'Inserting buildings...')
-    buildings = load_json(BUILDINGS_JSON)
-    insert_buildings(cursor, buildings)
-    print(f"  Inserted {len(buildings)} buildings")
-   
-    print(f'Inserting study rooms...')
-    for json_file in ROOMS_JSON:
-        rooms = load_json(json_file)
-        insert_study_spaces(cursor, rooms)
-        print(f"  Inserted {len(rooms)} study spaces from {json_file.name}")
-    
+    with conn:
+        cursor = conn.cursor()
 
-    print(f'Inserting room availability...')
-    for json_file in ROOM_AVAILABILITY_JSON:
+        print(f'Inserting buildings...')
+        buildings = load_json(BUILDINGS_JSON)
+        insert_buildings(cursor, buildings)
+        print(f"  Inserted {len(buildings)} buildings")
+       
+        print(f'Inserting study rooms...')
+        for json_file in ROOMS_JSON:
+            rooms = load_json(json_file)
+            insert_study_spaces(cursor, rooms)
+            print(f"  Inserted {len(rooms)} study spaces from {json_file.name}")
+
+        print(f'Inserting room availability...')
+        for json_file in ROOM_AVAILABILITY_JSON:
             room_availability = load_json(json_file)
             insert_room_availability(cursor, room_availability)
             print(f"  Inserted {len(room_availability)} room's availability from {json_file.name}")
+
+        print("  Add floor information into database")
+        add_floor_column(cursor)
+        store_floor_information(cursor)
+        store_floor_info_manually_collected(cursor)
     
     print("🗄️  Done populating database...")
 
-    conn.commit()
-    conn.close()
 
-    print("  Database populated successfully")
+def copy_ingested_tables(conn, live_path):
+    """Copy INGESTED_TABLES from the live database at live_path into conn's"""
+    conn.execute("ATTACH DATABASE ? AS live", (str(live_path),))
+    try:
+        live_tables = {row[0] for row in conn.execute("SELECT name FROM live.sqlite_master WHERE type = 'table'")}
+        with conn:
+            for table in INGESTED_TABLES:
+                if table not in live_tables:
+                    continue
+                columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA main.table_info({table})"))
+                conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM live.{table}")
+                print(f"  Kept {conn.execute(f'SELECT COUNT(*) FROM main.{table}').fetchone()[0]} rows of {table}")
+    finally:
+        conn.execute("DETACH DATABASE live")
+
+
+def main():
+    started = time.perf_counter()
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        tune_for_bulk_load(conn)
+        populate(conn)
+
+        print("  Create indexes")
+        migrate_connection(conn)
+
+        # tell running API processes to reload their in-memory catalog
+        bump_catalog_version(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+    print(f"  Database populated successfully in {time.perf_counter() - started:.2f}s")
+
+
+def rebuild(db_path=DB_PATH):
+    """
+    Build a fresh database next to db_path from schema.sql and the JSON
+    files, with the ingested tables copied from the current one, then
+    publish it.
+
+    Without a current database the fresh file is simply renamed into place.
+    Otherwise it is copied over the live one with SQLite's online backup,
+    which writes every page in one transaction: running processes keep
+    their pooled connections and see the old database or the new one.
+    (Renaming a new file over a database that is open in WAL mode is not
+    safe: the -wal and -shm files next to it belong to the old file.)
+    """
+    started = time.perf_counter()
+    db_path = Path(db_path)
+    fresh_path = db_path.with_name(db_path.name + ".rebuild")
+    fresh_path.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(fresh_path)
+    try:
+        tune_for_bulk_load(conn, scratch=True)
+        conn.executescript(SCHEMA_PATH.read_text(encoding="utf-8"))
+        populate(conn)
+
+        version = 0
+        if db_path.exists():
+            copy_ingested_tables(conn, db_path)
+            live = sqlite3.connect(db_path)
+            version = live.execute("PRAGMA user_version").fetchone()[0]
+            live.close()
+
+        # indexes are cheaper to build once the rows are in
+        print("  Create indexes")
+        migrate_connection(conn)
+
+        # tell running API processes to reload their in-memory catalog
+        conn.execute(f"PRAGMA user_version = {version + 1}")
+
+        if db_path.exists():
+            live = sqlite3.connect(db_path, timeout=30)
+            try:
+                conn.backup(live)
+            finally:
+                live.close()
+            conn.close()
+            fresh_path.unlink()
+        else:
+            conn.close()
+            with open(fresh_path, "rb+") as f:
+                os.fsync(f.fileno())
+            os.replace(fresh_path, db_path)
+    except Exception:
+        conn.close()
+        fresh_path.unlink(missing_ok=True)
+        raise
 
-    print("  Add floor information into database")
-    add_floor_column()
-    store_floor_information()
-    store_floor_info_manually_collected()
+    print(f"  Database rebuilt successfully in {time.perf_counter() - started:.2f}s")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--rebuild" in sys.argv:
+        rebuild()
+    else:
+        main()
@@ -1,4 +1,5 @@
 import sqlite3
+import sys
 import requests
 from pathlib import Path
 
@@ -8,6 +9,10 @@ params = [{"libraryName": "Langson Library"}, {"libraryName": "Science Library"}
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "data" / "database" / "app.db"
+sys.path.append(str(BASE_DIR))
+
+from utils.db import get_connection
+from utils.search_cache import SEARCH_CACHE
 
 class LibraryTraffic:
     def __init__(self, url, params, DB_PATH):
@@ -27,6 +32,67 @@ class LibraryTraffic:
     def clear_library_database(self, cursor):
         cursor.execute("DELETE FROM library_traffic;")
 
+    def create_latest_table(self, cursor):
+        """
+        library_traffic keeps every reading for analytics; ranking only needs
+        the newest reading per location, kept in library_traffic_latest.
+        Seed it from the history the first time it is created.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS library_traffic_latest (
+                location_name TEXT PRIMARY KEY,
+                building_id TEXT,
+                traffic_count INTEGER,
+                traffic_percentage REAL,
+                timestamp TEXT
+            )
+        """)
+        cursor.execute("SELECT 1 FROM library_traffic_latest LIMIT 1")
+        if cursor.fetchone() is None:
+            cursor.execute("""
+                INSERT OR REPLACE INTO library_traffic_latest (
+                    location_name,
+                    building_id,
+                    traffic_count,
+                    traffic_percentage,
+                    timestamp
+                )
+                SELECT location_name, building_id, traffic_count, traffic_percentage, timestamp
+                FROM (
+                    SELECT *,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY location_name
+                            ORDER BY timestamp DESC, id DESC
+                        ) AS rn
+                    FROM library_traffic
+                    WHERE location_name IS NOT NULL
+                )
+                WHERE rn = 1
+            """)
+
+    def upsert_latest_traffic(self, cursor, building_id, data):
+        cursor.execute("""
+            INSERT INTO library_traffic_latest (
+                location_name,
+                building_id,
+                traffic_count,
+                traffic_percentage,
+                timestamp
+            ) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(location_name) DO UPDATE SET
+                building_id = excluded.building_id,
+                traffic_count = excluded.traffic_count,
+                traffic_percentage = excluded.traffic_percentage,
+                timestamp = excluded.timestamp
+            WHERE excluded.timestamp >= library_traffic_latest.timestamp
+        """, (
+            data["locationName"],
+            building_id,
+            data["trafficCount"],
+            data["trafficPercentage"],
+            data["timestamp"]
+        ))
+
     def insert_library_traffic_data(self, cursor, data):
         building_id = self.get_building_id(cursor, data["libraryName"])
         cursor.execute("""
@@ -44,22 +110,32 @@ class LibraryTraffic:
             data["trafficPercentage"],
             data["timestamp"]
         ))
+        self.upsert_latest_traffic(cursor, building_id, data)
 
 
     def update_database(self):
-        conn = sqlite3.connect(self.DB_PATH)
-        cursor = conn.cursor()
-        #self.clear_library_database(cursor)
+        # fetch everything before touching the database, so no write lock is
+        # held while waiting on the network
+        readings = []
         for param in params:
             resp = requests.get(url, params=param, timeout=15)
             resp.raise_for_status()
 
             payload = resp.json()
-            for item in payload.get("data", []):
+            readings.extend(payload.get("data", []))
+
+        # one transaction, so searches see all of this refresh's readings or
+        # none of them
+        conn = get_connection(self.DB_PATH)
+        with conn:
+            cursor = conn.cursor()
+            #self.clear_library_database(cursor)
+            self.create_latest_table(cursor)
+            for item in readings:
                 self.insert_library_traffic_data(cursor, item)
 
-        conn.commit()
-        conn.close()
+        # cached searches hold the previous traffic readings
+        SEARCH_CACHE.invalidate()
 
 def main():
     library_traffic = LibraryTraffic(url, params,DB_PATH)
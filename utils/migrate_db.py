@@ -0,0 +1,45 @@
+"""
+migrate_db.py - Bring an existing app.db up to the current schema
+
+Applies data/database/indexes.sql and creates tables that were added after
+the database was first populated. Safe to run any number of times.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_DIR))
+
+from utils.availability_sync import create_availability_tables
+from utils.library_traffic import LibraryTraffic
+
+DB_PATH = BASE_DIR / "data" / "database" / "app.db"
+INDEXES_PATH = BASE_DIR / "data" / "database" / "indexes.sql"
+
+
+def create_indexes(conn):
+    conn.executescript(INDEXES_PATH.read_text(encoding="utf-8"))
+
+
+def migrate_connection(conn):
+    cur = conn.cursor()
+    LibraryTraffic(None, [], None).create_latest_table(cur)
+    create_availability_tables(cur)
+    conn.commit()
+    create_indexes(conn)
+    conn.commit()
+
+
+def migrate(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate_connection(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate()
+    print(f"  Migrated {DB_PATH}")
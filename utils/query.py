@@ -2,9 +2,10 @@
 query.py - Search the inverted index and answer user queries
 """
 
-import sqlite3
+import heapq
 import json
 import math
+import numpy as np
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 import pytz
@@ -12,7 +13,12 @@ import sys
 from dateutil import parser  
 ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(ROOT_DIR))
-from personal_model.personal_model_process import PersonalModel
+from personal_model.model_cache import MODEL_CACHE
+from utils.filter_index import FILTER_INDEX
+from utils.availability_index import AVAILABILITY_INDEX
+from utils.catalog import CATALOG
+from utils.db import get_connection
+from utils.search_cache import SEARCH_CACHE, canonical_filters
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "data" / "database" / "app.db"
@@ -20,15 +26,19 @@ PERSONAL_MODEL_DB_PATH = BASE_DIR / "data" / "database" / "user_data.db"
 INDEX_PATH = BASE_DIR / "data" / "filters_index.json"
 
 def load_index():
-    """Load the pre-built filter index"""
-    with open(INDEX_PATH, 'r') as f:
-        return json.load(f)
+    """
+    Return the pre-built filter index. The index is kept resident in memory
+    and only re-parsed when build_filter_indexes() writes a new version.
+    """
+    return FILTER_INDEX.get()
 
 
 def search_with_filters(filters):
     """
     Based on the filters the user has specified, extract the study rooms matching each filter
     from the inverted index. Then, intersect to get only the study room ids that match all filters.
+    Posting lists are kept as bitmaps (see filter_index.py), so the intersection is a few
+    integer ANDs and repeated combinations are served from a memo.
 
     Args:
         filters (dict): Filter criteria
@@ -44,49 +54,24 @@ def search_with_filters(filters):
     Returns:
         list: List of matching study_space_ids
     """
-    indexes = load_index()
-    result_sets = []
+    bitmaps = FILTER_INDEX.bitmaps()
+    terms = []
 
     if "capacity_range" in filters and filters["capacity_range"]:
         key = str(filters["capacity_range"])
-        if key in indexes["capacity_ranges"]:
-            result_sets.append(set(indexes["capacity_ranges"][key]))
-        else:
+        if bitmaps.bitmap("capacity_ranges", key) is None:
             return []
+        terms.append(("capacity_ranges", key))
 
-    if "talking_allowed" in filters and filters["talking_allowed"] is not None:
-        key = str(filters["talking_allowed"]).lower()
-        if key in indexes["talking_allowed"]:
-            result_sets.append(set(indexes["talking_allowed"][key]))
-
-    if "study_room" in filters and filters["study_room"] is not None:
-        key = str(filters["study_room"]).lower()
-        if key in indexes["study_room"]:
-            result_sets.append(set(indexes["study_room"][key]))
+    # Boolean filters whose value is not in the index are ignored rather
+    # than treated as "no match"
+    for filter_name in ["talking_allowed", "study_room", "indoor", "tech_enhanced", "has_printer"]:
+        if filter_name in filters and filters[filter_name] is not None:
+            key = str(filters[filter_name]).lower()
+            if bitmaps.bitmap(filter_name, key) is not None:
+                terms.append((filter_name, key))
 
-    if "indoor" in filters and filters["indoor"] is not None:
-        key = str(filters["indoor"]).lower()
-        if key in indexes["indoor"]:
-            result_sets.append(set(indexes["indoor"][key]))
-
-    if "tech_enhanced" in filters and filters["tech_enhanced"] is not None:
-        key = str(filters["tech_enhanced"]).lower()
-        if key in indexes["tech_enhanced"]:
-            result_sets.append(set(indexes["tech_enhanced"][key]))
-
-    if "has_printer" in filters and filters["has_printer"] is not None:
-        key = str(filters["has_printer"]).lower()
-        if key in indexes["has_printer"]:
-            result_sets.append(set(indexes["has_printer"][key]))
-
-    if not result_sets:
-        return []
-
-    matching_spaces = result_sets[0]
-    for result_set in result_sets[1:]:
-        matching_spaces = matching_spaces.intersection(result_set)
-
-    return list(matching_spaces)
+    return list(bitmaps.match(terms))
 
 
 def get_next_slot_start_pacific() -> str:
@@ -118,37 +103,18 @@ def get_end_of_day_pacific() -> str:
 def check_current_availability_window(db_conn, space_ids, start_time=None, end_time=None):
     """
     Checks availability for spaces that require reservation starting from the next open 30 minute time slot to the end of day (11:30 PM Pacific).
+
+    Answered from the in-memory availability index (see availability_index.py);
+    db_conn is only used to build the index if this process has not loaded it yet.
     """
     if not space_ids:
         return []
 
-    cursor = db_conn.cursor()
-    placeholders = ",".join("?" * len(space_ids))
-
     slot_start = start_time if start_time else get_next_slot_start_pacific()
     slot_end = get_end_of_day_pacific()
 
     # Compare raw strings directly — no datetime() conversion, stays in Pacific
-    query = f"""
-    SELECT DISTINCT s.study_space_id
-    FROM study_spaces s
-    LEFT JOIN room_availability ra
-        ON s.study_space_id = ra.study_space_id
-    WHERE s.study_space_id IN ({placeholders})
-    AND (
-        s.must_reserve = 0
-        OR (
-            s.must_reserve = 1
-            AND ra.is_available = 1
-            AND ra.start_time >= ?
-            AND ra.start_time <= ?
-            AND ra.scraped_at > datetime('now', '-24 hours')
-        )
-    )
-    """
-    params = space_ids + [slot_start, slot_end]
-    cursor.execute(query, params)
-    return [row[0] for row in cursor.fetchall()]
+    return AVAILABILITY_INDEX.snapshot(db_conn).available_between(space_ids, slot_start, slot_end)
 
 def check_next_slot_availability_window(db_conn, space_ids):
     """
@@ -174,90 +140,48 @@ def check_next_slot_availability_window(db_conn, space_ids):
     slot_start_str = next_slot_start.strftime("%Y-%m-%dT%H:%M:%S%z").replace("+0800", "+08:00").replace("-0800", "-08:00")
     slot_end_str = next_slot_end.strftime("%Y-%m-%dT%H:%M:%S%z").replace("+0800", "+08:00").replace("-0800", "-08:00")
 
-    cursor = db_conn.cursor()
-    placeholders = ",".join("?" * len(space_ids))
-
-    query = f"""
-    SELECT DISTINCT s.study_space_id
-    FROM study_spaces s
-    LEFT JOIN room_availability ra
-        ON s.study_space_id = ra.study_space_id
-    WHERE s.study_space_id IN ({placeholders})
-    AND (
-        s.must_reserve = 0
-        OR (
-            s.must_reserve = 1
-            AND ra.is_available = 1
-            AND ra.start_time = ?
-            AND ra.end_time = ?
-            AND ra.scraped_at > datetime('now', '-24 hours')
-        )
-    )
-    """
-    params = space_ids + [slot_start_str, slot_end_str]
-    cursor.execute(query, params)
-    return [row[0] for row in cursor.fetchall()]
+    return AVAILABILITY_INDEX.snapshot(db_conn).available_at(space_ids, slot_start_str, slot_end_str)
 
 
 def get_space_details(db_conn, space_ids, filters=None):
     """
-    Fetch full details for matching spaces.
+    Fetch full details for matching spaces from the in-memory catalog.
 
     Args:
         space_ids (list): List of study_space_ids
 
     Returns:
-        list: List of dicts with space details
+        list: List of dicts with space details, in ascending id order
     """
     if not space_ids:
         return []
 
-    cursor = db_conn.cursor()
-    placeholders = ','.join('?' * len(space_ids))
-
-    query = f"""
-        SELECT
-            s.study_space_id,
-            s.name,
-            s.capacity,
-            s.is_talking_allowed,
-            s.must_reserve,
-            s.is_indoor,
-            s.tech_enhanced,
-            s.building_id,
-            s.floor,
-            b.name as building_name,
-            b.has_printer,
-            b.latitude,
-            b.longitude
-        FROM study_spaces s
-        LEFT JOIN buildings b ON s.building_id = b.building_id
-        WHERE s.study_space_id IN ({placeholders})
-    """
-    params = space_ids
-
+    catalog = CATALOG.get()
+    building = None
     if filters and "building" in filters and filters["building"]:
-        query += " AND UPPER(b.name) = ?"
-        params = space_ids + [filters["building"].upper()]
-
-    cursor.execute(query, params)
+        building = filters["building"].upper()
 
     results = []
-    for row in cursor.fetchall():
+    for space_id in sorted(set(space_ids)):
+        space = catalog.spaces.get(space_id)
+        if space is None:
+            continue
+        if building is not None and (space.building_name is None or space.building_name.upper() != building):
+            continue
         results.append({
-            "id": row[0],
-            "name": row[1],
-            "capacity": row[2],
-            "talking_allowed": bool(row[3]),
-            "must_reserve": bool(row[4]),
-            "indoor": bool(row[5]),
-            "tech_enhanced": bool(row[6]),
-            "building_id": row[7],
-            "floor": row[8],
-            "building_name": row[9],
-            "has_printer": bool(row[10]) if row[10] is not None else None,
-            "latitude": row[11],
-            "longitude": row[12]
+            "id": space.study_space_id,
+            "name": space.name,
+            "capacity": space.capacity,
+            "talking_allowed": bool(space.is_talking_allowed),
+            "must_reserve": bool(space.must_reserve),
+            "indoor": bool(space.is_indoor),
+            "tech_enhanced": bool(space.tech_enhanced),
+            "building_id": space.building_id,
+            "floor": space.floor,
+            "building_name": space.building_name,
+            "has_printer": bool(space.has_printer) if space.has_printer is not None else None,
+            "latitude": space.latitude,
+            "longitude": space.longitude
         })
 
     return results
@@ -438,6 +362,136 @@ def compute_final_score(space, probability_map, user_location=None,
     return round(score, 4)
 
 
+def _near_rounding_edge(values, decimals):
+    """True where values are close enough to a rounding tie that a 1-ulp difference could flip them"""
+    scaled = values * 10 ** decimals
+    return np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+
+
+def _round4(values):
+    """
+    Round an array to 4 decimals exactly like Python's round(x, 4).
+
+    np.round scales by 10**4 before rounding, which can land on the other
+    side of a .5 tie than Python's correctly-rounded round(); the few values
+    that sit that close to a tie are rounded one at a time instead.
+    """
+    rounded = np.round(values, 4)
+    for i in np.flatnonzero(_near_rounding_edge(values, 4)):
+        rounded[i] = round(float(values[i]), 4)
+    return rounded
+
+
+def score_spaces(spaces, probability_map, user_location=None,
+                 traffic_map=None, preferred_traffic_range=None,
+                 prob_weight=0.6, distance_weight=0.2, traffic_weight=0.2,
+                 distance_decay_km=2):
+    """
+    Vectorized compute_final_score() over a list of spaces.
+
+    Distance, traffic match and the weighted score are computed for every
+    space in one NumPy pass, with the same weights, rescaling and rounding as
+    compute_final_score(). Each space dict gets the same `distance_text` /
+    `traffic_percentage` / `traffic_estimated` keys compute_final_score()
+    would attach.
+
+    NumPy's sin/cos/atan2 can differ from the math module's in the last bit,
+    so any space whose score or distance text sits right on a rounding edge
+    is re-scored with compute_final_score() to keep outputs identical.
+
+    Returns:
+        list[float]: Scores in the same order as spaces
+    """
+    n = len(spaces)
+    if n == 0:
+        return []
+
+    ids = [space["id"] for space in spaces]
+    base_score = np.array([probability_map.get(spot_id, 0.0) for spot_id in ids], dtype=float)
+
+    # --- distance component ---
+    latitude = np.array([np.nan if s.get("latitude") is None else s["latitude"] for s in spaces], dtype=float)
+    longitude = np.array([np.nan if s.get("longitude") is None else s["longitude"] for s in spaces], dtype=float)
+    has_location = ~(np.isnan(latitude) | np.isnan(longitude))
+    if not user_location:
+        has_location[:] = False
+
+    distance_km = np.full(n, np.nan)
+    distance_score = np.zeros(n)
+    if has_location.any():
+        deg_to_rad = math.pi / 180
+        lat1 = user_location["latitude"]
+        lon1 = user_location["longitude"]
+        phi1 = lat1 * deg_to_rad
+        phi2 = latitude * deg_to_rad
+        delta_phi = (latitude - lat1) * deg_to_rad
+        delta_lambda = (longitude - lon1) * deg_to_rad
+
+        a = (np.sin(delta_phi / 2) ** 2 +
+             math.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2)
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        distance_km = np.where(has_location, 6371 * c, np.nan)
+        distance_score = np.where(has_location, np.maximum(0.0, 1.0 - (distance_km / distance_decay_km)), 0.0)
+
+    # --- traffic component ---
+    if traffic_map is not None:
+        entries = [traffic_map.get(spot_id) for spot_id in ids]
+        if preferred_traffic_range is None:
+            traffic_score = np.full(n, 0.5)
+        else:
+            current = np.array([
+                np.nan if not entry or entry.get("traffic_percentage") is None else entry["traffic_percentage"]
+                for entry in entries
+            ], dtype=float)
+            low, high = preferred_traffic_range
+            deviation = np.minimum(np.abs(current - low), np.abs(current - high))
+            outside = _round4(np.maximum(0.0, 1.0 - (deviation / 0.5)))
+            traffic_score = np.where(
+                np.isnan(current), 0.5,
+                np.where((low <= current) & (current <= high), 1.0, outside)
+            )
+        effective_prob_w = prob_weight
+        effective_dist_w = distance_weight
+        effective_traffic_w = traffic_weight
+    else:
+        entries = None
+        effective_prob_w = prob_weight + traffic_weight / 2
+        effective_dist_w = distance_weight + traffic_weight / 2
+        effective_traffic_w = 0.0
+        traffic_score = np.zeros(n)
+
+    total_weight = effective_prob_w + effective_dist_w + effective_traffic_w
+    score = (
+        (effective_prob_w * base_score) +
+        (effective_dist_w * distance_score) +
+        (effective_traffic_w * traffic_score)
+    ) / total_weight
+    scores = _round4(score)
+
+    distance_miles = distance_km * 0.621371
+    recheck = _near_rounding_edge(score, 4) | (
+        has_location & (_near_rounding_edge(distance_miles, 1) | (np.abs(distance_miles - 0.1) < 1e-9))
+    )
+
+    results = scores.tolist()
+    for i, space in enumerate(spaces):
+        if recheck[i]:
+            results[i] = compute_final_score(
+                space, probability_map, user_location,
+                traffic_map=traffic_map, preferred_traffic_range=preferred_traffic_range,
+                prob_weight=prob_weight, distance_weight=distance_weight,
+                traffic_weight=traffic_weight, distance_decay_km=distance_decay_km,
+            )
+            continue
+
+        space["distance_text"] = format_distance_text(distance_km[i]) if has_location[i] else None
+        if entries is not None and entries[i]:
+            space["traffic_percentage"] = entries[i].get("traffic_percentage")
+            space["traffic_estimated"] = entries[i].get("traffic_estimated", False)
+
+    return results
+
+
 def display_ranked_results(ranked_spaces, top_n=10):
     """Display ranked results in a user-friendly format"""
     if not ranked_spaces:
@@ -496,8 +550,10 @@ def progressive_filter_search(db_conn, filters, avg_stats, debug=False):
     If nothing is available, relax the lowest-priority constraint and retry.
     Keep relaxing until we find available rooms or run out of constraints.
 
-    Availability is checked at every step so relaxation is driven by what the
-    user can actually walk into right now — not just what exists in the index.
+    Availability drives relaxation, so it is checked for every level — but
+    only once: each relaxation level's matches are a cheap index lookup, so
+    we compute them all up front, run a single availability query over the
+    union of their candidates, and then intersect level by level in memory.
 
     Args:
         db_conn:    SQLite connection (needed for availability checks)
@@ -517,18 +573,38 @@ def progressive_filter_search(db_conn, filters, avg_stats, debug=False):
         return [], filters
 
     relax_order = _build_relax_order(filters, avg_stats)
+
+    # --- hard filter pass for every relaxation level ---
+    # levels[0] uses every filter; levels[i] drops the i weakest constraints
     active_filters = filters.copy()
+    levels = [(active_filters.copy(), search_with_filters(active_filters))]
+    for to_remove in relax_order:
+        active_filters.pop(to_remove, None)
+        levels.append((active_filters.copy(), search_with_filters(active_filters)))
 
-    while True:
-        # --- hard filter pass ---
-        matching_ids = search_with_filters(active_filters)
+    candidate_ids = []
+    seen = set()
+    for _, matching_ids in levels:
+        for space_id in matching_ids:
+            if space_id not in seen:
+                seen.add(space_id)
+                candidate_ids.append(space_id)
 
+    # --- one availability check for the whole candidate union ---
+    available_now = set(check_current_availability_window(db_conn, candidate_ids))
+
+    if debug:
+        print(f"[progressive] Relax order    : {relax_order}")
+        print(f"[progressive] Candidates     : {len(candidate_ids)} room(s), {len(available_now)} available now")
+
+    for step, (level_filters, matching_ids) in enumerate(levels):
         if debug:
-            print(f"[progressive] Active filters : {active_filters}")
+            if step > 0:
+                print(f"[progressive] Relaxing constraint: '{relax_order[step - 1]}'")
+            print(f"[progressive] Active filters : {level_filters}")
             print(f"[progressive] Filter matches : {len(matching_ids)} room(s)")
 
-        # --- availability check on this candidate set ---
-        available_ids = check_current_availability_window(db_conn, matching_ids)
+        available_ids = [space_id for space_id in matching_ids if space_id in available_now]
 
         if debug:
             print(f"[progressive] Available now  : {len(available_ids)} room(s)")
@@ -537,38 +613,28 @@ def progressive_filter_search(db_conn, filters, avg_stats, debug=False):
             # We have at least one room that matches the current constraints
             # AND is available right now — no need to relax further.
             if debug:
-                relaxed = set(filters.keys()) - set(active_filters.keys())
+                relaxed = set(filters.keys()) - set(level_filters.keys())
                 if relaxed:
                     print(f"[progressive] Relaxed constraints: {relaxed}")
                 else:
                     print("[progressive] All constraints satisfied.")
-            return available_ids, active_filters
-
-        # --- nothing available: relax the weakest remaining constraint ---
-        if not relax_order:
-            if debug:
-                print("[progressive] No constraints left to relax. No results found.")
-            break
+            return available_ids, level_filters
 
-        to_remove = relax_order.pop(0)
-        active_filters.pop(to_remove, None)
-
-        if debug:
-            print(f"[progressive] Relaxing constraint: '{to_remove}'")
+    if debug:
+        print("[progressive] No constraints left to relax. No results found.")
 
-    return [], active_filters
+    return [], levels[-1][0]
 
 
 def get_all_study_space_ids(db_conn):
-    cursor = db_conn.cursor()
-    cursor.execute("SELECT study_space_id FROM study_spaces")
-    return [row[0] for row in cursor.fetchall()]
+    return list(CATALOG.get().spaces)
 
 
 def _rank_spaces(space_details, personal_model, user_location, traffic_map=None):
     """
-    Score and sort a list of space detail dicts using the personal model,
+    Score a list of space detail dicts using the personal model,
     distance from the user's current location, and live traffic data.
+    Ordering is left to ranking_key() so callers can take just one page.
 
     Args:
         space_details (list[dict]): Spaces to rank
@@ -577,7 +643,7 @@ def _rank_spaces(space_details, personal_model, user_location, traffic_map=None)
         traffic_map (dict | None): Output of build_traffic_map(), or None
 
     Returns:
-        list[dict]: Spaces sorted by score descending, each with a "score" key
+        list[dict]: The same spaces, each with a "score" key
     """
     available_ids = [s["id"] for s in space_details]
     probability_results = personal_model.probability(available_ids)
@@ -590,21 +656,124 @@ def _rank_spaces(space_details, personal_model, user_location, traffic_map=None)
         "library_traffic_range", None
     )
 
-    for space in space_details:
-        space["score"] = compute_final_score(
-            space,
-            probability_map,
-            user_location,
-            traffic_map=traffic_map,
-            preferred_traffic_range=preferred_traffic_range,
-        )
+    scores = score_spaces(
+        space_details,
+        probability_map,
+        user_location,
+        traffic_map=traffic_map,
+        preferred_traffic_range=preferred_traffic_range,
+    )
+    for space, score in zip(space_details, scores):
+        space["score"] = score
+
+    return space_details
+
+
+def _search_cache_key(kind, *parts):
+    """
+    Key for SEARCH_CACHE. Everything cached depends on the current slot and
+    on the catalog / filter index it was computed from.
+    """
+    return (kind, get_next_slot_start_pacific(), CATALOG.get().version, FILTER_INDEX.version()) + parts
+
+
+def _available_space_ids(db_conn):
+    """Every space that is free for the next slot (shared by all users)"""
+    return SEARCH_CACHE.get_or_compute(
+        _search_cache_key("available"),
+        lambda: check_next_slot_availability_window(db_conn, get_all_study_space_ids(db_conn)),
+    )
+
+
+def _current_traffic_map():
+    """build_traffic_map() of the latest traffic readings (shared by all users)"""
+    return SEARCH_CACHE.get_or_compute(
+        _search_cache_key("traffic"),
+        lambda: build_traffic_map(get_study_space_traffic_closest_now()),
+    )
+
+
+def ranking_key(space, demoted_ids):
+    """
+    Total order of ranked results: low-rated spots last, then score
+    descending, then study_space_id so equal scores have a stable order.
+    """
+    return (space["id"] in demoted_ids, -space["score"], space["id"])
+
+
+def encode_cursor(key):
+    demoted, neg_score, space_id = key
+    return f"{int(demoted)}:{-neg_score!r}:{space_id}"
+
+
+def decode_cursor(cursor):
+    try:
+        demoted, score, space_id = cursor.split(":")
+        return (demoted == "1", -float(score), int(space_id))
+    except (AttributeError, ValueError):
+        raise ValueError(f"invalid cursor: {cursor!r}")
+
+
+def select_page(spaces, demoted_ids, limit, cursor=None):
+    """
+    Pick one page of ranked results without sorting the whole list.
+
+    Args:
+        spaces (list[dict]): Scored spaces, in any order
+        demoted_ids (set): Low-rated space ids, ranked after everything else
+        limit (int): Page size
+        cursor (str | None): next_cursor from the previous page, or None for the first
+
+    Returns:
+        (list[dict], str | None): The page in rank order, and the cursor for
+        the following page (None when this is the last one)
+    """
+    keyed = ((ranking_key(space, demoted_ids), space) for space in spaces)
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        keyed = (item for item in keyed if item[0] > after)
+    keyed = list(keyed)
 
-    return sorted(space_details, key=lambda x: x["score"], reverse=True)
+    page = heapq.nsmallest(limit, keyed, key=lambda item: item[0])
+    next_cursor = encode_cursor(page[-1][0]) if len(keyed) > limit else None
+    return [space for _, space in page], next_cursor
 
 
 def retrieve_ranked_study_spaces(user_id, filters=None, user_location=None, debug=False):
     """
     Main entry point for retrieving and ranking study spaces.
+    Returns every candidate in rank order (see ranking_key()).
+    """
+    spaces, demoted_ids = _retrieve_scored_spaces(user_id, filters, user_location, debug)
+    ranked_spaces = sorted(spaces, key=lambda space: ranking_key(space, demoted_ids))
+
+    if debug:
+        print(f"[retrieve] Returning {len(ranked_spaces)} ranked space(s) ({sum(1 for s in spaces if s['id'] in demoted_ids)} demoted).")
+
+    return ranked_spaces
+
+
+def retrieve_ranked_page(user_id, filters=None, user_location=None, debug=False, limit=10, cursor=None):
+    """
+    Same ranking as retrieve_ranked_study_spaces(), one page at a time.
+    Only the top `limit` results after `cursor` are selected (heap-based),
+    so the full candidate list is never sorted or serialized.
+
+    Returns:
+        (list[dict], str | None): The page, and the cursor for the next page
+    """
+    spaces, demoted_ids = _retrieve_scored_spaces(user_id, filters, user_location, debug)
+    page, next_cursor = select_page(spaces, demoted_ids, limit, cursor)
+
+    if debug:
+        print(f"[retrieve] Returning {len(page)} of {len(spaces)} ranked space(s), next_cursor={next_cursor}.")
+
+    return page, next_cursor
+
+
+def _retrieve_scored_spaces(user_id, filters=None, user_location=None, debug=False):
+    """
+    Find and score the candidate study spaces for a search.
 
     Flow
     ----
@@ -618,8 +787,12 @@ def retrieve_ranked_study_spaces(user_id, filters=None, user_location=None, debu
        e. If no results → progressively relax weakest constraints (one at a time),
           re-checking availability at each step, until rooms are found.
        f. Still nothing → fall back to all available rooms ranked by proximity.
+
+    Returns:
+        (list[dict], set): Scored spaces (unsorted) and the ids of spaces the
+        user rated low, which ranking_key() demotes to the end
     """
-    db_conn = sqlite3.connect(DB_PATH)
+    db_conn = get_connection(DB_PATH)
 
     if user_location is None:
         if debug:
@@ -636,26 +809,26 @@ def retrieve_ranked_study_spaces(user_id, filters=None, user_location=None, debu
         if debug:
             print("[retrieve] No filters specified. Returning closest available rooms.")
 
-        all_ids = get_all_study_space_ids(db_conn)
-        available_ids = check_next_slot_availability_window(db_conn, all_ids)
+        available_ids = _available_space_ids(db_conn)
         space_details = get_space_details(db_conn, available_ids)
 
         # Fetch traffic and attach it to each space for display, but don't
         # use it to re-order results (no preference data available here).
-        traffic_rows = get_study_space_traffic_closest_now()
-        traffic_map = build_traffic_map(traffic_rows)
+        traffic_map = _current_traffic_map()
         for space in space_details:
             entry = traffic_map.get(space["id"])
             if entry:
                 space["traffic_percentage"] = entry.get("traffic_percentage")
                 space["traffic_estimated"] = entry.get("traffic_estimated", False)
-            space["score"] = compute_final_score(
-                space, probability_map={},
-                user_location=user_location,
-                traffic_map=None,      # no preference → don't let traffic re-order
-                prob_weight=0, distance_weight=1, traffic_weight=0,
-            )
-        return sorted(space_details, key=lambda x: x["score"], reverse=True)
+        scores = score_spaces(
+            space_details, probability_map={},
+            user_location=user_location,
+            traffic_map=None,      # no preference → don't let traffic re-order
+            prob_weight=0, distance_weight=1, traffic_weight=0,
+        )
+        for space, score in zip(space_details, scores):
+            space["score"] = score
+        return space_details, set()
 
     # ------------------------------------------------------------------
     # Step 2: Build personal model (needed for preference stats + scoring)
@@ -663,8 +836,9 @@ def retrieve_ranked_study_spaces(user_id, filters=None, user_location=None, debu
     if debug:
         print(f'[retrieve] STEP 2')
 
-    personal_model = PersonalModel(user_id, USER_DB=PERSONAL_MODEL_DB_PATH, APP_DB=DB_PATH)
-    user_context = personal_model.user_context_for_ranking()
+    # fitted models are cached per user and dropped when they log an event
+    personal_model = MODEL_CACHE.get(user_id, USER_DB=PERSONAL_MODEL_DB_PATH, APP_DB=DB_PATH)
+    user_context = personal_model.user_context
     avg_stats = user_context["average_preference"]
 
     if debug:
@@ -673,8 +847,7 @@ def retrieve_ranked_study_spaces(user_id, filters=None, user_location=None, debu
     # ------------------------------------------------------------------
     # Step 2b: Fetch live traffic data once — reused for all scoring below
     # ------------------------------------------------------------------
-    traffic_rows = get_study_space_traffic_closest_now()
-    traffic_map = build_traffic_map(traffic_rows)
+    traffic_map = _current_traffic_map()
 
     if debug:
         print(f"[retrieve] Traffic data loaded for {len(traffic_map)} space(s).")
@@ -689,8 +862,13 @@ def retrieve_ranked_study_spaces(user_id, filters=None, user_location=None, debu
     if debug:
         print(f'[retrieve] STEP 3')
 
-    available_ids, used_filters = progressive_filter_search(
-        db_conn, filters, avg_stats, debug=debug
+    # The filter matches and availability only depend on the filters, the
+    # relax order derived from avg_stats and the current slot, so identical
+    # searches in the same slot share one cached result.
+    relax_order = tuple(_build_relax_order(filters, avg_stats))
+    available_ids, used_filters = SEARCH_CACHE.get_or_compute(
+        _search_cache_key("filters", canonical_filters(filters), relax_order),
+        lambda: progressive_filter_search(db_conn, filters, avg_stats, debug=debug),
     )
 
     if debug and used_filters != filters:
@@ -708,13 +886,12 @@ def retrieve_ranked_study_spaces(user_id, filters=None, user_location=None, debu
         if debug:
             print("[retrieve] No rooms found after full relaxation. Falling back to all available rooms.")
 
-        all_ids = get_all_study_space_ids(db_conn)
-        available_ids = check_next_slot_availability_window(db_conn, all_ids)
+        available_ids = _available_space_ids(db_conn)
 
     if not available_ids:
         if debug:
             print("[retrieve] No rooms available at all.")
-        return []
+        return [], set()
 
     # ------------------------------------------------------------------
     # Step 5: Fetch details and rank using personal model + distance + traffic.
@@ -725,74 +902,72 @@ def retrieve_ranked_study_spaces(user_id, filters=None, user_location=None, debu
         print(f'[retrieve] STEP 5')
 
     space_details = get_space_details(db_conn, available_ids)
-    ranked_spaces = _rank_spaces(space_details, personal_model, user_location, traffic_map=traffic_map)
+    scored_spaces = _rank_spaces(space_details, personal_model, user_location, traffic_map=traffic_map)
 
-    # Demote low-rated spots to the end of the list so they're still
+    # Low-rated spots are demoted to the end of the ranking so they're still
     # visible but never crowd out genuinely good recommendations.
-    low_rating_ids = set(personal_model.low_rating_spot(personal_model.df_feedback))
+    low_rating_ids = set(personal_model.low_rating)
     if debug:
         print(f"[retrieve] Low-rated space IDs: {low_rating_ids}")
-    normal = [s for s in ranked_spaces if s["id"] not in low_rating_ids]
-    demoted = [s for s in ranked_spaces if s["id"] in low_rating_ids]
-    ranked_spaces = normal + demoted
 
-    if debug:
-        print(f"[retrieve] Returning {len(ranked_spaces)} ranked space(s) ({len(demoted)} demoted).")
-
-    return ranked_spaces
+    return scored_spaces, low_rating_ids
 
 
 def get_available_buildings():
     """Get list of all available buildings"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""SELECT building_id, name, has_printer, opening_time, closing_time, longitude, latitude FROM buildings ORDER BY name;""")
-    buildings = [{"building_id": building[0], "name": building[1], "has_printer": building[2], "opening_time": building[3], "closing_time": building[4], "longitude": building[5], "latitude": building[6]} for building in cursor.fetchall()]
-    conn.close()
+    buildings = [{"building_id": building.building_id, "name": building.name, "has_printer": building.has_printer, "opening_time": building.opening_time, "closing_time": building.closing_time, "longitude": building.longitude, "latitude": building.latitude} for building in CATALOG.get().buildings.values()]
     return buildings
 
 def get_study_spaces_at_building(building):
     """Get list of all available buildings"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""SELECT
-            s.study_space_id,
-            s.name,
-            s.capacity,
-            s.tech_enhanced,
-            s.is_indoor,
-            s.must_reserve,
-            s.is_talking_allowed,
-            s.building_id,
-            b.name as building_name,
-            s.floor,
-            b.building_id
-            FROM study_spaces AS s
-            LEFT JOIN buildings AS b ON b.building_id = s.building_id
-            WHERE b.building_id = ?; """, (building, ))
-    spaces = [{"id": space[0], \
-        "title" : space[1], \
-        "capacity": space[2], \
-        "techEnhanced?": space[3], \
-        "environment": space[4], \
-        "reservable":space[5], \
-        "talkingAllowed": space[6], \
-        "locationId": space[7], \
-        "locationName": space[8], \
-        "floor": space[9]} for space in cursor.fetchall()]
-    conn.close()
+    catalog = CATALOG.get()
+    if building not in catalog.buildings:
+        return []
+    spaces = [{"id": space.study_space_id, \
+        "title" : space.name, \
+        "capacity": space.capacity, \
+        "techEnhanced?": space.tech_enhanced, \
+        "environment": space.is_indoor, \
+        "reservable":space.must_reserve, \
+        "talkingAllowed": space.is_talking_allowed, \
+        "locationId": space.building_id, \
+        "locationName": space.building_name, \
+        "floor": space.floor} for space in catalog.spaces_by_building.get(building, [])]
     return spaces
 
 def get_buildings_with_spaces():
-    spaceless_buildings = get_available_buildings()
+    """
+    Every building that has at least one study space, with its spaces
+    attached, built in one pass over the catalog.
+    """
+    catalog = CATALOG.get()
     buildings = []
-    for i, building in enumerate(spaceless_buildings):
-        spaces = get_study_spaces_at_building(building["building_id"])
-        if len(spaces) > 0:
-            building["spaces"] = spaces
-            buildings.append(building)
-    
+    for building in catalog.buildings.values():
+        spaces = catalog.spaces_by_building.get(building.building_id)
+        if not spaces:
+            continue
+        buildings.append({
+            "building_id": building.building_id,
+            "name": building.name,
+            "has_printer": building.has_printer,
+            "opening_time": building.opening_time,
+            "closing_time": building.closing_time,
+            "longitude": building.longitude,
+            "latitude": building.latitude,
+            "spaces": [{"id": space.study_space_id,
+                        "title": space.name,
+                        "capacity": space.capacity,
+                        "techEnhanced?": space.tech_enhanced,
+                        "environment": space.is_indoor,
+                        "reservable": space.must_reserve,
+                        "talkingAllowed": space.is_talking_allowed,
+                        "locationId": space.building_id,
+                        "locationName": space.building_name,
+                        "floor": space.floor} for space in spaces],
+        })
+
     return buildings
+
 def round_up_to_hour(dt):
     """
     Always round up to the next hour.
@@ -812,7 +987,7 @@ def round_up_to_hour(dt):
 def get_current_weather():
     now = datetime.now(timezone.utc)
     date_str, hour_str = round_up_to_hour(now)
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cur = conn.cursor()
 
     # Try common column names for the text weather field
@@ -824,7 +999,6 @@ def get_current_weather():
     """, (date_str, hour_str))
     row = cur.fetchone()
 
-    conn.close()
 
     weather = row[0] if row else None
     return weather
@@ -866,33 +1040,14 @@ def fill_missing_traffic(rows):
     return rows
 
 def get_study_space_traffic_closest_now(window_hours: int = 6):
-    now_key = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    """
+    Current traffic for every study space, joined on the space's floor.
 
+    Reads library_traffic_latest (one row per location, maintained by
+    LibraryTraffic at ingest) instead of ranking the full library_traffic
+    history on every request.
+    """
     sql = """
-    WITH traffic_norm AS (
-        SELECT
-            location_name,
-            traffic_percentage,
-            timestamp,
-            substr(timestamp,1,19) AS time_key
-        FROM library_traffic
-    ),
-    ranked AS (
-        SELECT
-            location_name,
-            traffic_percentage,
-            timestamp,
-            ROW_NUMBER() OVER (
-                PARTITION BY location_name
-                ORDER BY ABS(strftime('%s', time_key) - strftime('%s', ?))
-            ) AS rn
-        FROM traffic_norm
-    ),
-    closest AS (
-        SELECT location_name, traffic_percentage, timestamp
-        FROM ranked
-        WHERE rn = 1
-    )
     SELECT
         s.study_space_id,
         s.floor,
@@ -900,16 +1055,15 @@ def get_study_space_traffic_closest_now(window_hours: int = 6):
         c.traffic_percentage,
         c.timestamp
     FROM study_spaces s
-    LEFT JOIN closest c
+    LEFT JOIN library_traffic_latest c
         ON s.floor = c.location_name;
     """
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     cur = conn.cursor()
-    cur.execute(sql, (now_key,))
+    cur.execute(sql)
     rows = cur.fetchall()
     cols = [d[0] for d in cur.description]
-    conn.close()
     rows = [dict(zip(cols, r)) for r in rows]
     rows = fill_missing_traffic(rows)
-    return rows
\ No newline at end of file
+    return rows
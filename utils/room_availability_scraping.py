@@ -1,7 +1,9 @@
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+import asyncio
 import json
 import re
 import os 
+import time
 from datetime import datetime
 
 BASE_URL = "https://spaces.lib.uci.edu"
@@ -119,59 +121,87 @@ def extract_space_id(url):
     return match.group(1) if match else None
 
 
-def main():
-    print(f"🕐 Starting availability scrape at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-
-        locations = {
-            "Science": 6580,
-            "Langson": 6539,
-            "Gateway": 6579,
-            "Multimedia": 6581
-        }
-
-        for location, l_id in locations.items():
-            try:
-                page.goto(f"https://spaces.lib.uci.edu/spaces?lid={l_id}", timeout=60000)
-                page.wait_for_selector(".fc-timeline-body")
-                page.wait_for_selector(".fc-timeline-events a.fc-timeline-event", timeout=60000)
-
-                data = page.evaluate(SCRAPING_JS_CODE_BLOCK)
+# Calendars scraped every cycle; names match the *_room_availability.json files
+SOURCES = {
+    "Science": f"{BASE_URL}/spaces?lid=6580",
+    "Langson": f"{BASE_URL}/spaces?lid=6539",
+    "Gateway": f"{BASE_URL}/spaces?lid=6579",
+    "Multimedia": f"{BASE_URL}/spaces?lid=6581",
+    "ALP": "https://scheduler.oit.uci.edu/reserve/Antcaves",
+}
+
+# Milliseconds to wait for a calendar to load
+PAGE_TIMEOUT = 60000
+# Seconds one source may take in total before it is given up on
+SOURCE_TIMEOUT = 90
+
+
+async def scrape_page(page, url, timeout=PAGE_TIMEOUT):
+    """Load one calendar in page and return {room_id: [slot, ...]}"""
+    await page.goto(url, timeout=timeout)
+    await page.wait_for_selector(".fc-timeline-body")
+    await page.wait_for_selector(".fc-timeline-events a.fc-timeline-event", timeout=timeout)
+    return await page.evaluate(SCRAPING_JS_CODE_BLOCK)
+
+
+async def scrape_source(page, location, url, source_timeout=SOURCE_TIMEOUT, scrape=scrape_page):
+    """
+    Scrape one calendar, giving up after source_timeout seconds. Returns
+    (data, report): data is None if the source failed, report is
+    {"seconds", "rooms", "slots", "error"} for logging and /api/health.
+    """
+    started = time.monotonic()
+    data, error = None, None
+    try:
+        data = await asyncio.wait_for(scrape(page, url), source_timeout)
+    except asyncio.TimeoutError:
+        error = f"timed out after {source_timeout}s"
+    except Exception as e:
+        error = str(e)
+
+    report = {
+        "seconds": round(time.monotonic() - started, 2),
+        "rooms": len(data) if data is not None else 0,
+        "slots": sum(len(slots) for slots in data.values()) if data is not None else 0,
+        "error": error,
+    }
+    if error is None:
+        print(f"✅ {location} availability scraped ({report['rooms']} rooms, {report['slots']} slots, {report['seconds']}s)")
+    else:
+        print(f"❌ Error scraping {location} after {report['seconds']}s: {error}")
+    return data, report
+
+
+def save_json(location, data, output_dir=f"{OUTPUT_DIR}/room_availability"):
+    output_file = f"{output_dir}/{location}_room_availability.json"
+
+    # Write data (will replace if file exists)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+
+async def scrape_all_sources():
+    """Scrape every source at once, each in its own page"""
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        pages = [await browser.new_page() for _ in SOURCES]
+        results = await asyncio.gather(*[
+            scrape_source(page, location, url)
+            for page, (location, url) in zip(pages, SOURCES.items())
+        ])
+        await browser.close()
+    return dict(zip(SOURCES, results))
 
-                output_file = f"{OUTPUT_DIR}/room_availability/{location}_room_availability.json"
-                
-                # Write data (will replace if file exists)
-                with open(output_file, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4)
 
-                print(f"✅ {location} availability saved ({len(data)} rooms)")
-            except Exception as e:
-                print(f"❌ Error scraping {location}: {e}")
-
-        # ALP
-        try:
-            page.goto("https://scheduler.oit.uci.edu/reserve/Antcaves", timeout=60000)
-            page.wait_for_selector(".fc-timeline-body")
-            page.wait_for_selector(".fc-timeline-events a.fc-timeline-event", timeout=60000)
-
-            data = page.evaluate(SCRAPING_JS_CODE_BLOCK)
-
-            output_file = f"{OUTPUT_DIR}/room_availability/ALP_room_availability.json"
-            
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4)
-
-            print(f"✅ ALP availability saved ({len(data)} rooms)")
-        except Exception as e:
-            print(f"❌ Error scraping ALP: {e}")
+def main():
+    print(f"🕐 Starting availability scrape at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-        browser.close()
+    for location, (data, _) in asyncio.run(scrape_all_sources()).items():
+        if data is not None:
+            save_json(location, data)
     
     print(f"✅ Scraping completed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,173 @@
+"""
+scraper_service.py - Long-lived Playwright scraper for the availability calendars
+
+update_room_availability used to run room_availability_scraping.py in a new
+Python process every cycle, which re-imported Playwright and cold-launched
+Chromium before visiting the calendars one by one. SCRAPER keeps the browser
+warm across cycles instead:
+
+  * a dedicated thread runs an asyncio event loop that owns Playwright (it
+    only works on the loop that started it, and APScheduler runs jobs on
+    pool threads); scrape_all() hands the scrapes to that loop
+  * every source gets its own browser context and page, kept open between
+    runs, so cookies and cached site assets are reused
+  * all sources are scraped concurrently, each given up on after
+    SOURCE_TIMEOUT seconds, so one slow calendar no longer delays the rest
+  * scrape_all() returns {source: {room_id: [slot, ...]}} directly; sources
+    that failed are left out. last_report holds each source's latency and
+    row counts
+  * the browser is closed and relaunched after MAX_RUNS runs (Chromium grows
+    over time), and after a run in which it crashed or every source failed
+"""
+
+import asyncio
+import atexit
+import sys
+import threading
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from playwright.async_api import async_playwright
+
+from utils.room_availability_scraping import SOURCE_TIMEOUT, SOURCES, scrape_page, scrape_source
+
+# Runs before the browser is relaunched
+MAX_RUNS = 50
+
+
+async def launch_chromium():
+    """Start Playwright and a headless Chromium; returns (playwright, browser)"""
+    playwright = await async_playwright().start()
+    try:
+        return playwright, await playwright.chromium.launch(headless=True)
+    except Exception:
+        await playwright.stop()
+        raise
+
+
+class ScraperService:
+    def __init__(self, sources=SOURCES, max_runs=MAX_RUNS, source_timeout=SOURCE_TIMEOUT,
+                 launcher=launch_chromium, scrape=scrape_page):
+        self.sources = sources
+        self.max_runs = max_runs
+        self.source_timeout = source_timeout
+        self.launcher = launcher
+        self.scrape = scrape
+        self._lock = threading.Lock()
+        self._thread = None
+        self._loop = None
+
+        # only touched on the scraper loop
+        self._run_lock = None
+        self._playwright = None
+        self._browser = None
+        self._pages = {}
+        self.runs = 0
+        self.launches = 0
+        self.last_report = {}
+
+    def scrape_all(self, timeout=None):
+        """
+        Scrape every source with the warm browser and return
+        {source: {room_id: [slot, ...]}}. Raises if the browser could not be
+        started, or TimeoutError after timeout seconds.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="availability-scraper", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(self._scrape_all(), loop).result(timeout)
+
+    def close(self):
+        """Close the browser and stop the scraper thread"""
+        with self._lock:
+            thread, loop = self._thread, self._loop
+            self._thread, self._loop = None, None
+        if thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    async def _scrape_all(self):
+        if self._run_lock is None:
+            self._run_lock = asyncio.Lock()
+        async with self._run_lock:
+            try:
+                return await self._scrape_sources()
+            except Exception:
+                await self._shutdown()
+                raise
+
+    async def _scrape_sources(self):
+        if self._browser is None:
+            self._playwright, self._browser = await self.launcher()
+            self.launches += 1
+
+        names = list(self.sources)
+        pages = [await self._page(name) for name in names]
+        scraped = await asyncio.gather(*[
+            scrape_source(page, name, self.sources[name], self.source_timeout, self.scrape)
+            for page, name in zip(pages, names)
+        ])
+
+        results = {}
+        reports = {}
+        for name, (data, report) in zip(names, scraped):
+            reports[name] = report
+            if data is not None:
+                results[name] = data
+            else:
+                # start the next run from a fresh page
+                await self._close_page(name)
+        # swapped in whole, so /api/health never sees a half-filled report
+        self.last_report = reports
+
+        self.runs += 1
+        if not results or not self._browser.is_connected():
+            print("⚠️  Browser looks broken, relaunching it next run")
+            await self._shutdown()
+        elif self.runs >= self.max_runs:
+            await self._shutdown()
+        return results
+
+    async def _page(self, name):
+        page = self._pages.get(name)
+        if page is None:
+            context = await self._browser.new_context()
+            page = self._pages[name] = await context.new_page()
+        return page
+
+    async def _close_page(self, name):
+        page = self._pages.pop(name, None)
+        if page is not None:
+            try:
+                await page.context.close()
+            except Exception:
+                pass
+
+    async def _shutdown(self):
+        for name in list(self._pages):
+            await self._close_page(name)
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+        except Exception as e:
+            print(f"⚠️  Could not close browser cleanly: {e}")
+        try:
+            if self._playwright is not None:
+                await self._playwright.stop()
+        except Exception as e:
+            print(f"⚠️  Could not stop Playwright cleanly: {e}")
+        self._playwright = None
+        self._browser = None
+        self.runs = 0
+
+
+SCRAPER = ScraperService()
@@ -0,0 +1,97 @@
+"""
+search_cache.py - Cache the non-personalized part of a search
+
+For a given filter dict and 30-minute slot, every user gets the same filter
+matches, the same availability answer and the same traffic readings; only
+the personal-model reranking differs. Those shared results are cached here,
+keyed by the canonicalized filters, the relaxation order and the slot from
+get_next_slot_start_pacific(), so the ranking step can run straight on top
+of a cached candidate set.
+
+Entries expire after TTL_SECONDS and the whole cache is dropped whenever
+room availability or library traffic ingest completes, so a cached answer is
+never older than the data it was computed from. A value computed while an
+invalidate() ran may already be stale, so get_or_compute() returns it but
+does not store it. Values are copied on the way
+out, so callers are free to mutate what they get back.
+"""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+
+MAX_ENTRIES = 512
+TTL_SECONDS = 300
+
+
+def canonical_filters(filters):
+    """Stable, hashable form of a filter dict, independent of key order"""
+    return json.dumps(filters or {}, sort_keys=True, default=str)
+
+
+class SearchCache:
+    def __init__(self, max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # bumped by every invalidate()
+        self._generation = 0
+
+    def get(self, key):
+        """Return a copy of the cached value for key, or None if absent or expired"""
+        return self._get(key)[0]
+
+    def _get(self, key):
+        """(copy of the cached value or None, current generation)"""
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry is None or now - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None, generation
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value), generation
+
+    def put(self, key, value, generation=None):
+        """
+        Store value for key. With generation (from the get that missed), the
+        value is dropped if the cache was invalidated since.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, computing and storing it on a miss"""
+        value, generation = self._get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value, generation)
+        return value
+
+    def invalidate(self):
+        """Drop every entry; called when availability or traffic data changes"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+SEARCH_CACHE = SearchCache()
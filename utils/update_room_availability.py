@@ -1,89 +1,113 @@
 """
 update_availability.py - Scrape room availability and update database
 Run this script periodically to keep availability data fresh
+
+Scraping goes through utils.scraper_service.SCRAPER, which keeps a browser
+warm between runs; the scraped data is written to the database directly and
+saved to the *_room_availability.json files for json_to_db.py.
 """
 
-import subprocess
-import sqlite3
 from pathlib import Path
 from datetime import datetime
 import sys
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 sys.path.append(str(BASE_DIR / "utils"))
+sys.path.append(str(BASE_DIR))
 
 from json_to_db import (
     load_json, 
-    insert_room_availability,
     ROOM_AVAILABILITY_JSON,
+    ROOM_AVAILABILITY_DATA_DIR,
     DB_PATH
 )
+from utils.availability_index import AVAILABILITY_INDEX
+from utils.availability_sync import AVAILABILITY_CHANGES, sync_room_availability
+from utils.db import get_connection
+from utils.migrate_db import migrate
+from utils.room_availability_scraping import save_json
+from utils.scraper_service import SCRAPER
+from utils.search_cache import SEARCH_CACHE
+
+# Seconds update_availability() waits for the scraper
+SCRAPE_TIMEOUT = 600
 
 
-def clear_old_availability(cursor):
-    """Delete all existing availability data"""
-    cursor.execute("DELETE FROM room_availability")
-    deleted = cursor.rowcount
-    print(f"🗑️  Cleared {deleted} old availability records")
+_migrated = False
 
 
 def scrape_availability():
-    """Run the scraping script"""
+    """Scrape every calendar; returns {location: {room_id: [slot, ...]}}, or None on failure"""
     print("🕷️  Starting availability scraper...")
     
-    scraper_path = BASE_DIR / "utils" / "room_availability_scraping.py"
-    
     try:
-        result = subprocess.run(
-            ["python", str(scraper_path)],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print(result.stdout)
-        return True
-    except subprocess.CalledProcessError as e:
+        data = SCRAPER.scrape_all(timeout=SCRAPE_TIMEOUT)
+    except Exception as e:
         print(f"❌ Scraping failed: {e}")
-        print(e.stderr)
-        return False
+        return None
 
+    if not data:
+        print("❌ Scraping failed: no location could be scraped")
+        return None
 
-def update_database():
-    """Update database with newly scraped data"""
+    for location, room_availability in data.items():
+        save_json(location, room_availability, ROOM_AVAILABILITY_DATA_DIR)
+    return data
+
+
+def update_database(data=None):
+    """
+    Update database with newly scraped data. data is what scrape_availability()
+    returned; locations missing from it (or everything, if it is None) are
+    loaded from their last saved JSON file instead. Only the slots that
+    changed are written (see availability_sync.py).
+    """
+    global _migrated
     print("📊 Updating database...")
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
+
+    if not _migrated:
+        # room_availability_scrapes and the unique slot index
+        migrate(DB_PATH)
+        _migrated = True
+
+    locations = []
+    total_slots = 0
+    for json_file in ROOM_AVAILABILITY_JSON:
+        location = json_file.name.replace("_room_availability.json", "")
+        if data is not None and location in data:
+            room_availability = data[location]
+            scraped_at = datetime.now().isoformat()
+        elif json_file.exists():
+            print(f"Processing {json_file.name}...")
+            room_availability = load_json(json_file)
+            # the file is only as fresh as the scrape that wrote it
+            scraped_at = datetime.fromtimestamp(json_file.stat().st_mtime).isoformat()
+        else:
+            print(f"⚠️  {json_file.name} not found, skipping...")
+            continue
+
+        locations.append((room_availability, scraped_at))
+        total_slots += sum(len(slots) for slots in room_availability.values())
+
     try:
-        # Clear old data
-        clear_old_availability(cursor)
-        
-        # Insert new data
-        total_slots = 0
-        for json_file in ROOM_AVAILABILITY_JSON:
-            if json_file.exists():
-                print(f"Processing {json_file.name}...")
-                room_availability = load_json(json_file)
-                insert_room_availability(cursor, room_availability)
-                
-                # Count total slots
-                for room_id, slots in room_availability.items():
-                    total_slots += len(slots)
-                
-                print(f"✅ Inserted {len(room_availability)} rooms from {json_file.name}")
-            else:
-                print(f"⚠️  {json_file.name} not found, skipping...")
-        
-        conn.commit()
-        print(f"✅ Database updated with {total_slots} total time slots")
+        # one transaction, so a failure here leaves the previous
+        # availability in place
+        diff = sync_room_availability(get_connection(DB_PATH), locations)
+        print(f"✅ Database updated with {total_slots} total time slots: "
+              f"{len(diff.inserted)} inserted, {len(diff.updated)} updated, "
+              f"{len(diff.deleted)} deleted, {diff.unchanged} unchanged")
         
     except Exception as e:
-        conn.rollback()
         print(f"❌ Database update failed: {e}")
         raise
-    finally:
-        conn.close()
+
+    # Publish the new slots to searches in this process. The index is rebuilt
+    # even without changes, since it carries each room's scrape time.
+    AVAILABILITY_INDEX.rebuild()
+    AVAILABILITY_CHANGES.publish(diff)
+    if diff.inserted or diff.updated or diff.deleted:
+        SEARCH_CACHE.invalidate()
+    return diff
 
 
 def update_availability():
@@ -93,7 +117,8 @@ def update_availability():
     print("="*60)
     
     # Step 1: Scrape fresh data
-    if not scrape_availability():
+    data = scrape_availability()
+    if data is None:
         print("❌ Update failed: scraping error")
         return
     
@@ -101,7 +126,7 @@ def update_availability():
     
     # Step 2: Update database
     try:
-        update_database()
+        update_database(data)
     except Exception as e:
         print(f"❌ Update failed: {e}")
         return
@@ -1,5 +1,5 @@
 from pathlib import Path
-import sqlite3
+import sys
 import openmeteo_requests
 
 import pandas as pd
@@ -10,6 +10,9 @@ from datetime import datetime, timedelta
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "data" / "database" / "app.db"
+sys.path.append(str(BASE_DIR))
+
+from utils.db import get_connection
 
 # Setup the Open-Meteo API client with cache and retry on error
 #cache_session = requests_cache.CachedSession('.cache', expire_after = 3600)
@@ -38,7 +41,7 @@ class WeatherAPI():
         self.DB_PATH = DB_PATH
 
     def create_hourly_weather_table(self):
-        conn = sqlite3.connect(self.DB_PATH)
+        conn = get_connection(self.DB_PATH)
         cur = conn.cursor()
         cur.execute("""
         CREATE TABLE IF NOT EXISTS hourly_weather (
@@ -54,7 +57,6 @@ class WeatherAPI():
         );
         """)
         conn.commit()
-        conn.close()
 
     def clear_weather_database(self, cursor):
         cursor.execute("DELETE FROM library_traffic;")
@@ -156,7 +158,7 @@ class WeatherAPI():
         date_str = rounded_dt.strftime("%Y-%m-%d")
         hour_str = rounded_dt.strftime("%H:00")   # ⭐ "11:00"
 
-        conn = sqlite3.connect(self.DB_PATH)
+        conn = get_connection(self.DB_PATH)
         cur = conn.cursor()
 
         cur.execute("""
@@ -169,17 +171,14 @@ class WeatherAPI():
         exists = cur.fetchone() is not None
 
         if exists:
-            conn.close()
             print("Weather already exists for this rounded hour")
             return
 
         # otherwise update
 
-        self.clear_weather_database(cur)
-        self.store_hourly_weather(cur)
-
-        conn.commit()
-        conn.close()
+        with conn:
+            self.clear_weather_database(cur)
+            self.store_hourly_weather(cur)
         print("Weather updated")
 
 